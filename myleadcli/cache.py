@@ -0,0 +1,19 @@
+"""
+Module locating data kept between runs, like learned rate limits, checkpoints and the lead store.
+It imports only the standard library, so modules needed before any data is loaded,
+such as the rate limiter, can find their files without loading pandas or pydantic.
+"""
+import hashlib
+import os
+from pathlib import Path
+
+
+def cache_dir() -> Path:
+    """Return the directory for data kept between runs, honouring XDG_CACHE_HOME."""
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "myleadcli"
+
+
+def token_key(token: str) -> str:
+    """Return a key identifying the API token in file names without revealing the token."""
+    return hashlib.sha256(token.encode()).hexdigest()[:16]
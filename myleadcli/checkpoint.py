@@ -0,0 +1,154 @@
+"""
+Module with on-disk checkpoints of interrupted fetches.
+Every completed part of a fetch is written into a directory named by
+the fingerprint of its query, so a rerun of the same query loads the parts
+which are already done instead of fetching them again.
+The token is part of the fingerprint only as its hash.
+New leads keep shifting the pages of a query, so checkpoints older than
+MAX_AGE are not resumed but removed, together with those of other queries.
+"""
+import hashlib
+import logging
+import shutil
+import time
+from pathlib import Path
+
+import orjson
+
+from myleadcli import models, utils
+
+CHECKPOINT_DIR = "checkpoints"
+MAX_AGE = 3600  # seconds after the start of a fetch in which it can be resumed
+STARTED = "started"  # empty file whose modification time is the start of the fetch
+
+
+def fingerprint(api_data: models.Api) -> str:
+    """
+    Return a fingerprint identifying the query of the API request data.
+
+    Args:
+        api_data (models.Api): The API request data.
+
+    Returns:
+        str: Hex digest which is the same for equal queries of the same token.
+    """
+    query = api_data.model_dump(mode="json", exclude={"token"})
+    query["token"] = utils.token_key(api_data.token)
+    return hashlib.sha256(orjson.dumps(query, option=orjson.OPT_SORT_KEYS)).hexdigest()[:16]
+
+
+def prune(directory: Path, max_age: float = MAX_AGE) -> None:
+    """
+    Remove checkpoints of fetches started more than `max_age` seconds ago.
+
+    Checkpoints without the start time, written by older versions, are removed too.
+
+    Args:
+        directory (Path): Directory of all checkpoints.
+        max_age (float, optional): Age in seconds after which a checkpoint is removed.
+            Defaults to MAX_AGE.
+    """
+    oldest = time.time() - max_age
+    try:
+        checkpoints = list(directory.iterdir())
+    except FileNotFoundError:
+        return
+    for checkpoint in checkpoints:
+        try:
+            started = (checkpoint / STARTED).stat().st_mtime
+        except OSError:
+            started = None
+        if started is None or started < oldest:
+            logging.info(f"Removing outdated checkpoint {checkpoint.name}")
+            shutil.rmtree(checkpoint, ignore_errors=True)
+
+
+class Checkpoint:
+    """
+    Directory with completed parts of one query, each in its own JSON file.
+
+    Outdated checkpoints of all queries are removed when it is created,
+    so a fetch started more than `max_age` seconds ago is fetched again from scratch.
+
+    Args:
+        api_data (models.Api): The API request data of the query.
+        directory (Path | None, optional): Directory of all checkpoints.
+            Defaults to the cache directory.
+        max_age (float, optional): Seconds after the start of a fetch in which
+            it can be resumed. Defaults to MAX_AGE.
+    """
+
+    def __init__(
+        self,
+        api_data: models.Api,
+        directory: Path | None = None,
+        max_age: float = MAX_AGE,
+    ) -> None:
+        directory = directory or utils.cache_dir() / CHECKPOINT_DIR
+        prune(directory, max_age)
+        self.directory = directory / fingerprint(api_data)
+
+    def _path(self, name: str) -> Path:
+        return self.directory / f"{name}.json"
+
+    def read(self, name: str) -> bytes | None:
+        """
+        Read a completed part of the query.
+
+        Args:
+            name (str): Name of the part.
+
+        Returns:
+            bytes | None: JSON content of the part or None when the part is not done.
+        """
+        try:
+            return self._path(name).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def write(self, name: str, content: bytes) -> None:
+        """
+        Write a completed part of the query.
+
+        The file is replaced atomically, so an interrupted run never leaves
+        a partially written part behind.
+
+        Args:
+            name (str): Name of the part.
+            content (bytes): JSON content of the part.
+        """
+        if not self.directory.exists():
+            self.directory.mkdir(parents=True)
+            (self.directory / STARTED).touch()
+        path = self._path(name)
+        temporary = path.with_suffix(".tmp")
+        temporary.write_bytes(content)
+        temporary.replace(path)
+
+    def load(self, name: str) -> utils.ValidatedDataList | None:
+        """
+        Load leads of a completed part of the query.
+
+        Args:
+            name (str): Name of the part.
+
+        Returns:
+            utils.ValidatedDataList | None: Leads of the part validated again, so dates
+                are datetimes as in freshly fetched leads, or None when the part is not done.
+        """
+        content = self.read(name)
+        return None if content is None else utils.validate_json(content, strict=False)
+
+    def save(self, name: str, leads: utils.DataList) -> None:
+        """
+        Save leads of a completed part of the query.
+
+        Args:
+            name (str): Name of the part.
+            leads (utils.DataList): Validated leads of the part.
+        """
+        self.write(name, orjson.dumps(leads))
+
+    def clear(self) -> None:
+        """Remove all parts of the query once it has been completed."""
+        shutil.rmtree(self.directory, ignore_errors=True)
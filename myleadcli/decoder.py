@@ -0,0 +1,184 @@
+"""
+Module decoding validated leads straight into DataFrame columns.
+The decoder knows the fixed schema of models.Lead, so it fills preallocated
+typed column arrays in a single pass over the leads instead of letting
+pd.json_normalize discover the structure of every record.
+Fields repeated across leads are dictionary encoded into categoricals on the way,
+so every distinct string is kept once instead of once per lead.
+Leads arriving in pages are appended to a LeadBuffer of typed column chunks,
+so the dicts of a page can be freed as soon as it is decoded.
+"""
+from typing import Any, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from myleadcli.profiling import span
+
+
+class Column(NamedTuple):
+    """Column of the decoded DataFrame"""
+
+    name: str  # the same name as given by pd.json_normalize
+    path: tuple[str, ...]  # keys leading to the value in a validated lead
+    dtype: str  # "object", "int64", "float64", "datetime" or "category"
+
+
+COLUMNS = [
+    Column("lead_id", ("lead_id",), "object"),
+    Column("campaign_id", ("campaign_id",), "int64"),
+    Column("campaign_name", ("campaign_name",), "category"),
+    Column("payout", ("payout",), "float64"),
+    Column("currency", ("currency",), "category"),
+    Column("status", ("status",), "category"),
+    Column("status_reason", ("status_reason",), "category"),
+    Column("country", ("country",), "category"),
+    Column("ip", ("ip",), "object"),
+    Column("ml_sub1", ("ml_sub1",), "object"),
+    Column("ml_sub2", ("ml_sub2",), "object"),
+    Column("ml_sub3", ("ml_sub3",), "object"),
+    Column("ml_sub4", ("ml_sub4",), "object"),
+    Column("ml_sub5", ("ml_sub5",), "object"),
+    Column("created_at.date", ("created_at", "date"), "datetime"),
+    Column("created_at.timezone_type", ("created_at", "timezone_type"), "int64"),
+    Column("created_at.timezone", ("created_at", "timezone"), "category"),
+    Column("user_agent.name", ("user_agent", "name"), "object"),
+    Column("user_agent.operation_system", ("user_agent", "operation_system"), "category"),
+    Column(
+        "user_agent.operation_system_version",
+        ("user_agent", "operation_system_version"),
+        "category",
+    ),
+    Column("user_agent.browser_system", ("user_agent", "browser_system"), "category"),
+    Column("user_agent.browser_version", ("user_agent", "browser_version"), "object"),
+    Column("user_agent.device", ("user_agent", "device"), "category"),
+    Column("user_agent.device_brand", ("user_agent", "device_brand"), "category"),
+    Column("user_agent.device_model", ("user_agent", "device_model"), "category"),
+]
+
+# numpy dtype of the array filled during decoding, categories are stored as codes
+BUFFER_DTYPES = {
+    "object": object,
+    "int64": np.int64,
+    "float64": np.float64,
+    "datetime": object,
+    "category": np.int32,
+}
+
+Chunk = dict[str, np.ndarray]  # decoded column arrays of one page
+
+
+def _categorical(codes: np.ndarray, table: dict[Any, int]) -> pd.Categorical:
+    """Build a categorical with sorted categories from codes in order of appearance."""
+    categories = np.array(list(table), dtype=object)
+    order = np.argsort(categories, kind="stable")
+    remap = np.empty(len(order) + 1, dtype=np.int32)
+    remap[order] = np.arange(len(order), dtype=np.int32)
+    remap[-1] = -1  # missing values keep the code -1
+    return pd.Categorical.from_codes(remap[codes], categories=categories[order])
+
+
+def _decode_chunk(data: list[dict[str, Any]], tables: dict[str, dict[Any, int]]) -> Chunk:
+    """
+    Decode validated leads into typed column arrays in one pass.
+
+    Categorical columns are decoded into codes of the given code tables,
+    which are extended with values seen for the first time.
+    """
+    size = len(data)
+    buffers = {column.name: np.empty(size, dtype=BUFFER_DTYPES[column.dtype]) for column in COLUMNS}
+    # (parent key or None, [(key, buffer)], [(key, codes buffer, code table)])
+    groups = []
+    for parent in (None, "created_at", "user_agent"):
+        columns = [column for column in COLUMNS if (column.path[:-1] or (None,))[0] == parent]
+        plain = [(c.path[-1], buffers[c.name]) for c in columns if c.dtype != "category"]
+        encoded = [
+            (c.path[-1], buffers[c.name], tables[c.name]) for c in columns if c.dtype == "category"
+        ]
+        groups.append((parent, plain, encoded))
+
+    for i, lead in enumerate(data):
+        for parent, plain, encoded in groups:
+            record = lead if parent is None else lead[parent]
+            for key, buffer in plain:
+                buffer[i] = record[key]
+            for key, buffer, table in encoded:
+                value = record[key]
+                buffer[i] = -1 if value is None else table.setdefault(value, len(table))
+
+    for column in COLUMNS:
+        if column.dtype == "datetime":
+            # leads from trusted files and the store keep dates as ISO strings
+            buffers[column.name] = pd.to_datetime(buffers[column.name], format="ISO8601").to_numpy()
+    return buffers
+
+
+class LeadBuffer:
+    """
+    Append-only buffer of decoded leads, filled page by page.
+
+    Every page is decoded into typed column chunks right away, categorical
+    columns into codes of code tables shared by all pages, so only the chunks
+    and not the dicts of all leads are kept until the DataFrame is built.
+    """
+
+    def __init__(self) -> None:
+        self.tables: dict[str, dict[Any, int]] = {
+            column.name: {} for column in COLUMNS if column.dtype == "category"
+        }
+        self.chunks: dict[int, Chunk] = {}
+
+    def __len__(self) -> int:
+        return sum(len(chunk["lead_id"]) for chunk in self.chunks.values())
+
+    def append(self, data: list[dict[str, Any]], key: int | None = None) -> None:
+        """
+        Decode validated leads of one page and append them.
+
+        Args:
+            data (list[dict[str, Any]]): Validated leads, as returned by `utils.validate_data`.
+            key (int | None, optional): Position of the page among all pages, e.g. its number
+                when pages arrive out of order. Defaults to after the last appended page.
+        """
+        if key is None:
+            key = max(self.chunks, default=-1) + 1
+        with span("normalization", items=len(data)):
+            self.chunks[key] = _decode_chunk(data, self.tables)
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Build the DataFrame of all appended leads in order of page keys and empty the buffer.
+
+        Returns:
+            pd.DataFrame: DataFrame with the same columns as pd.json_normalize would give,
+                with low-cardinality columns as categoricals with sorted categories.
+        """
+        chunks = [self.chunks[key] for key in sorted(self.chunks)]
+        chunks = chunks or [_decode_chunk([], self.tables)]  # empty frame with all columns
+        self.chunks = {}
+        with span("normalization", items=sum(len(chunk["lead_id"]) for chunk in chunks)):
+            df_columns: dict[str, Any] = {}
+            for column in COLUMNS:
+                # free the chunks of every column as soon as it is joined
+                buffer = np.concatenate([chunk.pop(column.name) for chunk in chunks])
+                if column.dtype == "category":
+                    df_columns[column.name] = _categorical(buffer, self.tables[column.name])
+                else:
+                    df_columns[column.name] = buffer
+            return pd.DataFrame(df_columns)
+
+
+def decode_leads(data: list[dict[str, Any]]) -> pd.DataFrame:
+    """
+    Decode validated leads into a flat DataFrame in one pass.
+
+    Args:
+        data (list[dict[str, Any]]): Validated leads, as returned by `utils.validate_data`.
+
+    Returns:
+        pd.DataFrame: DataFrame with the same columns as pd.json_normalize would give,
+            with low-cardinality columns as categoricals with sorted categories.
+    """
+    buffer = LeadBuffer()
+    buffer.append(data)
+    return buffer.to_frame()
@@ -1,19 +1,31 @@
-import asyncio
+from __future__ import annotations
+
 import logging
 import sys
+from contextlib import contextmanager
 from datetime import datetime
+from pathlib import Path
 from time import perf_counter
-from typing import Annotated, Any
+from typing import TYPE_CHECKING, Annotated, Optional
 
-import pandas as pd
 import typer
 from dotenv import load_dotenv
 from rich import print
-from rich.progress import Progress, SpinnerColumn, TextColumn
 
-from myleadcli import ml, models, utils
-from myleadcli.plotting import choose_graph
-from myleadcli.tables import choose_table
+from myleadcli import options, profiling
+from myleadcli.profiling import profiled, span
+
+# pandas, httpx, pydantic and plotly are imported only by the functions which need them,
+# so --help and argument errors do not wait for them
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    import httpx
+    import pandas as pd
+    from rich.progress import Progress
+
+    from myleadcli import ml, models
+    from myleadcli.session import Session
 
 DATE_FORMATS = ["%Y-%m-%d", "%Y/%m/%d", "%d-%m-%Y", "%d/%m/%Y", "%Y.%m.%d", "%d.%m.%Y"]
 
@@ -47,13 +59,27 @@ def check_api_key(apikey: str) -> None:
         sys.exit()
 
 
-@utils.benchmark
-def process_data(data: list[dict[str, Any]]) -> pd.DataFrame:
+# target dtypes of the columns added or changed by process_data,
+# all other columns keep the dtypes of `decoder.COLUMNS`
+PROCESSED_DTYPES = {
+    "campaign_id": "category",
+    "created_at.timezone_type": "category",
+    "hour_of_day": "int64",
+    "day_of_week": "category",
+    "date": "datetime64[ns]",
+}
+
+
+@profiled
+def process_data(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Process the fetched data into a DataFrame.
+    Process the normalized leads into a DataFrame ready for statistics.
+
+    The derived columns and the dtypes of PROCESSED_DTYPES are applied in one step,
+    without copying the columns which do not change.
 
     Args:
-        data (list[dict[str, Any]]): The fetched data to be processed.
+        df (pd.DataFrame): The fetched leads as returned by `utils.get_dataframe`.
 
     Returns:
         pd.DataFrame: The processed DataFrame.
@@ -62,34 +88,335 @@ def process_data(data: list[dict[str, Any]]) -> pd.DataFrame:
         SystemExit: Raised when there is no data to process.
 
     """
-    if not data:
+    from myleadcli import utils
+
+    if df.empty:
         print("No leads to process. Exiting program")
         sys.exit()
-    df = utils.get_dataframe(data)
-    df["hour_of_day"] = df["created_at.date"].dt.hour.astype(int)
-    df["day_of_week"] = df["created_at.date"].dt.day_name()
-    df["date"] = pd.to_datetime(df["created_at.date"].dt.date)
-    columns_to_categorical = [
-        "campaign_id",
-        "campaign_name",
-        "currency",
-        "status",
-        "status_reason",
-        "country",
-        "created_at.timezone_type",
-        "created_at.timezone",
-        "user_agent.operation_system",
-        "user_agent.operation_system_version",
-        "user_agent.browser_system",
-        "user_agent.device",
-        "user_agent.device_brand",
-        "user_agent.device_model",
-        "day_of_week",
+    created_at = utils.local_datetimes(df["created_at.date"], df["created_at.timezone"])
+    columns = {column: df[column] for column in df} | utils.split_datetimes(created_at)
+    return utils.apply_dtypes(columns, PROCESSED_DTYPES)
+
+
+INTERRUPTED_EXIT_CODE = 130
+
+
+def create_progress() -> Progress:
+    """Return a transient progress display with a bar of fetched pages and the time remaining."""
+    from rich.progress import (
+        BarColumn,
+        MofNCompleteColumn,
+        Progress,
+        SpinnerColumn,
+        TextColumn,
+        TimeRemainingColumn,
+    )
+
+    return Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        MofNCompleteColumn(),
+        TimeRemainingColumn(),
+        transient=True,
+    )
+
+
+def page_progress(progress: Progress, description: str) -> ml.ProgressCallback:
+    """
+    Add a task of fetched pages and return a callback advancing it.
+
+    The total is unknown until the first page of a query arrives, so the bar
+    starts indeterminate and grows as every query reports its pages.
+
+    Args:
+        progress (Progress): The progress object for displaying progress information.
+        description (str): Description of the task.
+
+    Returns:
+        ml.ProgressCallback: Callback for `ml.iter_pages_ml` and the functions built on it.
+    """
+    task_id = progress.add_task(description=description, total=None)
+    completed = total = 0
+
+    def on_progress(done: int, found: int) -> None:
+        nonlocal completed, total
+        completed += done
+        total += found
+        progress.update(task_id, completed=completed, total=total or None)
+
+    return on_progress
+
+
+def exit_interrupted() -> None:
+    """Tell that completed pages are kept and exit after Ctrl-C."""
+    print("Interrupted. Completed pages are kept, run the same command again to resume.")
+    sys.exit(INTERRUPTED_EXIT_CODE)
+
+
+@contextmanager
+def profile_run(
+    profile_format: options.ProfileFormat | None,
+    profile_file: Path | None = None,
+) -> Iterator[None]:
+    """
+    Record the spans of a command and show them once it ends, even after an error.
+
+    Args:
+        profile_format (options.ProfileFormat | None): How the profile is shown,
+            None runs the command without profiling.
+        profile_file (Path | None, optional): File for the json and chrome formats.
+            Defaults to options.PROFILE_FILE.
+    """
+    if profile_format is None:
+        yield
+        return
+    profile = profiling.start_profile()
+    try:
+        yield
+    finally:
+        profiling.stop_profile()
+        if profile_format is options.ProfileFormat.summary:
+            profile.print_summary()
+        else:
+            path = profile_file or Path(options.PROFILE_FILE)
+            if profile_format is options.ProfileFormat.json:
+                profile.write_json(path)
+            else:
+                profile.write_chrome_trace(path)
+            print(f"Wrote the profile of the run to {path}")
+
+
+@contextmanager
+def report_request_metrics(metrics_file: Path | None = None) -> Iterator[None]:
+    """
+    Collect metrics of the API requests of a fetch and report them once it ends.
+
+    They are reported also after an error, so failing scheduled runs
+    can be told apart by their 429 counts and latency.
+
+    Args:
+        metrics_file (Path | None, optional): Prometheus textfile the metrics are written to.
+            Defaults to None (not written).
+    """
+    from myleadcli import metrics
+
+    collected = metrics.start_metrics()
+    try:
+        yield
+    finally:
+        metrics.stop_metrics()
+        if collected.requests:
+            print(collected.summary())
+        if metrics_file:
+            collected.write_textfile(metrics_file)
+
+
+async def stream_dataframe(
+    api: models.Api,
+    save_file: bool,
+    client: httpx.AsyncClient | None = None,
+    on_progress: ml.ProgressCallback | None = None,
+) -> pd.DataFrame:
+    """
+    Fetch leads from MyLead API and turn every page into a DataFrame chunk as soon as it arrives.
+
+    Validation and decoding of a page run while the remaining requests wait
+    for the rate limiter. Every page is appended to one `decoder.LeadBuffer`,
+    so no list with all fetched leads and no DataFrame per page is ever built.
+    Raw responses of completed pages are checkpointed, so a rerun after a crash
+    or a failed page fetches only the missing pages, and the saved file
+    is assembled from them without encoding the leads again.
+    New leads shift the pages while they are fetched or between a crash and
+    the rerun, so a lead seen on an earlier completed page is skipped.
+
+    Args:
+        api (models.Api): The API request data.
+        save_file (bool): Flag indicating whether to save fetched data to a file.
+        client (httpx.AsyncClient | None, optional): Client used for the requests.
+            Defaults to a new client.
+        on_progress (ml.ProgressCallback | None, optional): Called with completed and found
+            pages, see `ml.iter_pages_ml`. Defaults to None.
+
+    Returns:
+        pd.DataFrame: The normalized leads in page order, same as `utils.get_dataframe`
+            of all fetched leads.
+    """
+    from myleadcli import decoder, ml, utils
+    from myleadcli.checkpoint import Checkpoint
+
+    buffer = decoder.LeadBuffer()
+    checkpoint = Checkpoint(api)
+    lead_ids: set[str] = set()
+    async for page, conversions in ml.iter_pages_ml(
+        api,
+        client=client,
+        checkpoint=checkpoint,
+        on_progress=on_progress,
+    ):
+        valid_data = utils.validate_data(conversions, strict=False)
+        new_leads = utils.ValidatedDataList(
+            lead for lead in valid_data if lead["lead_id"] not in lead_ids
+        )
+        lead_ids.update(lead["lead_id"] for lead in new_leads)
+        buffer.append(new_leads, page)
+    if save_file:
+        pages = [checkpoint.read(ml.page_name(page)) for page in sorted(buffer.chunks)]
+        utils.pages_to_file(utils.leads_file(utils.FileFormat.json), pages)
+    checkpoint.clear()
+    return buffer.to_frame()
+
+
+class AccountsError(Exception):
+    """Raised when leads of none of the accounts could be fetched"""
+
+
+async def fetch_accounts(
+    accounts: list[models.Account],
+    date_from: datetime,
+    date_to: datetime,
+    status: models.LeadStatus | None = None,
+    on_progress: ml.ProgressCallback | None = None,
+) -> pd.DataFrame:
+    """
+    Fetch leads of several accounts concurrently through one connection pool.
+
+    The rate limit applies to every API key separately, so each account gets
+    its own learned rate limiter and the fetch takes about as long as the
+    slowest account. An account whose fetch fails, e.g. because of an invalid key,
+    is logged and left out, so the leads of the other accounts are kept.
+
+    Args:
+        accounts (list[models.Account]): Accounts to fetch.
+        date_from (datetime): The start date for fetching data.
+        date_to (datetime): The end date for fetching data.
+        status (models.LeadStatus | None, optional): Fetch only leads with this status.
+            Defaults to None.
+        on_progress (ml.ProgressCallback | None, optional): Called with completed and found
+            pages of all accounts, see `ml.iter_pages_ml`. Defaults to None.
+
+    Returns:
+        pd.DataFrame: The normalized leads of the fetched accounts with the `account`
+            categorical column holding account names, empty if there are no leads.
+
+    Raises:
+        AccountsError: Raised when the fetch failed for every account.
+    """
+    import asyncio
+
+    import httpx
+    import numpy as np
+    import pandas as pd
+
+    from myleadcli import models, utils
+
+    apis = [
+        models.Api(
+            token=account.token,
+            date_from=date_from,
+            date_to=date_to,
+            limit=500,
+            status=status.value if status else None,
+        )
+        for account in accounts
     ]
-    df = utils.convert_to_categorical(columns_to_categorical, df)
+    async with httpx.AsyncClient(http2=True) as client:
+        results = await asyncio.gather(
+            *(stream_dataframe(api, False, client, on_progress) for api in apis),
+            return_exceptions=True,
+        )
+    frames: dict[int, pd.DataFrame] = {}
+    fetched: list[str] = []
+    errors: list[Exception] = []
+    for account, result in zip(accounts, results):
+        if isinstance(result, BaseException):
+            if not isinstance(result, Exception):  # e.g. cancelled by Ctrl-C
+                raise result
+            logging.error(f"Fetching leads of account {account.name} failed: {result!r}")
+            errors.append(result)
+            continue
+        codes = np.zeros(len(result), dtype=np.int8)
+        result["account"] = pd.Categorical.from_codes(codes, [account.name])
+        frames[len(frames)] = result
+        fetched.append(account.name)
+    if not frames:
+        msg = f"Fetching leads failed for all {len(accounts)} accounts: {errors[0]!r}"
+        raise AccountsError(msg) from errors[0]
+    df = utils.concat_frames(frames)
+    if not df.empty:
+        df["account"] = df["account"].cat.set_categories(fetched)
     return df
 
 
+def sync_store(
+    api: models.Api,
+    mutable_days: int,
+    save_file: bool,
+    shard_by: options.ShardBy = options.ShardBy.auto,
+    on_progress: ml.ProgressCallback | None = None,
+) -> pd.DataFrame:
+    """
+    Fetch only days missing in the local lead store and load the requested leads from it.
+
+    The leads are loaded in batches into a `decoder.LeadBuffer`, so the dicts
+    of all leads are never in memory at once unless they are saved to a file.
+
+    Args:
+        api (models.Api): The API request data. Its status is applied to the stored leads.
+        mutable_days (int): Number of recent days always synced again.
+        save_file (bool): Flag indicating whether to save loaded data to a file.
+        shard_by (options.ShardBy, optional): How long ranges are split.
+            Defaults to options.ShardBy.auto.
+        on_progress (ml.ProgressCallback | None, optional): Called with completed and found
+            pages, see `ml.iter_pages_ml`. Defaults to None.
+
+    Returns:
+        pd.DataFrame: The normalized leads from the store.
+    """
+    import asyncio
+
+    from myleadcli import decoder, store, utils
+
+    with store.LeadStore.for_token(api.token) as lead_store:
+        asyncio.run(store.sync(lead_store, api, mutable_days, shard_by, on_progress))
+        buffer = decoder.LeadBuffer()
+        for leads in lead_store.iter_load(api.date_from, api.date_to, api.status):
+            buffer.append(leads)
+        if save_file:
+            data = lead_store.load(api.date_from, api.date_to, api.status)
+            utils.data_to_file(utils.leads_file(utils.FileFormat.json), data)
+    return buffer.to_frame()
+
+
+def fetch_sharded(
+    api: models.Api,
+    save_file: bool,
+    shard_by: options.ShardBy,
+    on_progress: ml.ProgressCallback | None = None,
+) -> pd.DataFrame:
+    """
+    Fetch leads from MyLead API in checkpointed date-range shards.
+
+    Args:
+        api (models.Api): The API request data.
+        save_file (bool): Flag indicating whether to save fetched data to a file.
+        shard_by (options.ShardBy): How the range is split.
+        on_progress (ml.ProgressCallback | None, optional): Called with completed and found
+            pages, see `ml.iter_pages_ml`. Defaults to None.
+
+    Returns:
+        pd.DataFrame: The normalized unique leads in order of shards.
+    """
+    import asyncio
+
+    from myleadcli import shards, utils
+
+    data = asyncio.run(shards.fetch_sharded(api, shard_by, on_progress=on_progress))
+    if save_file:
+        utils.data_to_file(utils.leads_file(utils.FileFormat.json), data)
+    return utils.get_dataframe(data)
+
+
 def fetch_data(
     progress: Progress,
     apikey: str,
@@ -97,7 +424,12 @@ def fetch_data(
     date_to: datetime,
     from_file: bool,
     save_file: bool,
-) -> list[dict[str, Any]]:
+    status: models.LeadStatus | None = None,
+    use_store: bool = False,
+    mutable_days: int = options.MUTABLE_DAYS,
+    shard_by: options.ShardBy = options.ShardBy.none,
+    metrics_file: Path | None = None,
+) -> pd.DataFrame:
     """
     Fetch data from MyLead API or a file.
 
@@ -108,9 +440,23 @@ def fetch_data(
         date_to (datetime): The end date for fetching data.
         from_file (bool): Flag indicating whether to fetch data from a file.
         save_file (bool): Flag indicating whether to save fetched data to a file.
+        status (models.LeadStatus | None, optional): Fetch only leads with this status,
+            leads loaded from the file are filtered locally. Defaults to None.
+        use_store (bool, optional): Flag indicating whether to sync only missing days
+            into the local lead store and read leads from it. Defaults to False.
+        mutable_days (int, optional): Number of recent days always synced again
+            when using the store. Defaults to options.MUTABLE_DAYS.
+        shard_by (options.ShardBy, optional): How long ranges are split into checkpointed
+            date-range shards. Without shards pages are streamed into the DataFrame.
+            Defaults to options.ShardBy.none.
+        metrics_file (Path | None, optional): Prometheus textfile the metrics
+            of the API requests are written to. Defaults to None.
 
     Returns:
-        list[dict[str, Any]]: The fetched data as a list of dictionaries.
+        pd.DataFrame: The fetched leads normalized into a DataFrame.
+
+    Raises:
+        SystemExit: Raised when the fetch is interrupted by Ctrl-C.
 
     Examples:
         ```python
@@ -124,53 +470,238 @@ def fetch_data(
         result = fetch_data(progress, apikey, date_from, date_to, from_file, save_file)
         print(result)
         ```"""
+    import asyncio
+
+    from myleadcli import models, utils
+
     start_time = perf_counter()
-    if not from_file:
-        progress.add_task(description="Fetching data from MyLead API...", total=None)
-        api = models.Api(token=apikey, date_from=date_from, date_to=date_to, limit=500)
-        all_data = asyncio.run(ml.fetch_all_pages_ml(api_data=api))
-        if save_file:
-            utils.data_to_file("myleadcli_leads_data.json", all_data)
-    else:
-        # TODO: fetch from specified file
-        progress.add_task(description="Fetching data from file...", total=None)
-        all_data = utils.data_from_file("myleadcli_leads_data.json")
+    api = models.Api(
+        token=apikey,
+        date_from=date_from,
+        date_to=date_to,
+        limit=500,
+        status=status.value if status else None,
+    )
+    try:
+        with report_request_metrics(metrics_file), span("fetch") as fetch_span:
+            if from_file:
+                # TODO: fetch from specified file
+                progress.add_task(description="Fetching data from file...", total=None)
+                df = utils.get_dataframe(
+                    utils.data_from_file(utils.leads_file(utils.FileFormat.json))
+                )
+                df = utils.filter_status(df, api.status)
+            elif use_store:
+                on_progress = page_progress(progress, "Syncing local store with MyLead API...")
+                df = sync_store(api, mutable_days, save_file, shard_by, on_progress)
+            elif shard_by is not options.ShardBy.none:
+                on_progress = page_progress(progress, "Fetching data from MyLead API in shards...")
+                df = fetch_sharded(api, save_file, shard_by, on_progress)
+            else:
+                on_progress = page_progress(progress, "Fetching data from MyLead API...")
+                df = asyncio.run(stream_dataframe(api, save_file, on_progress=on_progress))
+            fetch_span.items = len(df)
+    except KeyboardInterrupt:
+        progress.stop()
+        exit_interrupted()
+    end_time = perf_counter()
+    print(f"Fetched {len(df)} leads in {end_time-start_time:.2f} seconds.")
+    return df
+
+
+def load_processed_data(
+    progress: Progress,
+    status: options.LeadStatus | None = None,
+) -> pd.DataFrame:
+    """
+    Load the processed DataFrame saved in the Feather file, skipping validation.
+
+    Args:
+        progress (Progress): The progress object for displaying progress information.
+        status (options.LeadStatus | None, optional): Load only leads with this status.
+            Defaults to None.
+
+    Returns:
+        pd.DataFrame: The processed DataFrame.
+
+    Raises:
+        SystemExit: Raised when there are no leads with the status.
+    """
+    from myleadcli import utils
+
+    start_time = perf_counter()
+    progress.add_task(description="Loading data from file...", total=None)
+    with span("load") as load_span:
+        df = utils.dataframe_from_file(utils.leads_file(utils.FileFormat.feather))
+        df = utils.filter_status(df, status.value if status else None)
+        load_span.items = len(df)
     end_time = perf_counter()
-    print(f"Fetched {len(all_data)} leads in {end_time-start_time:.2f} seconds.")
-    return all_data
+    print(f"Loaded {len(df)} leads in {end_time-start_time:.2f} seconds.")
+    if df.empty:
+        print("No leads to process. Exiting program")
+        sys.exit()
+    return df
+
+
+DateFrom = Annotated[
+    datetime,
+    typer.Option(
+        "--date-from",
+        "-df",
+        help="Start date for gathering data. Default: 365 days ago.",
+        formats=DATE_FORMATS,
+        default_factory=options.one_year_ago_day,
+    ),
+]
+ApiKey = Annotated[
+    str,
+    typer.Argument(
+        envvar="API_KEY",
+        help="Your api key from https://mylead.global/panel/api",
+    ),
+]
+DateTo = Annotated[
+    datetime,
+    typer.Option(
+        "--date-to",
+        "-dt",
+        help="End date for gathering data. Default: today",
+        formats=DATE_FORMATS,
+    ),
+]
+FromFile = Annotated[bool, typer.Option(help="Load leads from file")]
+FileFormatOption = Annotated[
+    options.FileFormat,
+    typer.Option(help="Format of the file used by --save-file and --from-file"),
+]
+StatusOption = Annotated[
+    Optional[options.LeadStatus],  # noqa: UP007 typer does not support X | None
+    typer.Option(help="Show only leads with this status"),
+]
+UseStore = Annotated[
+    bool,
+    typer.Option(
+        "--store/--no-store",
+        help="Keep leads in a local store and fetch only days missing in it",
+    ),
+]
+MutableDays = Annotated[
+    int,
+    typer.Option(help="Number of recent days fetched again, as their statuses can change"),
+]
+ShardByOption = Annotated[
+    options.ShardBy,
+    typer.Option(help="Split long fetches into resumable date-range shards"),
+]
+ProfileOption = Annotated[
+    Optional[options.ProfileFormat],  # noqa: UP007 typer does not support X | None
+    typer.Option(
+        help="Measure time and memory of every stage and show them as a summary table, "
+        "a JSON file or a Chrome trace",
+    ),
+]
+ProfileFile = Annotated[
+    Optional[Path],  # noqa: UP007 typer does not support X | None
+    typer.Option(help="File of the json and chrome profiles"),
+]
+MetricsFile = Annotated[
+    Optional[Path],  # noqa: UP007 typer does not support X | None
+    typer.Option(
+        help="Write metrics of the API requests to this Prometheus textfile (.prom), "
+        "e.g. in the directory of the node exporter textfile collector",
+    ),
+]
+
+
+def get_session(
+    apikey: str,
+    date_from: datetime,
+    date_to: datetime,
+    save_file: bool,
+    from_file: bool,
+    file_format: options.FileFormat,
+    status: options.LeadStatus | None,
+    use_store: bool,
+    mutable_days: int,
+    shard_by: options.ShardBy,
+    metrics_file: Path | None = None,
+) -> Session:
+    """
+    Load or fetch leads, process them and aggregate them into a session.
+
+    Args:
+        apikey (str): The API key for accessing the MyLead API.
+        date_from (datetime): The start date for fetching data.
+        date_to (datetime): The end date for fetching data.
+        save_file (bool): Flag indicating whether to save leads to a file.
+        from_file (bool): Flag indicating whether to load leads from a file.
+        file_format (options.FileFormat): Format of the saved file.
+        status (options.LeadStatus | None): Fetch only leads with this status.
+        use_store (bool): Flag indicating whether to use the local lead store.
+        mutable_days (int): Number of recent days always synced again.
+        shard_by (options.ShardBy): How long fetches are split into date-range shards.
+        metrics_file (Path | None, optional): Prometheus textfile the metrics
+            of the API requests are written to. Defaults to None.
+
+    Returns:
+        Session: The session with aggregated leads.
+
+    Raises:
+        SystemExit: Raised when the API key is missing or there are no leads.
+    """
+    check_api_key(apikey)
+
+    from myleadcli import utils
+    from myleadcli.session import Session
+
+    with create_progress() as progress:
+        if from_file and file_format is options.FileFormat.feather:
+            df = load_processed_data(progress, status)
+        else:
+            json_file = file_format is options.FileFormat.json
+            df = fetch_data(
+                progress,
+                apikey,
+                date_from,
+                date_to,
+                from_file,
+                save_file and json_file,
+                status,
+                use_store,
+                mutable_days,
+                shard_by,
+                metrics_file,
+            )
+            df = process_data(df)
+            if save_file and not json_file:
+                utils.dataframe_to_file(utils.leads_file(file_format), df)
+    return Session(df)
 
 
 @app.command()
 def stats(
-    date_from: Annotated[
-        datetime,
-        typer.Option(
-            "--date-from",
-            "-df",
-            help="Start date for gathering data. Default: 365 days ago.",
-            formats=DATE_FORMATS,
-            default_factory=utils.one_year_ago_day,
-        ),
-    ],
-    apikey: Annotated[
-        str,
-        typer.Argument(
-            envvar="API_KEY",
-            help="Your api key from https://mylead.global/panel/api",
-        ),
-    ] = "",
-    date_to: Annotated[
-        datetime,
-        typer.Option(
-            "--date-to",
-            "-dt",
-            help="End date for gathering data. Default: today",
-            formats=DATE_FORMATS,
-        ),
-    ] = datetime.now(),
+    date_from: DateFrom,
+    apikey: ApiKey = "",
+    date_to: DateTo = datetime.now(),
     save_file: Annotated[bool, typer.Option(help="Save leads to file")] = False,
-    from_file: Annotated[bool, typer.Option(help="Load leads from file")] = False,
+    from_file: FromFile = False,
+    file_format: FileFormatOption = options.FileFormat.feather,
     charts: Annotated[bool, typer.Option(help="Show charts instead of tables")] = False,
+    status: StatusOption = None,
+    use_store: UseStore = True,
+    mutable_days: MutableDays = options.MUTABLE_DAYS,
+    shard_by: ShardByOption = options.ShardBy.auto,
+    top: Annotated[
+        int,
+        typer.Option(help="Show only the top N rows of tables, the rest summed as Other"),
+    ] = 0,
+    page_size: Annotated[
+        int,
+        typer.Option(help="Print tables in pages of this many rows, 0 for one table"),
+    ] = 0,
+    profile: ProfileOption = None,
+    profile_file: ProfileFile = None,
+    metrics_file: MetricsFile = None,
 ) -> None:
     """
     Shows statistics for data retrieved from the MyLead API.
@@ -180,9 +711,23 @@ def stats(
 
     When the --chart option is used, data is visualized through charts instead of tables.
 
-    If the --save-file option is used, fetched data is saved as a JSON file.
+    If the --save-file option is used, processed data is saved as a Feather file,
+    or fetched data is exported as a JSON file with --file-format json.
     Alternatively, you can use --from-file to load data from a previously saved file.
 
+    Fetched leads are kept in a local store, so next runs fetch only missing days
+    and the last --mutable-days days, whose statuses can still change.
+    Use --no-store to always fetch everything from the API.
+    Long fetches are split into date-range shards (--shard-by) and every completed
+    shard is kept, so an interrupted fetch resumes from the shards not done yet.
+
+    Long tables can be shortened with --top, the remaining rows are summed as Other,
+    or printed in pages of --page-size rows.
+
+    Use --profile to see where the time and memory of the run are spent.
+    A summary of the API requests is printed after every fetch, use --metrics-file
+    to export them for Prometheus.
+
     Due to API rate limiting the maximum fetching speed is 10,000 leads per 60 seconds.
 
     Args:
@@ -191,27 +736,240 @@ def stats(
         apikey (str): Your API key from https://mylead.global/panel/api.
         save_file (bool): Save leads to file.
         from_file (bool): Load leads from file.
+        file_format (options.FileFormat): Format of the saved file.
         charts (bool): Show charts instead of tables.
+        status (options.LeadStatus | None): Show only leads with this status.
+        use_store (bool): Keep leads in a local store and fetch only missing days.
+        mutable_days (int): Number of recent days fetched again.
+        shard_by (options.ShardBy): How long fetches are split into date-range shards.
+        top (int): Show only the top N rows of tables.
+        page_size (int): Print tables in pages of this many rows.
+        profile (options.ProfileFormat | None): Show the time and memory of every stage.
+        profile_file (Path | None): File of the json and chrome profiles.
+        metrics_file (Path | None): Prometheus textfile of the API request metrics.
 
     Returns:
         None
     """
-    check_api_key(apikey)
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[progress.description]{task.description}"),
-        transient=True,
-    ) as progress:
-        all_data = fetch_data(
-            progress,
+    with profile_run(profile, profile_file):
+        session = get_session(
             apikey,
             date_from,
             date_to,
-            from_file,
             save_file,
+            from_file,
+            file_format,
+            status,
+            use_store,
+            mutable_days,
+            shard_by,
+            metrics_file,
+        )
+        if charts:
+            from myleadcli.plotting import choose_graph
+
+            choose_graph(session)
+        else:
+            from myleadcli.tables import choose_table
+
+            choose_table(session, top_n=top, page_size=page_size)
+
+
+@app.command()
+def accounts(
+    date_from: DateFrom,
+    keys: Annotated[
+        str,
+        typer.Option(
+            envvar="API_KEYS",
+            help="Comma separated API keys, each optionally as name=key",
+        ),
+    ] = "",
+    keys_file: Annotated[
+        Optional[Path],  # noqa: UP007 typer does not support X | None
+        typer.Option(help="File with one API key per line, each optionally as name=key"),
+    ] = None,
+    date_to: DateTo = datetime.now(),
+    save_file: Annotated[bool, typer.Option(help="Save processed leads to file")] = False,
+    charts: Annotated[bool, typer.Option(help="Show charts instead of tables")] = False,
+    status: StatusOption = None,
+    top: Annotated[
+        int,
+        typer.Option(help="Show only the top N rows of tables, the rest summed as Other"),
+    ] = 0,
+    page_size: Annotated[
+        int,
+        typer.Option(help="Print tables in pages of this many rows, 0 for one table"),
+    ] = 0,
+    profile: ProfileOption = None,
+    profile_file: ProfileFile = None,
+    metrics_file: MetricsFile = None,
+) -> None:
+    """
+    Shows statistics for data of several MyLead accounts retrieved at once.
+
+    API keys are read from --keys-file or from --keys / the API_KEYS environment variable.
+    A key can be given a name shown in statistics as name=key, otherwise
+    the account is named by a hash of its key.
+
+    All accounts are fetched concurrently through one connection pool, each with
+    its own rate limit, so it takes about as long as fetching the biggest account.
+    A table by account is shown first, followed by the statistics menu
+    with leads of all accounts. Accounts whose fetch fails are logged and left out,
+    the command fails only when the fetch failed for every account.
+
+    Args:
+        date_from (datetime): Start date for gathering data. Default: 365 days ago.
+        keys (str): Comma separated API keys.
+        keys_file (Path | None): File with one API key per line.
+        date_to (datetime): End date for gathering data. Default: today.
+        save_file (bool): Save processed leads to a Feather file.
+        charts (bool): Show charts instead of tables.
+        status (options.LeadStatus | None): Show only leads with this status.
+        top (int): Show only the top N rows of tables.
+        page_size (int): Print tables in pages of this many rows.
+        profile (options.ProfileFormat | None): Show the time and memory of every stage.
+        profile_file (Path | None): File of the json and chrome profiles.
+        metrics_file (Path | None): Prometheus textfile of the API request metrics.
+
+    Returns:
+        None
+    """
+    import asyncio
+
+    from myleadcli import utils
+    from myleadcli.session import DIMENSIONS, Session
+    from myleadcli.tables import choose_table, table_from_data
+
+    with profile_run(profile, profile_file):
+        try:
+            account_list = utils.parse_accounts(keys_file.read_text() if keys_file else keys)
+        except (OSError, ValueError) as e:
+            print(f"Unable to read API keys: {e}")
+            sys.exit()
+        if not account_list:
+            print(
+                "Missing API Keys: Ensure you supply them in a file or via an environment variable"
+            )
+            sys.exit()
+        with create_progress() as progress:
+            on_progress = page_progress(
+                progress,
+                f"Fetching data of {len(account_list)} accounts from MyLead API...",
+            )
+            start_time = perf_counter()
+            try:
+                with report_request_metrics(metrics_file), span("fetch") as fetch_span:
+                    df = asyncio.run(
+                        fetch_accounts(account_list, date_from, date_to, status, on_progress),
+                    )
+                    fetch_span.items = len(df)
+            except KeyboardInterrupt:
+                progress.stop()
+                exit_interrupted()
+            except AccountsError as e:
+                progress.stop()
+                print(f"{e}. Check the API keys and run the command again.")
+                sys.exit(1)
+            end_time = perf_counter()
+        print(
+            f"Fetched {len(df)} leads of {len(account_list)} accounts "
+            f"in {end_time-start_time:.2f} seconds.",
+        )
+        df = process_data(df)
+        if save_file:
+            utils.dataframe_to_file(utils.leads_file(utils.FileFormat.feather), df)
+        session = Session(df, [*DIMENSIONS, "account"])
+        if charts:
+            from myleadcli.plotting import choose_graph
+
+            choose_graph(session)
+        else:
+            table_from_data(
+                session,
+                title="Statistics by account.",
+                group_by_column="account",
+                column_name="Account",
+                top_n=top,
+                page_size=page_size,
+            )
+            choose_table(session, top_n=top, page_size=page_size)
+
+
+@app.command()
+def report(
+    date_from: DateFrom,
+    apikey: ApiKey = "",
+    date_to: DateTo = datetime.now(),
+    from_file: FromFile = False,
+    file_format: FileFormatOption = options.FileFormat.feather,
+    status: StatusOption = None,
+    use_store: UseStore = True,
+    mutable_days: MutableDays = options.MUTABLE_DAYS,
+    shard_by: ShardByOption = options.ShardBy.auto,
+    output_dir: Annotated[
+        Path,
+        typer.Option("--output-dir", "-o", help="Directory for the report files"),
+    ] = Path(options.REPORT_DIR),
+    formats: Annotated[
+        Optional[list[options.ReportFormat]],  # noqa: UP007 typer does not support X | None
+        typer.Option("--format", help="Format of the report, can be repeated. Default: all"),
+    ] = None,
+    charts: Annotated[bool, typer.Option(help="Write also charts as HTML files")] = False,
+    profile: ProfileOption = None,
+    profile_file: ProfileFile = None,
+    metrics_file: MetricsFile = None,
+) -> None:
+    """
+    Writes all statistics for data retrieved from the MyLead API into files.
+
+    Every table of the stats command is written as JSON, CSV and HTML
+    into --output-dir without any prompts, so it can run from scheduled jobs.
+    Use --format to choose the formats and --charts to write also all charts.
+    Leads are loaded the same way as in the stats command.
+
+    Args:
+        date_from (datetime): Start date for gathering data. Default: 365 days ago.
+        date_to (datetime): End date for gathering data. Default: today.
+        apikey (str): Your API key from https://mylead.global/panel/api.
+        from_file (bool): Load leads from file.
+        file_format (options.FileFormat): Format of the saved file.
+        status (options.LeadStatus | None): Report only leads with this status.
+        use_store (bool): Keep leads in a local store and fetch only missing days.
+        mutable_days (int): Number of recent days fetched again.
+        shard_by (options.ShardBy): How long fetches are split into date-range shards.
+        output_dir (Path): Directory for the report files.
+        formats (list[options.ReportFormat] | None): Formats of the report.
+        charts (bool): Write also charts as HTML files.
+        profile (options.ProfileFormat | None): Show the time and memory of every stage.
+        profile_file (Path | None): File of the json and chrome profiles.
+        metrics_file (Path | None): Prometheus textfile of the API request metrics.
+
+    Returns:
+        None
+    """
+    with profile_run(profile, profile_file):
+        session = get_session(
+            apikey,
+            date_from,
+            date_to,
+            False,
+            from_file,
+            file_format,
+            status,
+            use_store,
+            mutable_days,
+            shard_by,
+            metrics_file,
+        )
+        from myleadcli import report as report_module
+
+        paths = report_module.write_report(
+            session,
+            output_dir,
+            formats or list(options.ReportFormat),
+            charts,
+        )
+        print(
+            f"Wrote {len(paths)} report files with {session.num_of_leads()} leads to {output_dir}"
         )
-    df = process_data(all_data)
-    if charts:
-        choose_graph(df)
-    else:
-        choose_table(df)
@@ -0,0 +1,246 @@
+"""
+Module collecting metrics of the HTTP requests to the MyLead API.
+Every request records its latency, response size and status code, every retry
+its reason and the time slept before it, and every request the time it waited
+for the rate limiter. They tell whether a slow fetch is spent in the API,
+in rate limiting or in our own processing. Metrics are collected only while
+started, e.g. during a fetch of the CLI, which reports them when the fetch ends
+and can write them as a Prometheus textfile for the node exporter.
+"""
+import os
+import time
+from bisect import bisect_left
+from collections import Counter
+from pathlib import Path
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)  # seconds
+SIZE_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)  # bytes
+PREFIX = "myleadcli_"
+MIB = 2**20
+NO_RESPONSE = "error"  # status of requests failed without a response, e.g. on a timeout
+
+
+class Histogram:
+    """
+    Counts of observed values in buckets of upper bounds, as in Prometheus.
+
+    Args:
+        buckets (tuple[float, ...]): Sorted upper bounds, the +Inf bucket is added.
+    """
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile of the observed values.
+
+        Values are assumed to be spread evenly within their bucket,
+        like `histogram_quantile` of Prometheus does.
+
+        Args:
+            q (float): The quantile, between 0 and 1.
+
+        Returns:
+            float: The estimated value, 0 when nothing was observed.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        below = 0
+        for index, count in enumerate(self.counts):
+            if count and below + count >= rank:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                return lower + (upper - lower) * (rank - below) / count
+            below += count
+        return self.max
+
+    def lines(self, name: str) -> list[str]:
+        """Return the samples of the histogram in the Prometheus text format."""
+        lines = []
+        cumulative = 0
+        for bound, count in zip([*self.buckets, "+Inf"], self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum {self.sum}")
+        lines.append(f"{name}_count {self.count}")
+        return lines
+
+
+class RequestMetrics:
+    """Metrics of the API requests made while the collection is active, see `start_metrics`."""
+
+    def __init__(self) -> None:
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.size = Histogram(SIZE_BUCKETS)
+        self.statuses: Counter[str] = Counter()
+        self.retries: Counter[str] = Counter()
+        self.retry_sleep = 0.0  # seconds slept before retries
+        self.rate_limit_wait = 0.0  # seconds requests waited for the rate limiter
+
+    @property
+    def requests(self) -> int:
+        return self.latency.count
+
+    def summary(self) -> str:
+        """
+        Describe the requests in one line.
+
+        Returns:
+            str: Number of requests by status, median and 95th percentile latency,
+                received data, retries and time spent sleeping and rate limited.
+        """
+        statuses = ", ".join(
+            f"{status}: {count}" for status, count in sorted(self.statuses.items())
+        )
+        return (
+            f"Made {self.requests} requests ({statuses}), "
+            f"latency {self.latency.quantile(0.5):.2f} s median, "
+            f"{self.latency.quantile(0.95):.2f} s p95, "
+            f"received {self.size.sum / MIB:.1f} MiB, "
+            f"{sum(self.retries.values())} retries slept {self.retry_sleep:.1f} s, "
+            f"waited {self.rate_limit_wait:.1f} s for the rate limit."
+        )
+
+    def to_prometheus(self) -> str:
+        """
+        Return the metrics in the Prometheus text format read by the node exporter.
+
+        Returns:
+            str: Histograms of latency and response size, counters of requests by status,
+                retries by reason, seconds slept and rate limited, and the time of the export.
+        """
+        metrics: list[tuple[str, str, str, list[str]]] = [
+            (
+                "http_request_duration_seconds",
+                "histogram",
+                "Latency of requests to the MyLead API.",
+                self.latency.lines(f"{PREFIX}http_request_duration_seconds"),
+            ),
+            (
+                "http_response_size_bytes",
+                "histogram",
+                "Size of response bodies of the MyLead API.",
+                self.size.lines(f"{PREFIX}http_response_size_bytes"),
+            ),
+            (
+                "http_requests_total",
+                "counter",
+                "Requests to the MyLead API by status code.",
+                [
+                    f'{PREFIX}http_requests_total{{code="{status}"}} {count}'
+                    for status, count in sorted(self.statuses.items())
+                ],
+            ),
+            (
+                "http_retries_total",
+                "counter",
+                "Retried requests by reason.",
+                [
+                    f'{PREFIX}http_retries_total{{reason="{reason}"}} {count}'
+                    for reason, count in sorted(self.retries.items())
+                ],
+            ),
+            (
+                "http_retry_sleep_seconds_total",
+                "counter",
+                "Seconds slept before retries.",
+                [f"{PREFIX}http_retry_sleep_seconds_total {self.retry_sleep}"],
+            ),
+            (
+                "rate_limit_wait_seconds_total",
+                "counter",
+                "Seconds requests waited for the rate limiter.",
+                [f"{PREFIX}rate_limit_wait_seconds_total {self.rate_limit_wait}"],
+            ),
+            (
+                "last_run_timestamp_seconds",
+                "gauge",
+                "Unix time the metrics were written.",
+                [f"{PREFIX}last_run_timestamp_seconds {time.time()}"],
+            ),
+        ]
+        lines = []
+        for name, kind, help_text, samples in metrics:
+            lines.append(f"# HELP {PREFIX}{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}{name} {kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: Path) -> None:
+        """
+        Write the metrics into a textfile of the node exporter textfile collector.
+
+        The file is replaced atomically, so the exporter never reads a partial file.
+
+        Args:
+            path (Path): The file, it should end with .prom.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(f".{path.name}.{os.getpid()}")
+        temporary.write_text(self.to_prometheus(), encoding="utf-8")
+        temporary.replace(path)
+
+
+_metrics: RequestMetrics | None = None
+
+
+def start_metrics() -> RequestMetrics:
+    """Start collecting metrics of the requests into new metrics and return them."""
+    global _metrics
+    _metrics = RequestMetrics()
+    return _metrics
+
+
+def stop_metrics() -> RequestMetrics | None:
+    """Stop collecting metrics and return the metrics which were collected, if any."""
+    global _metrics
+    metrics, _metrics = _metrics, None
+    return metrics
+
+
+def record_request(latency: float, status: int | str, size: int = 0) -> None:
+    """
+    Record a completed request.
+
+    Args:
+        latency (float): Seconds from sending the request to reading the response.
+        status (int | str): Status code, NO_RESPONSE when the request failed without one.
+        size (int, optional): Bytes of the response body. Defaults to 0.
+    """
+    if _metrics is None:
+        return
+    _metrics.latency.observe(latency)
+    _metrics.size.observe(size)
+    _metrics.statuses[str(status)] += 1
+
+
+def record_retry(reason: str, sleep: float = 0.0) -> None:
+    """
+    Record a request which is going to be retried.
+
+    Args:
+        reason (str): Why it is retried, e.g. "rate_limited".
+        sleep (float, optional): Seconds slept before the retry. Defaults to 0.0.
+    """
+    if _metrics is None:
+        return
+    _metrics.retries[reason] += 1
+    _metrics.retry_sleep += sleep
+
+
+def record_rate_limit_wait(seconds: float) -> None:
+    """Record the time a request waited for the rate limiter."""
+    if _metrics is not None:
+        _metrics.rate_limit_wait += seconds
@@ -1,12 +1,25 @@
 import asyncio
 import logging
+from collections.abc import AsyncIterator, Callable
+from contextlib import aclosing, asynccontextmanager
 from math import ceil
+from time import perf_counter
 from typing import Any
 
 import httpx
-from tenacity import retry, retry_if_exception, stop_after_attempt, wait_fixed
+import orjson
+from tenacity import (
+    RetryCallState,
+    RetryError,
+    retry,
+    retry_if_exception,
+    stop_after_attempt,
+)
 
-from myleadcli import models
+from myleadcli import metrics, models, ratelimit
+from myleadcli.checkpoint import Checkpoint
+from myleadcli.profiling import span
+from myleadcli.ratelimit import RateLimiter
 
 
 class StatusError(Exception):
@@ -15,8 +28,35 @@ class StatusError(Exception):
 
 BASE_URL = "https://mylead.global/api/external/v1/statistic/conversions"
 RATE_LIMIT = 19  # rate limit is 20 per one minute for this API endpoint
+RATE_LIMIT_PERIOD = 61  # seconds, one minute with a safety margin
 SLEEP_TIME = 61  # seconds
 RETRY_ATTEMPTS = 7
+PAGE_ATTEMPTS = 3  # requests of a page failing with a transient error, see `is_transient`
+WORKERS = 8  # concurrent page requests, the rate limiter decides when they are sent
+REQUEST_TIMEOUT = 30  # seconds
+RETRY_PRIORITY = 0  # failed pages are requested again before pages not requested yet
+PAGE_PRIORITY = 1
+# errors of a failed page, the remaining pages are still fetched
+FETCH_ERRORS = (httpx.HTTPError, StatusError, RetryError)
+
+Page = tuple[int, list[dict[str, Any]]]
+
+
+class PageResponse(dict[str, Any]):
+    """
+    JSON response of one page which keeps the raw bytes it was parsed from,
+    so they can be checkpointed or saved without encoding the page again.
+
+    Args:
+        content (bytes): Body of the response.
+    """
+
+    def __init__(self, content: bytes) -> None:
+        super().__init__(orjson.loads(content))
+        self.content = content
+
+
+ProgressCallback = Callable[[int, int], None]  # (newly completed pages, newly found pages)
 
 
 # Define a function to check if the status code is 429 (Too Many Requests).
@@ -34,6 +74,37 @@ def retry_if_status_code_is_429(exception: BaseException) -> bool:
     return isinstance(exception, httpx.HTTPStatusError) and exception.response.status_code == 429
 
 
+# Define a function to wait as long as the server asks after a 429 response.
+def wait_for_rate_limit(retry_state: RetryCallState) -> float:
+    """
+    Return the time to wait before retrying a rate limited request.
+
+    Args:
+        retry_state (RetryCallState): The state of the tenacity retry.
+
+    Returns:
+        float: Seconds from the rate limit headers of the response, SLEEP_TIME when missing.
+    """
+    exception = retry_state.outcome.exception() if retry_state.outcome else None
+    if isinstance(exception, httpx.HTTPStatusError):
+        delay = ratelimit.retry_delay(exception.response.headers)
+        if delay is not None:
+            return delay
+    return SLEEP_TIME
+
+
+# Define a function to record a rate limited request before tenacity sleeps.
+def record_rate_limited_retry(retry_state: RetryCallState) -> None:
+    """
+    Record a request retried after a 429 response and the time slept before the retry.
+
+    Args:
+        retry_state (RetryCallState): The state of the tenacity retry.
+    """
+    sleep = retry_state.next_action.sleep if retry_state.next_action else 0.0
+    metrics.record_retry("rate_limited", sleep)
+
+
 # Define a function to handle HTTP status errors and log messages.
 def handle_http_status_error(e: httpx.HTTPStatusError, page: int) -> None:
     """
@@ -56,10 +127,11 @@ def handle_http_status_error(e: httpx.HTTPStatusError, page: int) -> None:
         info = e.response.json()
         logging.error(f"Wrong parameters of API call.  {info['errors']}")
     elif e.response.status_code == 429:
-        info = e.response.json()
+        delay = ratelimit.retry_delay(e.response.headers)
         logging.error(
             "Too many API calls in a short amount of time. "
-            f"Will try to retry page n.{page} for {RETRY_ATTEMPTS} times in total.",
+            f"Will try to retry page n.{page} for {RETRY_ATTEMPTS} times in total "
+            f"after {SLEEP_TIME if delay is None else delay:.0f} seconds.",
         )
     else:
         logging.error(f"An unexpected HTTP error occurred: {e}")
@@ -70,23 +142,32 @@ def handle_http_status_error(e: httpx.HTTPStatusError, page: int) -> None:
 @retry(
     retry=retry_if_exception(retry_if_status_code_is_429),
     stop=stop_after_attempt(RETRY_ATTEMPTS),
-    wait=wait_fixed(SLEEP_TIME),
+    wait=wait_for_rate_limit,
+    before_sleep=record_rate_limited_retry,
 )
 async def fetch_single_page(
     client: httpx.AsyncClient,
     api_data: models.Api,
     page: int,
-) -> dict[str, Any]:
+    rate_limiter: RateLimiter | None = None,
+) -> PageResponse:
     """
     Fetches a single page of data from the API.
 
+    The body is parsed with orjson straight from the response bytes, which are kept.
+    Latency, size and status of the response and the time spent waiting
+    for the rate limiter are recorded in `metrics`.
+
     Args:
         client (httpx.AsyncClient): The HTTP async client used for making requests.
         api_data (models.Api): The API request data.
         page (int): The page number to fetch.
+        rate_limiter (RateLimiter | None, optional): Limiter every attempt has to pass
+            before the request is sent. It is adjusted to the rate limit headers
+            of the response. Defaults to None.
 
     Returns:
-        dict[str, Any]: The JSON response data.
+        PageResponse: The JSON response data.
 
     Raises:
         httpx.HTTPStatusError: Raised when an HTTP status error occurs.
@@ -95,52 +176,282 @@ async def fetch_single_page(
 
     params = api_data.model_dump(exclude_none=True)
     params["page"] = page
-    try:
-        response = await client.get(
-            BASE_URL,
-            headers={"Accept": "application/json"},
-            params=params,
-        )
-        response.raise_for_status()
-    except httpx.HTTPStatusError as e:
-        handle_http_status_error(e, page)
-        raise
-    json_data = response.json()
-    if json_data["status"] != "success":
-        msg = f"Response: {json_data}"
-        raise StatusError(msg)
+    if rate_limiter is not None:
+        wait_start = perf_counter()
+        await rate_limiter.acquire()
+        metrics.record_rate_limit_wait(perf_counter() - wait_start)
+    with span("page_request") as current:
+        try:
+            request_start = perf_counter()
+            try:
+                response = await client.get(
+                    BASE_URL,
+                    headers={"Accept": "application/json"},
+                    params=params,
+                    timeout=REQUEST_TIMEOUT,
+                )
+            except httpx.TransportError:
+                metrics.record_request(perf_counter() - request_start, metrics.NO_RESPONSE)
+                raise
+            metrics.record_request(
+                perf_counter() - request_start,
+                response.status_code,
+                len(response.content),
+            )
+            if rate_limiter is not None:
+                rate_limiter.update_from_headers(response.headers)
+                if response.status_code == 429:
+                    rate_limiter.on_rate_limited(ratelimit.retry_delay(response.headers))
+            response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            handle_http_status_error(e, page)
+            raise
+        json_data = PageResponse(response.content)
+        if json_data["status"] != "success":
+            msg = f"Response: {json_data}"
+            raise StatusError(msg)
+        current.items = len(json_data["data"][0]["conversions"])
     return json_data
 
 
-async def fetch_all_pages_ml(api_data: models.Api) -> list[dict[str, Any]]:
+@asynccontextmanager
+async def learned_rate_limiter(token: str) -> AsyncIterator[RateLimiter]:
     """
-    Fetches all pages of data from the ML API asy.
+    Provide a rate limiter starting from the limit learned in previous runs for the token.
+
+    Only a limit confirmed by the X-RateLimit-Limit header or by a run without
+    429 responses is remembered for the next run. A limit lowered by guessing
+    after 429 responses is not, so a temporary slowdown does not outlive the run.
 
     Args:
-        api_data (models.Api): The API request data.
+        token (str): The API token the limit applies to.
+
+    Yields:
+        RateLimiter: Limiter of the learned limit or RATE_LIMIT requests
+            per RATE_LIMIT_PERIOD seconds.
+    """
+    learned_limit = ratelimit.load_rate_limit(token) or RATE_LIMIT
+    rate_limiter = RateLimiter(learned_limit, RATE_LIMIT_PERIOD)
+    try:
+        yield rate_limiter
+    finally:
+        confirmed_limit = rate_limiter.confirmed_limit
+        if confirmed_limit is None and not rate_limiter.rate_limited:
+            confirmed_limit = rate_limiter.max_calls
+        if confirmed_limit is not None and confirmed_limit != learned_limit:
+            ratelimit.save_rate_limit(token, confirmed_limit)
+
+
+def is_transient(exception: BaseException) -> bool:
+    """
+    Check if a failed page is worth requesting again.
+
+    Args:
+        exception (BaseException): The exception the page failed with.
 
     Returns:
-        list[dict[str, Any]]: The list of all data retrieved from the API."""
-    all_data = []
+        bool: True for network errors, server errors and exhausted 429 retries.
+    """
+    if isinstance(exception, httpx.HTTPStatusError):
+        return exception.response.status_code == 429 or exception.response.is_server_error
+    return isinstance(exception, httpx.TransportError | RetryError)
+
+
+def page_name(page: int) -> str:
+    """Return the name of the checkpoint part of a page."""
+    return f"page-{page}"
+
+
+async def _fetch_page(
+    client: httpx.AsyncClient,
+    api_data: models.Api,
+    page: int,
+    rate_limiter: RateLimiter,
+    checkpoint: Checkpoint | None = None,
+) -> Page:
+    """Fetch a single page, save its response to the checkpoint and return its conversions."""
+    response = await fetch_single_page(client, api_data, page, rate_limiter)
+    if checkpoint is not None:
+        checkpoint.write(page_name(page), response.content)
+    return page, response["data"][0]["conversions"]
+
 
-    async with httpx.AsyncClient(http2=True) as client:
+async def _page_worker(
+    queue: asyncio.PriorityQueue[tuple[int, int, int]],
+    results: asyncio.Queue[Page | Exception],
+    client: httpx.AsyncClient,
+    api_data: models.Api,
+    rate_limiter: RateLimiter,
+    checkpoint: Checkpoint | None,
+) -> None:
+    """
+    Fetch pages from the queue until cancelled.
+
+    A page failing with a transient error is put back into the queue ahead of
+    pages not requested yet, up to PAGE_ATTEMPTS times. Every page ends up
+    in the results, either fetched or with the error it failed with, including
+    unexpected errors like an invalid body, so the consumer never waits for a page
+    of a dead worker.
+    """
+    while True:
+        _, page, attempt = await queue.get()
+        try:
+            results.put_nowait(await _fetch_page(client, api_data, page, rate_limiter, checkpoint))
+        except Exception as e:  # re-raised by the consumer
+            if attempt < PAGE_ATTEMPTS and is_transient(e):
+                logging.warning(f"Fetching page n.{page} failed, requesting it again: {e!r}")
+                metrics.record_retry("transient")
+                queue.put_nowait((RETRY_PRIORITY, page, attempt + 1))
+            else:
+                logging.error(f"Fetching page n.{page} failed: {e!r}")
+                results.put_nowait(e)
+        finally:
+            queue.task_done()
+
+
+async def iter_pages_ml(
+    api_data: models.Api,
+    rate_limiter: RateLimiter | None = None,
+    client: httpx.AsyncClient | None = None,
+    first_page: PageResponse | None = None,
+    checkpoint: Checkpoint | None = None,
+    on_progress: ProgressCallback | None = None,
+) -> AsyncIterator[Page]:
+    """
+    Fetches all pages of data from the ML API and yields them as soon as they arrive.
+
+    The first page is always yielded first, the remaining pages in order of completion.
+    The remaining pages are fetched by a pool of WORKERS workers taking page numbers
+    from a priority queue, so a slow page holds up only its worker. Every request,
+    including the first one, goes through the rate limiter and has REQUEST_TIMEOUT.
+    A failed page does not stop the other pages, its error is raised
+    once all of them are complete. When the iteration is stopped or cancelled,
+    e.g. by Ctrl-C, all workers are cancelled before it returns.
+
+    Args:
+        api_data (models.Api): The API request data.
+        rate_limiter (RateLimiter | None, optional): Limiter shared by all requests.
+            Defaults to the `learned_rate_limiter` of the token.
+        client (httpx.AsyncClient | None, optional): Client whose connection pool is used,
+            it can be shared by fetches of several accounts. Defaults to a new client.
+        first_page (PageResponse | None, optional): Response of the first page if it was
+            already fetched, e.g. to plan the fetch. Defaults to None.
+        checkpoint (Checkpoint | None, optional): Checkpoint of the query. Raw responses
+            of completed pages are saved to it and pages saved by an interrupted run
+            are not fetched again. Defaults to None.
+        on_progress (ProgressCallback | None, optional): Called with the number of newly
+            completed pages and the number of newly found pages. Defaults to None.
+
+    Yields:
+        Page: Page number and the list of conversions on that page."""
+    if rate_limiter is None:
+        async with learned_rate_limiter(api_data.token) as rate_limiter, aclosing(
+            iter_pages_ml(api_data, rate_limiter, client, first_page, checkpoint, on_progress)
+        ) as pages:
+            async for page in pages:
+                yield page
+        return
+    if client is None:
+        async with httpx.AsyncClient(http2=True) as client, aclosing(
+            iter_pages_ml(api_data, rate_limiter, client, first_page, checkpoint, on_progress)
+        ) as pages:
+            async for page in pages:
+                yield page
+        return
+    progress = on_progress or (lambda done, found: None)
+
+    done: dict[int, list[dict[str, Any]]] = {}
+    content = checkpoint.read(page_name(1)) if checkpoint else None
+    resumed = content is not None
+    if content is None:
         # Fetch the first page to get total_pages
-        initial_data = await fetch_single_page(client, api_data, 1)
-        total_count = initial_data["pagination"]["total_count"]
-        all_data.extend(initial_data["data"][0]["conversions"])
-        total_pages = ceil(total_count / api_data.limit)
+        first_page = first_page or await fetch_single_page(client, api_data, 1, rate_limiter)
+        if checkpoint:
+            checkpoint.write(page_name(1), first_page.content)
+    else:
+        first_page = PageResponse(content)
+    done[1] = first_page["data"][0]["conversions"]
+    total_pages = max(ceil(first_page["pagination"]["total_count"] / api_data.limit), 1)
+
+    for page in range(2, total_pages + 1):
+        if checkpoint and (content := checkpoint.read(page_name(page))):
+            done[page] = PageResponse(content)["data"][0]["conversions"]
+    if resumed:
+        logging.info(f"Resuming the fetch, {len(done)} of {total_pages} pages already done")
+    progress(len(done), total_pages)
+
+    queue: asyncio.PriorityQueue[tuple[int, int, int]] = asyncio.PriorityQueue()
+    for page in range(1, total_pages + 1):
+        if page not in done:
+            queue.put_nowait((PAGE_PRIORITY, page, 1))
+    results: asyncio.Queue[Page | Exception] = asyncio.Queue()
+    workers = [
+        asyncio.create_task(
+            _page_worker(queue, results, client, api_data, rate_limiter, checkpoint),
+        )
+        for _ in range(min(WORKERS, queue.qsize()))
+    ]
+    errors: list[Exception] = []
+    try:
+        for page in sorted(done):
+            yield page, done[page]
+        for _ in range(total_pages - len(done)):
+            result = await results.get()
+            if isinstance(result, Exception):
+                errors.append(result)
+                continue
+            progress(1, 0)
+            yield result
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+    if errors:
+        raise errors[0]
 
-        tasks = [fetch_single_page(client, api_data, page) for page in range(2, total_pages + 1)]
-        # rate limited batches
-        for i in range(0, len(tasks), RATE_LIMIT):
-            batch = tasks[i : i + RATE_LIMIT]
-            responses = await asyncio.gather(*batch)
 
-            for response in filter(None, responses):
-                all_data.extend(response["data"][0]["conversions"])
+async def fetch_all_pages_ml(
+    api_data: models.Api,
+    rate_limiter: RateLimiter | None = None,
+    client: httpx.AsyncClient | None = None,
+    first_page: PageResponse | None = None,
+    resume: bool = True,
+    on_progress: ProgressCallback | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Fetches all pages of data from the ML API asynchronously.
 
-            # Sleep only if there are more batches to process
-            if (i + RATE_LIMIT) < len(tasks):
-                await asyncio.sleep(SLEEP_TIME)
+    Every completed page is saved to the checkpoint of the query, so a rerun
+    after a crash or a failed page fetches only the missing pages.
+    The checkpoint is removed once all pages are fetched.
 
-    return all_data
+    Args:
+        api_data (models.Api): The API request data.
+        rate_limiter (RateLimiter | None, optional): Limiter shared by all requests.
+            See `iter_pages_ml` for the default.
+        client (httpx.AsyncClient | None, optional): Client used for the requests.
+            Defaults to a new client.
+        first_page (PageResponse | None, optional): Response of the first page if it was
+            already fetched. Defaults to None.
+        resume (bool, optional): Checkpoint completed pages and skip pages completed
+            by an interrupted run. Defaults to True.
+        on_progress (ProgressCallback | None, optional): See `iter_pages_ml`.
+            Defaults to None.
+
+    Returns:
+        list[dict[str, Any]]: The list of all data retrieved from the API in page order."""
+    checkpoint = Checkpoint(api_data) if resume else None
+    pages = {
+        page: conversions
+        async for page, conversions in iter_pages_ml(
+            api_data,
+            rate_limiter,
+            client,
+            first_page,
+            checkpoint,
+            on_progress,
+        )
+    }
+    if checkpoint:
+        checkpoint.clear()
+    return [conversion for page in sorted(pages) for conversion in pages[page]]
@@ -1,7 +1,10 @@
 from datetime import date, datetime, timedelta
-from typing import Literal
+from typing import Annotated, Literal
 
 from pydantic import BaseModel, ConfigDict, Field, field_validator
+from typing_extensions import TypedDict  # pydantic needs it instead of typing on Python < 3.12
+
+from myleadcli.options import LeadStatus  # noqa: F401 re-exported for the CLI
 
 
 class Api(BaseModel):
@@ -15,11 +18,18 @@ class Api(BaseModel):
 
     @field_validator("date_to", mode="before")
     def strip_date_to(cls, value: datetime) -> date:
-        return value.date() if datetime else value
+        return value.date() if isinstance(value, datetime) else value
 
     @field_validator("date_from", mode="before")
     def strip_date_from(cls, value: datetime) -> date:
-        return value.date() if datetime else value
+        return value.date() if isinstance(value, datetime) else value
+
+
+class Account(BaseModel):
+    """MyLead account, its API key with a name shown in statistics"""
+
+    name: str
+    token: str
 
 
 class UserAgent(BaseModel):
@@ -64,3 +74,57 @@ class Lead(BaseModel):
     ml_sub3: str | None
     ml_sub4: str | None
     ml_sub5: str | None
+
+
+class UserAgentDict(TypedDict):
+    """UserAgent validated into a plain dict"""
+
+    # own config, so strings are not stripped as the config of LeadDict would do
+    __pydantic_config__ = ConfigDict()
+
+    name: str
+    operation_system: str
+    operation_system_version: str
+    browser_system: str
+    browser_version: str
+    device: Literal["mobile", "desktop", "tablet"]
+    device_brand: str | None
+    device_model: str | None
+
+
+class CreatedAtDict(TypedDict):
+    """CreatedAt validated into a plain dict"""
+
+    # own config, so strings are not stripped as the config of LeadDict would do
+    __pydantic_config__ = ConfigDict()
+
+    date: datetime
+    timezone_type: int
+    timezone: str
+
+
+class LeadDict(TypedDict):
+    """Lead validated into a plain dict, the same as Lead(...).model_dump()
+
+    Validating leads in bulk into dicts avoids building a model instance for every lead.
+    Keep it in sync with Lead.
+    """
+
+    __pydantic_config__ = ConfigDict(str_strip_whitespace=True, populate_by_name=True)
+
+    lead_id: Annotated[str, Field(alias="id")]
+    campaign_id: Annotated[int, Field(gt=0)]
+    campaign_name: str
+    payout: Annotated[float, Field(ge=0)]
+    currency: str
+    status: Literal["approved", "pending", "rejected", "pre_approved"]
+    status_reason: str | None
+    country: str
+    created_at: CreatedAtDict
+    user_agent: UserAgentDict
+    ip: str
+    ml_sub1: str | None
+    ml_sub2: str | None
+    ml_sub3: str | None
+    ml_sub4: str | None
+    ml_sub5: str | None
@@ -0,0 +1,58 @@
+"""
+Module with choices and defaults of command line options.
+The CLI needs them to define its commands before any data is loaded,
+so this module imports only the standard library and keeps
+`myleadcli --help` and argument errors from loading pandas, httpx or pydantic.
+The modules using them import them from here.
+"""
+from datetime import datetime, timedelta
+from enum import Enum
+
+MUTABLE_DAYS = 30  # statuses of leads younger than this can still change
+REPORT_DIR = "report"
+PROFILE_FILE = "myleadcli_profile.json"
+
+
+class LeadStatus(str, Enum):
+    """Statuses of leads which can be used for filtering"""
+
+    approved = "approved"
+    pending = "pending"
+    rejected = "rejected"
+    pre_approved = "pre_approved"
+
+
+class FileFormat(str, Enum):
+    """Formats of the file with saved leads"""
+
+    feather = "feather"
+    json = "json"
+
+
+class ShardBy(str, Enum):
+    """How a fetch is split into date ranges"""
+
+    none = "none"
+    month = "month"
+    auto = "auto"
+
+
+class ReportFormat(str, Enum):
+    """Format of report files"""
+
+    json = "json"
+    csv = "csv"
+    html = "html"
+
+
+class ProfileFormat(str, Enum):
+    """How the profile of a run is shown"""
+
+    summary = "summary"
+    json = "json"
+    chrome = "chrome"
+
+
+def one_year_ago_day() -> str:
+    "Return string with a date from one year ago."
+    return str((datetime.now() - timedelta(days=365)).date())
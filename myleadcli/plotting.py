@@ -1,15 +1,60 @@
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
 from rich import box
 from rich.console import Console
 from rich.panel import Panel
 from rich.prompt import Prompt
 
-from myleadcli import tables
-from myleadcli.utils import generate_caption
-
-
-def create_bar_chart(
+from myleadcli.session import Session
+
+OPTIONS = {
+    "1": {
+        "title": "Device Types",
+        "group_by_column": "user_agent.device",
+        "x_label": "Device Type",
+        "y_label": "Number of Leads",
+        "invert_colors": False,
+    },
+    "2": {
+        "title": "Operating Systems",
+        "group_by_column": "user_agent.operation_system",
+        "x_label": "Operating System",
+        "y_label": "Number of Leads",
+        "invert_colors": False,
+    },
+    "3": {
+        "title": "Country Statistics",
+        "group_by_column": "country",
+        "x_label": "Country Code",
+        "y_label": "Number of Leads",
+        "invert_colors": False,
+    },
+    "4": {
+        "title": "Campaigns",
+        "group_by_column": "campaign_name",
+        "x_label": "Campaign Name",
+        "y_label": "Number of Leads",
+        "invert_colors": False,
+    },
+    "5": {
+        "title": "Hourly Lead Approvals",
+        "group_by_column": "hour_of_day",
+        "x_label": "Hour",
+        "y_label": "Number of Leads",
+        "invert_colors": True,
+    },
+    "6": {
+        "title": "Day of Week Lead Approvals",
+        "group_by_column": "day_of_week",
+        "x_label": "Day of the Week",
+        "y_label": "Number of Leads",
+        "invert_colors": False,
+    },
+}
+
+
+def bar_chart(
     df: pd.DataFrame,
     group_by_column: str,
     title: str,
@@ -17,9 +62,9 @@ def create_bar_chart(
     y_label: str,
     caption: str,
     invert_colors: bool = False,
-) -> None:
+) -> go.Figure:
     """
-    Creates a bar chart based on the provided DataFrame.
+    Builds a bar chart based on the provided DataFrame.
 
     Args:
         df (pd.DataFrame): The DataFrame containing the data.
@@ -31,7 +76,7 @@ def create_bar_chart(
         invert_colors (bool, optional): Whether to invert chart. Defaults to False.
 
     Returns:
-        None"""
+        go.Figure: The bar chart."""
     fig = px.bar(
         df,
         x=group_by_column,
@@ -69,39 +114,61 @@ def create_bar_chart(
         y=1.05,
         showarrow=False,
     )
+    return fig
 
-    fig.show()
+
+def create_bar_chart(
+    df: pd.DataFrame,
+    group_by_column: str,
+    title: str,
+    x_label: str,
+    y_label: str,
+    caption: str,
+    invert_colors: bool = False,
+) -> None:
+    """
+    Creates a bar chart based on the provided DataFrame and shows it.
+
+    Args:
+        df (pd.DataFrame): The DataFrame containing the data.
+        group_by_column (str): The column to group the data by.
+        title (str): The title of the chart.
+        x_label (str): The label for the x-axis.
+        y_label (str): The label for the y-axis.
+        caption (str): The caption for the chart.
+        invert_colors (bool, optional): Whether to invert chart. Defaults to False.
+
+    Returns:
+        None"""
+    bar_chart(df, group_by_column, title, x_label, y_label, caption, invert_colors).show()
 
 
 def barchart_from_data(
-    df: pd.DataFrame,
+    session: Session,
     group_by_column: str,
     title: str,
     x_label: str,
     y_label: str,
     sort_by: str = "total_payout",
     invert_colors: bool = False,
+    status: str | None = None,
 ) -> None:
     """
-    Intermediate function for creating chart from dataframe.
+    Intermediate function for creating chart from the aggregates of a session.
 
     Args:
-        df (pd.DataFrame): The DataFrame containing the data.
+        session (Session): The session with aggregated leads.
         group_by_column (str): The column to group the data by.
         title (str): The title of the chart.
         x_label (str): The label for the x-axis.
         y_label (str): The label for the y-axis.
         sort_by (str, optional): The column to sort the data by. Defaults to "total_payout".
         invert_colors (bool, optional): Whether to invert the chart. Defaults to False.
+        status (str | None, optional): Show only leads with this status. Defaults to None.
 
     Returns:
         None"""
-    caption = generate_caption(df)
-    aggregated_data = tables.aggregate_data(
-        data=df,
-        group_by_column=group_by_column,
-        sort_by=sort_by,
-    )
+    aggregated_data = session.aggregate(group_by_column, sort_by=sort_by, status=status)
 
     create_bar_chart(
         df=aggregated_data,
@@ -109,7 +176,7 @@ def barchart_from_data(
         title=title,
         x_label=x_label,
         y_label=y_label,
-        caption=caption,
+        caption=session.caption(status),
         invert_colors=invert_colors,
     )
 
@@ -136,61 +203,17 @@ def print_options(console: Console, options: dict[str, dict]) -> None:
     )
 
 
-def choose_graph(df: pd.DataFrame) -> None:
+def choose_graph(session: Session) -> None:
     """
-    Choose a graph to display based on the provided DataFrame.
+    Choose a graph to display based on the aggregates of a session.
 
     Args:
-        df (pd.DataFrame): The DataFrame containing the data.
+        session (Session): The session with aggregated leads.
 
     Returns:
         None
     """
     console = Console()
-    OPTIONS = {
-        "1": {
-            "title": "Device Types",
-            "group_by_column": "user_agent.device",
-            "x_label": "Device Type",
-            "y_label": "Number of Leads",
-            "invert_colors": False,
-        },
-        "2": {
-            "title": "Operating Systems",
-            "group_by_column": "user_agent.operation_system",
-            "x_label": "Operating System",
-            "y_label": "Number of Leads",
-            "invert_colors": False,
-        },
-        "3": {
-            "title": "Country Statistics",
-            "group_by_column": "country",
-            "x_label": "Country Code",
-            "y_label": "Number of Leads",
-            "invert_colors": False,
-        },
-        "4": {
-            "title": "Campaigns",
-            "group_by_column": "campaign_name",
-            "x_label": "Campaign Name",
-            "y_label": "Number of Leads",
-            "invert_colors": False,
-        },
-        "5": {
-            "title": "Hourly Lead Approvals",
-            "group_by_column": "hour_of_day",
-            "x_label": "Hour",
-            "y_label": "Number of Leads",
-            "invert_colors": True,
-        },
-        "6": {
-            "title": "Day of Week Lead Approvals",
-            "group_by_column": "day_of_week",
-            "x_label": "Day of the Week",
-            "y_label": "Number of Leads",
-            "invert_colors": False,
-        },
-    }
     print_options(console, OPTIONS)
     while True:
         choice = Prompt.ask(
@@ -203,6 +226,6 @@ def choose_graph(df: pd.DataFrame) -> None:
             break
 
         if option := OPTIONS.get(choice):
-            barchart_from_data(df, **option)
+            barchart_from_data(session, **option)
         else:
             console.print("Wrong input")
@@ -0,0 +1,246 @@
+"""
+Module measuring where the time and memory of a run are spent.
+Named spans are recorded around the fetch, every page request, validation,
+normalization, categorical conversion and aggregation. Each span keeps its
+wall time, CPU time, change of the resident set size and number of items.
+Spans are recorded only while a profile is active, e.g. with --profile,
+otherwise they cost almost nothing.
+It imports only the standard library, so it can wrap functions
+of modules which load heavy dependencies lazily.
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+MIB = 2**20
+
+
+def rss() -> int:
+    """Return the resident set size of the process in bytes, 0 where it is unknown."""
+    try:
+        with open("/proc/self/statm", "rb") as statm:
+            return int(statm.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def _track() -> str:
+    """Return the name of the asyncio task or the thread a span runs in."""
+    asyncio = sys.modules.get("asyncio")
+    try:
+        task = asyncio.current_task() if asyncio else None
+    except RuntimeError:  # no running event loop
+        task = None
+    return task.get_name() if task else threading.current_thread().name
+
+
+class Span:
+    """
+    One measured section of a run.
+
+    Args:
+        name (str): Name shared by all spans of the same kind, e.g. "page_request".
+        items (int, optional): Number of items processed, can be set while the span runs.
+            Defaults to 0.
+    """
+
+    def __init__(self, name: str, items: int = 0) -> None:
+        self.name = name
+        self.items = items
+        self.track = ""
+        self.start = 0.0  # seconds since the start of the profile
+        self.wall = 0.0  # seconds
+        self.cpu = 0.0  # seconds of CPU time of the whole process
+        self.rss_delta = 0  # bytes
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "track": self.track,
+            "start": self.start,
+            "wall": self.wall,
+            "cpu": self.cpu,
+            "rss_delta": self.rss_delta,
+            "items": self.items,
+        }
+
+
+class Profile:
+    """Spans recorded while the profile is active, see `start_profile`."""
+
+    def __init__(self) -> None:
+        self.origin = time.perf_counter()
+        self.spans: list[Span] = []
+
+    def summary(self) -> list[dict[str, Any]]:
+        """
+        Aggregate the spans by name.
+
+        Returns:
+            list[dict[str, Any]]: Count, total wall and CPU time, total RSS change
+                and items of every span name, in order of the first span.
+        """
+        rows: dict[str, dict[str, Any]] = {}
+        for span in self.spans:
+            row = rows.setdefault(
+                span.name,
+                {
+                    "name": span.name,
+                    "count": 0,
+                    "wall": 0.0,
+                    "cpu": 0.0,
+                    "rss_delta": 0,
+                    "items": 0,
+                },
+            )
+            row["count"] += 1
+            row["wall"] += span.wall
+            row["cpu"] += span.cpu
+            row["rss_delta"] += span.rss_delta
+            row["items"] += span.items
+        return list(rows.values())
+
+    def write_json(self, path: Path) -> None:
+        """Write all spans and their summary into a JSON file."""
+        report = {"summary": self.summary(), "spans": [span.as_dict() for span in self.spans]}
+        path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    def write_chrome_trace(self, path: Path) -> None:
+        """
+        Write all spans into a file in the Chrome trace event format.
+
+        The file can be opened in chrome://tracing or https://ui.perfetto.dev,
+        every asyncio task and thread is shown on its own track.
+        """
+        tracks = {
+            track: index for index, track in enumerate(dict.fromkeys(s.track for s in self.spans))
+        }
+        events: list[dict[str, Any]] = [
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": track}}
+            for track, tid in tracks.items()
+        ]
+        events.extend(
+            {
+                "name": span.name,
+                "ph": "X",
+                "pid": 1,
+                "tid": tracks[span.track],
+                "ts": span.start * 1_000_000,
+                "dur": span.wall * 1_000_000,
+                "args": {"cpu": span.cpu, "rss_delta": span.rss_delta, "items": span.items},
+            }
+            for span in self.spans
+        )
+        path.write_text(json.dumps({"traceEvents": events}), encoding="utf-8")
+
+    def print_summary(self) -> None:
+        """Print the summary of the spans as a table."""
+        from rich import print
+        from rich.table import Table
+
+        table = Table(title="Profile of the run")
+        for column in ["Span", "Count", "Wall (s)", "CPU (s)", "RSS change (MiB)", "Items"]:
+            table.add_column(column, justify="left" if column == "Span" else "right")
+        for row in self.summary():
+            table.add_row(
+                row["name"],
+                str(row["count"]),
+                f"{row['wall']:.3f}",
+                f"{row['cpu']:.3f}",
+                f"{row['rss_delta'] / MIB:+.1f}",
+                str(row["items"]),
+            )
+        print(table)
+
+
+_profile: Profile | None = None
+
+
+def start_profile() -> Profile:
+    """Start recording spans into a new profile and return it."""
+    global _profile
+    _profile = Profile()
+    return _profile
+
+
+def stop_profile() -> Profile | None:
+    """Stop recording spans and return the profile which was active, if any."""
+    global _profile
+    profile, _profile = _profile, None
+    return profile
+
+
+@contextmanager
+def span(name: str, items: int = 0) -> Iterator[Span]:
+    """
+    Measure a section of the run as a span of the active profile.
+
+    Args:
+        name (str): Name of the span.
+        items (int, optional): Number of items processed. Defaults to 0.
+
+    Yields:
+        Span: The span, its `items` can be set while it runs.
+    """
+    current = Span(name, items)
+    profile = _profile
+    if profile is None:
+        yield current
+        return
+    current.track = _track()
+    start_rss = rss()
+    start_cpu = time.process_time()
+    start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        current.wall = time.perf_counter() - start
+        current.cpu = time.process_time() - start_cpu
+        current.rss_delta = rss() - start_rss
+        current.start = start - profile.origin
+        profile.spans.append(current)
+
+
+def profiled(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Decorator recording every call of a function as a span named by the function.
+
+    The execution time is also logged at INFO, together with the peak of memory
+    allocated during the call. Allocations are traced only while INFO messages
+    are logged, and not within a call which is already traced."""
+
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        """Wrapper function that records the span and logs the execution time and memory peak."""
+        trace_memory = logging.getLogger().isEnabledFor(logging.INFO)
+        trace_memory = trace_memory and not tracemalloc.is_tracing()
+        if trace_memory:
+            tracemalloc.start()
+        try:
+            with span(func.__name__) as current:
+                start_time = time.perf_counter()
+                value = func(*args, **kwargs)
+                end_time = time.perf_counter()
+            peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+        finally:
+            if trace_memory:
+                tracemalloc.stop()
+        if hasattr(value, "__len__"):
+            current.items = len(value)
+        message = f"The execution of {func.__name__} took {end_time - start_time:.5f} seconds"
+        if peak is not None:
+            message += f", its memory peak was {peak / MIB:.1f} MiB"
+        logging.info(message)
+        return value
+
+    return wrapper
+
+
+benchmark = profiled  # the former name of the decorator
@@ -0,0 +1,266 @@
+"""
+Module with an asynchronous rate limiter for the MyLead API.
+The limiter keeps track of the moments in which requests were actually sent
+and lets a new request start as soon as the sliding window has free capacity.
+It adapts its pace to 429 responses and rate limit headers sent by the server,
+and limits confirmed by the server are remembered between runs.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable, Mapping
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from types import TracebackType
+
+import orjson
+
+from myleadcli import cache
+
+Clock = Callable[[], float]
+Sleep = Callable[[float], Awaitable[None]]
+
+RATE_LIMIT_FILE = "rate_limits.json"
+# X-RateLimit-Reset values above this are unix timestamps, not seconds to wait
+EPOCH_THRESHOLD = 1_000_000_000
+# windows without a 429 after which a limit lowered by 429 responses is raised by one
+RECOVERY_WINDOWS = 3
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Parse the value of a Retry-After or X-RateLimit-Reset header.
+
+    Args:
+        value (str | None): Number of seconds, unix timestamp or HTTP date.
+
+    Returns:
+        float | None: Number of seconds to wait or None when the value is missing or invalid.
+    """
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            logging.warning(f"Unable to parse rate limit header value: {value}")
+            return None
+    else:
+        if seconds > EPOCH_THRESHOLD:
+            seconds -= time.time()
+    return max(seconds, 0.0)
+
+
+def retry_delay(headers: Mapping[str, str]) -> float | None:
+    """
+    Return the number of seconds the server asked to wait before the next request.
+
+    Args:
+        headers (Mapping[str, str]): Case-insensitive response headers.
+
+    Returns:
+        float | None: Seconds from Retry-After or from X-RateLimit-Reset when no requests
+            remain, None when the server gave no hint.
+    """
+    if (retry_after := parse_retry_after(headers.get("retry-after"))) is not None:
+        return retry_after
+    if headers.get("x-ratelimit-remaining") == "0":
+        return parse_retry_after(headers.get("x-ratelimit-reset"))
+    return None
+
+
+class RateLimiter:
+    """
+    Sliding-window rate limiter keyed on the send times of requests.
+
+    At most `max_calls` requests can be started within any `period` seconds.
+    Waiting callers are served in FIFO order. A limit lowered by 429 responses
+    without rate limit headers grows back by one request after RECOVERY_WINDOWS
+    windows without a 429, up to the limit the limiter started with.
+
+    Args:
+        max_calls (int): Maximum number of requests in one window.
+        period (float): Length of the window in seconds.
+        clock (Clock, optional): Monotonic clock returning seconds. Defaults to time.monotonic.
+        sleep (Sleep, optional): Coroutine function used for waiting. Defaults to asyncio.sleep.
+
+    Raises:
+        ValueError: Raised when `max_calls` or `period` is not positive.
+    """
+
+    def __init__(
+        self,
+        max_calls: int,
+        period: float,
+        clock: Clock = time.monotonic,
+        sleep: Sleep = asyncio.sleep,
+    ) -> None:
+        if max_calls < 1 or period <= 0:
+            msg = f"Invalid rate limit: {max_calls} calls per {period} seconds"
+            raise ValueError(msg)
+        self.max_calls = max_calls
+        self.period = period
+        self.max_limit = max_calls
+        self.confirmed_limit: int | None = None  # limit announced in X-RateLimit-Limit
+        self.rate_limited = False  # whether any request was answered with 429
+        self._slowed_down_at: float | None = None
+        self._stable_since = clock()
+        self._clock = clock
+        self._sleep = sleep
+        self._send_times: deque[float] = deque()
+        self._resume_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _prune(self, now: float) -> None:
+        """Forget send times which are no longer inside the window."""
+        while self._send_times and now - self._send_times[0] >= self.period:
+            self._send_times.popleft()
+
+    def delay(self) -> float:
+        """
+        Return the number of seconds until the next request can be sent.
+
+        Returns:
+            float: Seconds to wait, 0 when there is free capacity right now.
+        """
+        now = self._clock()
+        self._prune(now)
+        pause = max(self._resume_at - now, 0.0)
+        if len(self._send_times) < self.max_calls:
+            return pause
+        window = self._send_times[len(self._send_times) - self.max_calls] + self.period - now
+        return max(window, pause)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Hold back all requests for the given number of seconds.
+
+        Args:
+            seconds (float): Number of seconds from now in which no request can be sent.
+        """
+        self._resume_at = max(self._resume_at, self._clock() + seconds)
+
+    def update_limit(self, max_calls: int) -> None:
+        """
+        Change the number of requests allowed within one window.
+
+        Args:
+            max_calls (int): New maximum number of requests, at least 1.
+        """
+        max_calls = max(max_calls, 1)
+        if max_calls != self.max_calls:
+            logging.info(f"Rate limit changed to {max_calls} requests per {self.period} seconds")
+            self.max_calls = max_calls
+
+    def on_rate_limited(self, retry_after: float | None) -> None:
+        """
+        Slow down after the server responded with 429 Too Many Requests.
+
+        Without a Retry-After hint requests are paused for a whole window
+        and the limit is lowered by one, at most once per window, so 429 responses
+        of requests sent in the same window lower it only once.
+
+        Args:
+            retry_after (float | None): Seconds the server asked to wait, if known.
+        """
+        now = self._clock()
+        self.rate_limited = True
+        self._stable_since = now
+        if retry_after is None:
+            if self._slowed_down_at is None or now - self._slowed_down_at >= self.period:
+                self.update_limit(self.max_calls - 1)
+                self._slowed_down_at = now
+            retry_after = self.period
+        self.pause(retry_after)
+
+    def _recover(self, now: float) -> None:
+        """Raise a limit lowered by 429 responses after RECOVERY_WINDOWS windows without one."""
+        if self.confirmed_limit is not None or self.max_calls >= self.max_limit:
+            return
+        if now - self._stable_since >= RECOVERY_WINDOWS * self.period:
+            self.update_limit(self.max_calls + 1)
+            self._stable_since = now
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        """
+        Adjust the pace to the rate limit headers of a response.
+
+        X-RateLimit-Limit sets the limit (keeping a one request safety margin),
+        Retry-After or X-RateLimit-Reset with no remaining requests pause
+        requests for exactly the requested time.
+
+        Args:
+            headers (Mapping[str, str]): Case-insensitive response headers.
+        """
+        if (limit := headers.get("x-ratelimit-limit", "")).isdigit():
+            self.confirmed_limit = max(int(limit) - 1, 1)
+            self.update_limit(self.confirmed_limit)
+        if (delay := retry_delay(headers)) is not None:
+            self.pause(delay)
+        elif headers.get("x-ratelimit-remaining") == "0":
+            self.pause(self.period)
+
+    async def acquire(self) -> None:
+        """Wait until a request can be sent and record its send time."""
+        async with self._lock:
+            while (wait := self.delay()) > 0:
+                await self._sleep(wait)
+            now = self._clock()
+            self._recover(now)
+            self._send_times.append(now)
+
+    async def __aenter__(self) -> "RateLimiter":
+        await self.acquire()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        return None
+
+
+def _read_rate_limits(path: Path) -> dict[str, int]:
+    try:
+        return orjson.loads(path.read_bytes())
+    except (OSError, orjson.JSONDecodeError):
+        return {}
+
+
+def load_rate_limit(token: str, path: Path | None = None) -> int | None:
+    """
+    Load the rate limit learned in previous runs for the given API token.
+
+    Args:
+        token (str): The API token.
+        path (Path | None, optional): File with learned limits. Defaults to the cache directory.
+
+    Returns:
+        int | None: Learned number of requests per window or None if nothing was learned yet.
+    """
+    path = path or cache.cache_dir() / RATE_LIMIT_FILE
+    return _read_rate_limits(path).get(cache.token_key(token))
+
+
+def save_rate_limit(token: str, max_calls: int, path: Path | None = None) -> None:
+    """
+    Remember the rate limit learned for the given API token.
+
+    Args:
+        token (str): The API token.
+        max_calls (int): Number of requests per window.
+        path (Path | None, optional): File with learned limits. Defaults to the cache directory.
+    """
+    path = path or cache.cache_dir() / RATE_LIMIT_FILE
+    limits = _read_rate_limits(path)
+    limits[cache.token_key(token)] = max_calls
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(orjson.dumps(limits))
+    except OSError as e:
+        logging.warning(f"Unable to save learned rate limit: {e}")
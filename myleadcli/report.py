@@ -0,0 +1,149 @@
+"""
+Module writing all statistics of the table and chart menus into files.
+Every table is sliced from one session, so the leads are aggregated once
+and the result is shared by all output formats and charts.
+Nothing is printed or asked, which makes reports usable from scheduled jobs.
+"""
+from html import escape
+from pathlib import Path
+
+import orjson
+import pandas as pd
+
+from myleadcli import tables
+from myleadcli.options import ReportFormat
+from myleadcli.session import Session
+
+REPORT_FILE = "report"
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>MyLead statistics</title></head>
+<body>
+<h1>MyLead statistics</h1>
+<p>{caption}</p>
+{tables}
+</body>
+</html>
+"""
+
+
+def table_name(group_by_column: str) -> str:
+    """Return the name of the table of a column used in file names and JSON keys."""
+    return group_by_column.rsplit(".", 1)[-1]
+
+
+def build_tables(session: Session) -> dict[str, pd.DataFrame]:
+    """
+    Aggregate leads for every option of the statistics menu.
+
+    Args:
+        session (Session): The session with aggregated leads.
+
+    Returns:
+        dict[str, pd.DataFrame]: Aggregated data keyed by `table_name`, in menu order.
+    """
+    return {
+        table_name(option["group_by_column"]): session.aggregate(option["group_by_column"])
+        for option in tables.OPTIONS.values()
+    }
+
+
+def write_json(path: Path, session: Session, report_tables: dict[str, pd.DataFrame]) -> None:
+    """Write the caption, the number of leads and all tables into one JSON file."""
+    report = {
+        "caption": session.caption(),
+        "num_of_leads": session.num_of_leads(),
+        "tables": {
+            name: df.astype({df.columns[0]: object}).to_dict(orient="records")
+            for name, df in report_tables.items()
+        },
+    }
+    path.write_bytes(orjson.dumps(report, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+
+
+def write_csv(directory: Path, report_tables: dict[str, pd.DataFrame]) -> list[Path]:
+    """Write every table into its own CSV file and return their paths."""
+    paths = []
+    for name, df in report_tables.items():
+        path = directory / f"{name}.csv"
+        df.to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def write_html(path: Path, session: Session, report_tables: dict[str, pd.DataFrame]) -> None:
+    """Write all tables with the titles and column names of the menu into one HTML file."""
+    sections = []
+    for option, df in zip(tables.OPTIONS.values(), report_tables.values()):
+        columns = {
+            option["group_by_column"]: option["column_name"],
+            "grouped_data": "No. of leads",
+            "total_payout": "Total payout",
+        }
+        html_table = df.rename(columns=columns).to_html(index=False, float_format="%.2f")
+        sections.append(f"<h2>{escape(option['title'])}</h2>\n{html_table}")
+    html = HTML_TEMPLATE.format(caption=escape(session.caption()), tables="\n".join(sections))
+    path.write_text(html, encoding="utf-8")
+
+
+def write_charts(directory: Path, session: Session) -> list[Path]:
+    """
+    Write every chart of the chart menu into its own HTML file.
+
+    Plotly is imported only here, so reports without charts do not load it.
+
+    Args:
+        directory (Path): Directory for the chart files.
+        session (Session): The session with aggregated leads.
+
+    Returns:
+        list[Path]: Paths of the written files.
+    """
+    from myleadcli import plotting
+
+    paths = []
+    for option in plotting.OPTIONS.values():
+        group_by_column = option["group_by_column"]
+        fig = plotting.bar_chart(
+            session.aggregate(group_by_column),
+            caption=session.caption(),
+            **option,
+        )
+        path = directory / f"{table_name(group_by_column)}_chart.html"
+        fig.write_html(path, include_plotlyjs="cdn")
+        paths.append(path)
+    return paths
+
+
+def write_report(
+    session: Session,
+    directory: Path,
+    formats: list[ReportFormat],
+    charts: bool = False,
+) -> list[Path]:
+    """
+    Write all statistics into files in the given directory.
+
+    Args:
+        session (Session): The session with aggregated leads.
+        directory (Path): Output directory, created if missing.
+        formats (list[ReportFormat]): Formats of the report.
+        charts (bool, optional): Write also all charts as HTML files. Defaults to False.
+
+    Returns:
+        list[Path]: Paths of the written files.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    report_tables = build_tables(session)
+    paths = []
+    if ReportFormat.json in formats:
+        paths.append(directory / f"{REPORT_FILE}.json")
+        write_json(paths[-1], session, report_tables)
+    if ReportFormat.csv in formats:
+        paths.extend(write_csv(directory, report_tables))
+    if ReportFormat.html in formats:
+        paths.append(directory / f"{REPORT_FILE}.html")
+        write_html(paths[-1], session, report_tables)
+    if charts:
+        paths.extend(write_charts(directory, session))
+    return paths
@@ -0,0 +1,135 @@
+"""
+Module with a statistics session shared by the table and chart menus.
+After processing, the leads are aggregated once into a cube of lead counts
+and payout sums for every dimension offered in the menus, split by status.
+Every menu choice, with or without a status, is then sliced from the cube
+instead of grouping the raw rows again.
+"""
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from myleadcli.profiling import span
+from myleadcli.utils import generate_caption
+
+DIMENSIONS = [
+    "user_agent.device",
+    "user_agent.operation_system",
+    "country",
+    "campaign_name",
+    "hour_of_day",
+    "day_of_week",
+]
+
+
+class Aggregate(NamedTuple):
+    """Lead counts and payout sums of one dimension"""
+
+    values: pd.Index  # distinct values of the dimension, all categories for categoricals
+    counts: np.ndarray  # shape (number of statuses + 1, number of values)
+    payouts: np.ndarray  # the same shape as counts
+    observed_only: bool  # drop values without leads, as groupby does for non-categoricals
+
+
+def _factorize(column: pd.Series) -> tuple[np.ndarray, pd.Index, bool]:
+    """Return codes of the column (-1 for missing), its distinct values and if all are kept."""
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        values = pd.CategoricalIndex(column.cat.categories, dtype=column.dtype)
+        # widen the int8 codes of small categoricals, so cell indices of the cube do not overflow
+        return column.cat.codes.to_numpy().astype(np.intp), values, False
+    codes, values = pd.factorize(column, sort=True)
+    return codes, values, True
+
+
+class Session:
+    """
+    Aggregated statistics of processed leads.
+
+    All dimensions are aggregated in one pass when the session is created.
+    Row 0 of every aggregate holds leads without a status, row `i + 1` leads
+    with the i-th status category.
+
+    Args:
+        df (pd.DataFrame): The processed leads, as returned by `main.process_data`.
+        dimensions (list[str], optional): Columns to aggregate. Defaults to DIMENSIONS.
+    """
+
+    def __init__(self, df: pd.DataFrame, dimensions: list[str] | None = None) -> None:
+        self.df = df
+        with span("aggregation", items=len(df)):
+            status_codes, self.statuses, _ = _factorize(df["status"])
+            status_codes = status_codes + 1
+            num_rows = len(self.statuses) + 1
+            payout = df["payout"].to_numpy(dtype=np.float64)
+
+            self.aggregates: dict[str, Aggregate] = {}
+            for dimension in dimensions or DIMENSIONS:
+                codes, values, observed_only = _factorize(df[dimension])
+                valid = codes >= 0
+                cells = status_codes[valid] * len(values) + codes[valid]
+                size = num_rows * len(values)
+                self.aggregates[dimension] = Aggregate(
+                    values,
+                    np.bincount(cells, minlength=size).reshape(num_rows, -1),
+                    np.bincount(cells, weights=payout[valid], minlength=size).reshape(num_rows, -1),
+                    observed_only,
+                )
+
+            self._num_of_leads = np.bincount(status_codes, minlength=num_rows)
+        self._captions: dict[str | None, str] = {}
+
+    def _rows(self, status: str | None) -> slice | list[int]:
+        """Return rows of the aggregates which belong to the status, all rows for None."""
+        if status is None:
+            return slice(None)
+        return [self.statuses.get_loc(status) + 1] if status in self.statuses else []
+
+    def num_of_leads(self, status: str | None = None) -> int:
+        """Return the number of leads, only of the given status if any."""
+        return int(self._num_of_leads[self._rows(status)].sum())
+
+    def caption(self, status: str | None = None) -> str:
+        """Return the caption of the leads, only of the given status if any, computed once."""
+        if status not in self._captions:
+            df = self.df if status is None else self.df[self.df["status"] == status]
+            self._captions[status] = (
+                generate_caption(df) if len(df) else f"No leads with status {status}"
+            )
+        return self._captions[status]
+
+    def aggregate(
+        self,
+        group_by_column: str,
+        sort_by: str = "total_payout",
+        status: str | None = None,
+    ) -> pd.DataFrame:
+        """
+        Return the number of leads and the total payout for each value of a column.
+
+        The result is the same as `tables.aggregate_data` of the leads with the given status.
+
+        Args:
+            group_by_column (str): One of the aggregated dimensions.
+            sort_by (str, optional): The column to sort the result by. Defaults to "total_payout".
+            status (str | None, optional): Use only leads with this status. Defaults to None.
+
+        Returns:
+            pd.DataFrame: The aggregated DataFrame.
+
+        Raises:
+            KeyError: Raised when the column was not aggregated.
+        """
+        aggregate = self.aggregates[group_by_column]
+        rows = self._rows(status)
+        counts = aggregate.counts[rows].sum(axis=0)
+        result = pd.DataFrame(
+            {
+                group_by_column: aggregate.values,
+                "grouped_data": counts,
+                "total_payout": aggregate.payouts[rows].sum(axis=0),
+            },
+        )
+        if aggregate.observed_only:
+            result = result[counts > 0]
+        return result.sort_values(sort_by, ascending=False, kind="stable").reset_index(drop=True)
@@ -0,0 +1,273 @@
+"""
+Module splitting long fetches from the MyLead API into date-range shards.
+Deep pages of one long query get slower server-side and a failure late
+in the pagination loses everything fetched before it. Long ranges are split
+per month or adaptively by the number of leads, the shards are fetched
+concurrently within the shared rate limit and every completed shard is
+checkpointed, so an interrupted fetch resumes from the shards not done yet.
+"""
+import asyncio
+import logging
+from collections.abc import AsyncIterator
+from contextlib import aclosing
+from datetime import date, timedelta
+from math import ceil
+
+import httpx
+import orjson
+
+from myleadcli import ml, models, utils
+from myleadcli.checkpoint import Checkpoint
+from myleadcli.options import ShardBy
+from myleadcli.ratelimit import RateLimiter
+
+DateRange = tuple[date, date]
+Shard = tuple[DateRange, utils.ValidatedDataList]
+
+MAX_SHARD_PAGES = 20  # pages of one shard when splitting adaptively
+PLAN = "plan"  # name of the checkpoint part with the shards of the fetch
+
+
+def month_shards(date_from: date, date_to: date) -> list[DateRange]:
+    """
+    Split a range of days into calendar months.
+
+    Args:
+        date_from (date): First day of the range.
+        date_to (date): Last day of the range.
+
+    Returns:
+        list[DateRange]: Inclusive ranges, the first and the last one can be partial months.
+    """
+    shards = []
+    start = date_from
+    while start <= date_to:
+        next_month = (start.replace(day=1) + timedelta(days=32)).replace(day=1)
+        shards.append((start, min(next_month - timedelta(days=1), date_to)))
+        start = next_month
+    return shards
+
+
+def split_range(date_from: date, date_to: date, parts: int) -> list[DateRange]:
+    """
+    Split a range of days into parts of about the same number of days.
+
+    Args:
+        date_from (date): First day of the range.
+        date_to (date): Last day of the range.
+        parts (int): Number of parts, at most one part per day is made.
+
+    Returns:
+        list[DateRange]: Inclusive consecutive ranges covering the whole range.
+    """
+    num_days = (date_to - date_from).days + 1
+    parts = max(min(parts, num_days), 1)
+    bounds = [date_from + timedelta(days=num_days * i // parts) for i in range(parts + 1)]
+    return [(bounds[i], bounds[i + 1] - timedelta(days=1)) for i in range(parts)]
+
+
+def shard_name(shard: DateRange) -> str:
+    """Return the name of the checkpoint part of a shard."""
+    return f"{shard[0].isoformat()}_{shard[1].isoformat()}"
+
+
+async def plan_shards(
+    api_data: models.Api,
+    shard_by: ShardBy,
+    client: httpx.AsyncClient,
+    rate_limiter: RateLimiter,
+    max_pages: int = MAX_SHARD_PAGES,
+) -> tuple[list[DateRange], ml.PageResponse | None]:
+    """
+    Split the date range of the query into shards.
+
+    Adaptive splitting fetches the first page of the whole range and splits
+    it into shards of about `max_pages` pages according to its total_count.
+
+    Args:
+        api_data (models.Api): The API request data.
+        shard_by (ShardBy): How the range is split.
+        client (httpx.AsyncClient): The HTTP async client used for making requests.
+        rate_limiter (RateLimiter): Limiter shared by all requests.
+        max_pages (int, optional): Pages of one adaptive shard. Defaults to MAX_SHARD_PAGES.
+
+    Returns:
+        tuple[list[DateRange], ml.PageResponse | None]: The shards and the response
+            of the first page when the range is not split and the page can be reused.
+    """
+    whole_range = [(api_data.date_from, api_data.date_to)]
+    if shard_by is ShardBy.none:
+        return whole_range, None
+    if shard_by is ShardBy.month:
+        return month_shards(api_data.date_from, api_data.date_to), None
+    first_page = await ml.fetch_single_page(client, api_data, 1, rate_limiter)
+    total_pages = ceil(first_page["pagination"]["total_count"] / api_data.limit)
+    if total_pages <= max_pages:
+        return whole_range, first_page
+    shards = split_range(api_data.date_from, api_data.date_to, ceil(total_pages / max_pages))
+    logging.info(f"Fetching {total_pages} pages in {len(shards)} date-range shards")
+    return shards, None
+
+
+def _load_plan(checkpoint: Checkpoint | None, shard_by: ShardBy) -> list[DateRange] | None:
+    """Return shards planned by an interrupted run of the same query split the same way."""
+    content = checkpoint.read(PLAN) if checkpoint else None
+    if content is None:
+        return None
+    plan = orjson.loads(content)
+    if not isinstance(plan, dict) or plan.get("shard_by") != shard_by.value:
+        return None
+    return [(date.fromisoformat(start), date.fromisoformat(end)) for start, end in plan["shards"]]
+
+
+async def iter_shards(
+    api_data: models.Api,
+    shard_by: ShardBy = ShardBy.auto,
+    rate_limiter: RateLimiter | None = None,
+    client: httpx.AsyncClient | None = None,
+    checkpoint: Checkpoint | None = None,
+    on_progress: ml.ProgressCallback | None = None,
+) -> AsyncIterator[Shard]:
+    """
+    Fetch the query shard by shard and yield every shard as soon as it is complete.
+
+    All shards are fetched concurrently through the shared rate limiter.
+    With a checkpoint the shards and every completed shard are saved,
+    and shards completed by an interrupted run are loaded instead of fetched.
+    The saved shards are reused only when they were split by the same `shard_by`,
+    otherwise the range is planned again.
+    When a shard fails, the other shards are still completed before its error is raised.
+
+    Args:
+        api_data (models.Api): The API request data.
+        shard_by (ShardBy, optional): How the range is split. Defaults to ShardBy.auto.
+        rate_limiter (RateLimiter | None, optional): Limiter shared by all requests.
+            Defaults to the `learned_rate_limiter` of the token.
+        client (httpx.AsyncClient | None, optional): Client used for the requests.
+            Defaults to a new client.
+        checkpoint (Checkpoint | None, optional): Checkpoint of the query. Defaults to None.
+        on_progress (ml.ProgressCallback | None, optional): Called with completed and found
+            pages of all shards, see `ml.iter_pages_ml`. Defaults to None.
+
+    Yields:
+        Shard: Date range of the shard and its validated leads.
+    """
+    if rate_limiter is None:
+        async with ml.learned_rate_limiter(api_data.token) as rate_limiter, aclosing(
+            iter_shards(api_data, shard_by, rate_limiter, client, checkpoint, on_progress)
+        ) as fetched_shards:
+            async for shard in fetched_shards:
+                yield shard
+        return
+    if client is None:
+        async with httpx.AsyncClient(http2=True) as client, aclosing(
+            iter_shards(api_data, shard_by, rate_limiter, client, checkpoint, on_progress)
+        ) as fetched_shards:
+            async for shard in fetched_shards:
+                yield shard
+        return
+
+    first_page = None
+    shards = _load_plan(checkpoint, shard_by)
+    if shards is None:
+        shards, first_page = await plan_shards(api_data, shard_by, client, rate_limiter)
+        if checkpoint:
+            checkpoint.write(PLAN, orjson.dumps({"shard_by": shard_by.value, "shards": shards}))
+
+    async def fetch_shard(shard: DateRange) -> Shard:
+        shard_api = api_data.model_copy(update={"date_from": shard[0], "date_to": shard[1]})
+        try:
+            leads = await ml.fetch_all_pages_ml(
+                shard_api,
+                rate_limiter,
+                client,
+                first_page,
+                on_progress=on_progress,
+            )
+        except ml.FETCH_ERRORS as e:
+            logging.error(f"Fetching leads between {shard[0]} and {shard[1]} failed: {e}")
+            raise
+        valid_data = utils.validate_data(leads, strict=False)
+        if checkpoint:
+            checkpoint.save(shard_name(shard), valid_data)
+        return shard, valid_data
+
+    done: list[Shard] = []
+    tasks = []
+    errors: list[Exception] = []
+    for shard in shards:
+        leads = checkpoint.load(shard_name(shard)) if checkpoint else None
+        if leads is None:
+            tasks.append(asyncio.create_task(fetch_shard(shard)))
+        else:
+            done.append((shard, leads))
+    if done:
+        logging.info(f"Resuming the fetch, {len(done)} of {len(shards)} shards already done")
+    try:
+        for done_shard in done:
+            yield done_shard
+        for next_shard in asyncio.as_completed(tasks):
+            try:
+                completed = await next_shard
+            except ml.FETCH_ERRORS as e:
+                # let the other shards complete, so a rerun fetches only the failed ones
+                errors.append(e)
+                continue
+            yield completed
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    if errors:
+        raise errors[0]
+
+
+def dedupe(parts: list[utils.ValidatedDataList]) -> utils.ValidatedDataList:
+    """
+    Merge leads of several shards, keeping one lead per lead_id.
+
+    A lead can show up in two shards when pagination shifts during the fetch,
+    the copy from the later part wins.
+
+    Args:
+        parts (list[utils.ValidatedDataList]): Validated leads of the shards in order.
+
+    Returns:
+        utils.ValidatedDataList: Unique leads in order of their first appearance.
+    """
+    leads = {lead["lead_id"]: lead for part in parts for lead in part}
+    return utils.ValidatedDataList(leads.values())
+
+
+async def fetch_sharded(
+    api_data: models.Api,
+    shard_by: ShardBy = ShardBy.auto,
+    rate_limiter: RateLimiter | None = None,
+    on_progress: ml.ProgressCallback | None = None,
+) -> utils.ValidatedDataList:
+    """
+    Fetch all leads of the query in checkpointed date-range shards.
+
+    An interrupted fetch of the same query resumes from the shards not done yet.
+    The checkpoint is removed once all shards are complete.
+
+    Args:
+        api_data (models.Api): The API request data.
+        shard_by (ShardBy, optional): How the range is split. Defaults to ShardBy.auto.
+        rate_limiter (RateLimiter | None, optional): Limiter shared by all requests.
+            See `iter_shards` for the default.
+        on_progress (ml.ProgressCallback | None, optional): See `iter_shards`.
+            Defaults to None.
+
+    Returns:
+        utils.ValidatedDataList: Validated unique leads in order of shards.
+    """
+    checkpoint = Checkpoint(api_data)
+    parts = {
+        shard: leads
+        async for shard, leads in iter_shards(
+            api_data, shard_by, rate_limiter, None, checkpoint, on_progress
+        )
+    }
+    checkpoint.clear()
+    return dedupe([parts[shard] for shard in sorted(parts)])
@@ -0,0 +1,239 @@
+"""
+Module with a persistent local store of leads.
+Leads are kept in a SQLite database keyed by lead_id together with the days
+which were already synced from the MyLead API. A new run fetches only the days
+missing in the store and a tail of recent days whose statuses can still change.
+"""
+import logging
+import sqlite3
+from collections.abc import Iterator
+from datetime import date, timedelta
+from pathlib import Path
+from types import TracebackType
+
+import orjson
+
+from myleadcli import ml, models, shards, utils
+from myleadcli.options import MUTABLE_DAYS
+from myleadcli.shards import DateRange
+
+LOAD_BATCH_SIZE = 5000  # leads loaded at once by `LeadStore.iter_load`
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leads (
+    lead_id TEXT PRIMARY KEY,
+    day TEXT NOT NULL,
+    status TEXT NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS leads_day ON leads (day);
+CREATE TABLE IF NOT EXISTS synced_days (day TEXT PRIMARY KEY);
+"""
+
+
+def days_to_ranges(days: list[date]) -> list[DateRange]:
+    """
+    Group sorted days into ranges of consecutive days.
+
+    Args:
+        days (list[date]): Sorted list of days.
+
+    Returns:
+        list[DateRange]: Inclusive (first day, last day) ranges.
+    """
+    ranges: list[DateRange] = []
+    for day in days:
+        if ranges and ranges[-1][1] + timedelta(days=1) == day:
+            ranges[-1] = (ranges[-1][0], day)
+        else:
+            ranges.append((day, day))
+    return ranges
+
+
+class LeadStore:
+    """
+    SQLite store of validated leads and of the days synced from the API.
+
+    Args:
+        path (Path | str): Path of the database file, ":memory:" for a temporary store.
+    """
+
+    def __init__(self, path: Path | str) -> None:
+        if isinstance(path, Path):
+            path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+
+    @classmethod
+    def for_token(cls, token: str) -> "LeadStore":
+        """Open the store of the given API token in the cache directory."""
+        return cls(utils.cache_dir() / "leads" / f"{utils.token_key(token)}.sqlite3")
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> "LeadStore":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def missing_ranges(
+        self,
+        date_from: date,
+        date_to: date,
+        mutable_days: int = MUTABLE_DAYS,
+        today: date | None = None,
+    ) -> list[DateRange]:
+        """
+        Return date ranges which have to be fetched from the API.
+
+        Args:
+            date_from (date): First day of the requested range.
+            date_to (date): Last day of the requested range.
+            mutable_days (int, optional): Number of most recent days which are always fetched
+                again, because statuses of their leads can still change. Defaults to MUTABLE_DAYS.
+            today (date | None, optional): The current day. Defaults to date.today().
+
+        Returns:
+            list[DateRange]: Inclusive ranges of days not synced yet or still mutable.
+        """
+        today = today or date.today()
+        mutable_from = today - timedelta(days=mutable_days)
+        synced = {
+            day
+            for (day,) in self.connection.execute(
+                "SELECT day FROM synced_days WHERE day BETWEEN ? AND ?",
+                (date_from.isoformat(), date_to.isoformat()),
+            )
+        }
+        days = (date_from + timedelta(days=i) for i in range((date_to - date_from).days + 1))
+        return days_to_ranges(
+            [day for day in days if day >= mutable_from or day.isoformat() not in synced],
+        )
+
+    def save(self, leads: utils.DataList, date_from: date, date_to: date) -> None:
+        """
+        Replace leads of the synced range with the fetched ones and mark its days as synced.
+
+        Args:
+            leads (utils.DataList): Validated leads fetched for the range.
+            date_from (date): First day of the synced range.
+            date_to (date): Last day of the synced range.
+        """
+        days = [date_from + timedelta(days=i) for i in range((date_to - date_from).days + 1)]
+        with self.connection:
+            self.connection.execute(
+                "DELETE FROM leads WHERE day BETWEEN ? AND ?",
+                (date_from.isoformat(), date_to.isoformat()),
+            )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO leads VALUES (?, ?, ?, ?)",
+                (
+                    (
+                        lead["lead_id"],
+                        lead["created_at"]["date"].date().isoformat(),
+                        lead["status"],
+                        orjson.dumps(lead),
+                    )
+                    for lead in leads
+                ),
+            )
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO synced_days VALUES (?)",
+                ((day.isoformat(),) for day in days),
+            )
+        logging.info(f"Saved {len(leads)} leads synced between {date_from} and {date_to}")
+
+    def iter_load(
+        self,
+        date_from: date,
+        date_to: date,
+        status: str | None = None,
+        batch_size: int = LOAD_BATCH_SIZE,
+    ) -> Iterator[utils.ValidatedDataList]:
+        """
+        Load leads created within the range in batches, so they need not be in memory at once.
+
+        Args:
+            date_from (date): First day of the range.
+            date_to (date): Last day of the range.
+            status (str | None, optional): Status of leads to load. Defaults to None (all).
+            batch_size (int, optional): Number of leads in a batch. Defaults to LOAD_BATCH_SIZE.
+
+        Yields:
+            utils.ValidatedDataList: Batches of the stored leads ordered by creation date.
+                They were validated before saving, so they are not validated again.
+        """
+        query = "SELECT data FROM leads WHERE day BETWEEN ? AND ?"
+        params = [date_from.isoformat(), date_to.isoformat()]
+        if status is not None:
+            query += " AND status = ?"
+            params.append(status)
+        query += " ORDER BY day, lead_id"
+        cursor = self.connection.execute(query, params)
+        while rows := cursor.fetchmany(batch_size):
+            yield utils.ValidatedDataList(orjson.loads(data) for (data,) in rows)
+
+    def load(
+        self,
+        date_from: date,
+        date_to: date,
+        status: str | None = None,
+    ) -> utils.ValidatedDataList:
+        """
+        Load leads created within the range, optionally only those with the given status.
+
+        Args:
+            date_from (date): First day of the range.
+            date_to (date): Last day of the range.
+            status (str | None, optional): Status of leads to load. Defaults to None (all).
+
+        Returns:
+            utils.ValidatedDataList: The stored leads ordered by creation date. They were
+                validated before saving, so they are not validated again.
+        """
+        return utils.ValidatedDataList(
+            lead for batch in self.iter_load(date_from, date_to, status) for lead in batch
+        )
+
+
+async def sync(
+    store: LeadStore,
+    api_data: models.Api,
+    mutable_days: int = MUTABLE_DAYS,
+    shard_by: shards.ShardBy = shards.ShardBy.auto,
+    on_progress: ml.ProgressCallback | None = None,
+) -> None:
+    """
+    Fetch the days of the query which are missing in the store or still mutable.
+
+    Leads of all statuses are fetched, so the status filter can be applied locally.
+    All ranges share one rate limiter. Long ranges are fetched in date-range shards
+    and every shard is saved as soon as it is complete, so an interrupted sync
+    resumes from the shards not saved yet.
+
+    Args:
+        store (LeadStore): The store to update.
+        api_data (models.Api): The API request data with the requested date range.
+        mutable_days (int, optional): Number of most recent days which are always fetched
+            again. Defaults to MUTABLE_DAYS.
+        shard_by (shards.ShardBy, optional): How long ranges are split.
+            Defaults to shards.ShardBy.auto.
+        on_progress (ml.ProgressCallback | None, optional): Called with completed and found
+            pages, see `ml.iter_pages_ml`. Defaults to None.
+    """
+    ranges = store.missing_ranges(api_data.date_from, api_data.date_to, mutable_days)
+    async with ml.learned_rate_limiter(api_data.token) as rate_limiter:
+        for date_from, date_to in ranges:
+            range_api = api_data.model_copy(
+                update={"date_from": date_from, "date_to": date_to, "status": None},
+            )
+            async for shard, leads in shards.iter_shards(
+                range_api, shard_by, rate_limiter, on_progress=on_progress
+            ):
+                store.save(leads, *shard)
@@ -3,6 +3,9 @@ Module for generating and displaying rich tables with aggregated data.
 This module provides functions for aggregating data, creating rich tables,
 and allowing users to choose which statistics to display.
 """
+from math import ceil
+
+import numpy as np
 import pandas as pd
 from rich import box
 from rich.console import Console
@@ -10,7 +13,42 @@ from rich.padding import Padding
 from rich.panel import Panel
 from rich.prompt import Prompt
 from rich.table import Table
-from myleadcli.utils import generate_caption
+
+from myleadcli.session import Session
+
+OTHER_LABEL = "Other"
+OPTIONS = {
+    "1": {
+        "title": "Statistics based on the device of lead origin.",
+        "group_by_column": "user_agent.device",
+        "column_name": "Device Type",
+    },
+    "2": {
+        "title": "Statistics based on the operating system of lead origin.",
+        "group_by_column": "user_agent.operation_system",
+        "column_name": "Operating System",
+    },
+    "3": {
+        "title": "Statistics based on the country of lead origin.",
+        "group_by_column": "country",
+        "column_name": "Country",
+    },
+    "4": {
+        "title": "Statistics by campaign.",
+        "group_by_column": "campaign_name",
+        "column_name": "Campaign name",
+    },
+    "5": {
+        "title": "Statistics by hour of the day.",
+        "group_by_column": "hour_of_day",
+        "column_name": "Hour",
+    },
+    "6": {
+        "title": "Statistics by day of the week.",
+        "group_by_column": "day_of_week",
+        "column_name": "Day",
+    },
+}
 
 
 def aggregate_data(
@@ -42,6 +80,72 @@ def aggregate_data(
     )
 
 
+def _percent(values: np.ndarray, total: float) -> np.ndarray:
+    """Return the values as percentages of the total, zeros when the total is zero."""
+    return np.divide(values * 100, total, out=np.zeros(len(values)), where=total != 0)
+
+
+def format_rows(
+    data: pd.DataFrame,
+    group_by_column: str,
+    num_of_leads: int,
+    sum_payouts: float,
+) -> pd.DataFrame:
+    """
+    Format the cells of all rows of an aggregated table at once.
+
+    Args:
+        data (pd.DataFrame): The aggregated data, it is not modified.
+        group_by_column (str): The column used for grouping.
+        num_of_leads (int): The total number of leads.
+        sum_payouts (float): The total sum of payouts.
+
+    Returns:
+        pd.DataFrame: Columns "label", "leads" and "payout" with the text of the cells.
+    """
+    counts = data["grouped_data"].to_numpy()
+    payouts = data["total_payout"].to_numpy(dtype=np.float64)
+    return pd.DataFrame(
+        {
+            "label": data[group_by_column].astype(str).to_numpy(),
+            "leads": np.char.add(
+                counts.astype(str),
+                np.char.mod(" (%.2f%%)", _percent(counts, num_of_leads)),
+            ),
+            "payout": np.char.add(
+                np.char.mod("%.2f", payouts),
+                np.char.mod(" (%.2f%%)", _percent(payouts, sum_payouts)),
+            ),
+        },
+    )
+
+
+def rollup(data: pd.DataFrame, group_by_column: str, top_n: int) -> pd.DataFrame:
+    """
+    Keep the first `top_n` rows of aggregated data and sum the rest into one "Other" row.
+
+    Args:
+        data (pd.DataFrame): The aggregated data, already sorted.
+        group_by_column (str): The column used for grouping.
+        top_n (int): Number of rows to keep, 0 keeps all rows.
+
+    Returns:
+        pd.DataFrame: The data with at most `top_n + 1` rows.
+    """
+    if not top_n or len(data) <= top_n:
+        return data
+    rest = data.iloc[top_n:]
+    other = pd.DataFrame(
+        {
+            group_by_column: [OTHER_LABEL],
+            "grouped_data": [rest["grouped_data"].sum()],
+            "total_payout": [rest["total_payout"].sum()],
+        },
+    )
+    top = data.iloc[:top_n].astype({group_by_column: str})
+    return pd.concat([top, other], ignore_index=True)
+
+
 def create_table(
     data: pd.DataFrame,
     title: str,
@@ -50,10 +154,14 @@ def create_table(
     group_by_column: str,
     num_of_leads: int,
     sum_payouts: float,
+    page_size: int = 0,
 ) -> None:
     """
     Create a rich table to display aggregated data.
 
+    With a page size the rows are printed as a sequence of smaller tables,
+    so a table with thousands of rows is never built in memory at once.
+
     Args:
         data (pd.DataFrame): The aggregated data.
         title (str): The title of the table.
@@ -62,67 +170,74 @@ def create_table(
         group_by_column (str): The column used for grouping.
         num_of_leads (int): The total number of leads.
         sum_payouts (float): The total sum of payouts.
+        page_size (int, optional): Number of rows per printed table, 0 prints
+            all rows in one table. Defaults to 0.
     """
-    table = Table(title=title, caption=caption, box=box.ROUNDED, header_style="gold1")
-    table.add_column(column_name, justify="left", style="cyan", no_wrap=True)
-    table.add_column(
-        "No. of leads (% of total)",
-        justify="right",
-        style="white",
-        no_wrap=True,
-    )
-    table.add_column(
-        "Total payout (% of total)",
-        justify="right",
-        style="green",
-        no_wrap=True,
-    )
-    data[group_by_column] = data[group_by_column].astype(str)
-
-    for _, row in data.iterrows():
-        grouped_data_percent = row["grouped_data"] / num_of_leads * 100
-        total_payout_percent = row["total_payout"] / sum_payouts * 100
-        table.add_row(
-            row[group_by_column],
-            f"{row['grouped_data']} ({grouped_data_percent:.2f}%)",
-            f"{row['total_payout']:.2f} ({total_payout_percent:.2f}%)",
-        )
+    rows = format_rows(data, group_by_column, num_of_leads, sum_payouts)
+    page_size = page_size or max(len(rows), 1)
+    num_of_pages = max(ceil(len(rows) / page_size), 1)
 
     console = Console()
     console.rule(style="gold1")
-    console.print(Padding(table, 1))
+    for page in range(num_of_pages):
+        page_caption = caption if num_of_pages == 1 else f"{caption} ({page + 1}/{num_of_pages})"
+        table = Table(title=title, caption=page_caption, box=box.ROUNDED, header_style="gold1")
+        table.add_column(column_name, justify="left", style="cyan", no_wrap=True)
+        table.add_column(
+            "No. of leads (% of total)",
+            justify="right",
+            style="white",
+            no_wrap=True,
+        )
+        table.add_column(
+            "Total payout (% of total)",
+            justify="right",
+            style="green",
+            no_wrap=True,
+        )
+        page_rows = rows.iloc[page * page_size : (page + 1) * page_size]
+        for row in page_rows.itertuples(index=False, name=None):
+            table.add_row(*row)
+        console.print(Padding(table, 1))
 
 
 def table_from_data(
-    data: pd.DataFrame,
+    session: Session,
     title: str,
     group_by_column: str,
     column_name: str,
     sort_by: str = "total_payout",
+    status: str | None = None,
+    top_n: int = 0,
+    page_size: int = 0,
 ) -> None:
     """
-    Create a rich table from input data.
+    Create a rich table from the aggregates of a session.
 
     Args:
-        data (pd.DataFrame): The input data.
+        session (Session): The session with aggregated leads.
         title (str): The title of the table.
         group_by_column (str): The column to group by.
         column_name (str): The name of the column to display.
         sort_by (str, optional): The column to sort the result by. Defaults to "total_payout".
+        status (str | None, optional): Show only leads with this status. Defaults to None.
+        top_n (int, optional): Show only this many rows and sum the rest into
+            an "Other" row, 0 shows all rows. Defaults to 0.
+        page_size (int, optional): Number of rows per printed table, 0 prints
+            all rows in one table. Defaults to 0.
     """
-    caption = generate_caption(data)
-    num_of_leads = data.shape[0]
-    result = aggregate_data(data, group_by_column=group_by_column, sort_by=sort_by)
+    result = session.aggregate(group_by_column, sort_by=sort_by, status=status)
     sum_payouts = result["total_payout"].sum()
 
     create_table(
-        data=result,
+        data=rollup(result, group_by_column, top_n),
         title=title,
-        caption=caption,
+        caption=session.caption(status),
         column_name=column_name,
         group_by_column=group_by_column,
-        num_of_leads=num_of_leads,
+        num_of_leads=session.num_of_leads(status),
         sum_payouts=sum_payouts,
+        page_size=page_size,
     )
 
 
@@ -146,46 +261,18 @@ def print_console(console: Console, options: dict[str, dict]) -> None:
     )
 
 
-def choose_table(df: pd.DataFrame) -> None:
+def choose_table(session: Session, top_n: int = 0, page_size: int = 0) -> None:
     """
     Display a menu of statistics options and allow the user to choose which one to display.
 
     Args:
-        df (pd.DataFrame): The input DataFrame.
+        session (Session): The session with aggregated leads.
+        top_n (int, optional): Show only this many rows of every table and sum
+            the rest into an "Other" row, 0 shows all rows. Defaults to 0.
+        page_size (int, optional): Number of rows per printed table, 0 prints
+            all rows in one table. Defaults to 0.
     """
     console = Console()
-    OPTIONS = {
-        "1": {
-            "title": "Statistics based on the device of lead origin.",
-            "group_by_column": "user_agent.device",
-            "column_name": "Device Type",
-        },
-        "2": {
-            "title": "Statistics based on the operating system of lead origin.",
-            "group_by_column": "user_agent.operation_system",
-            "column_name": "Operating System",
-        },
-        "3": {
-            "title": "Statistics based on the country of lead origin.",
-            "group_by_column": "country",
-            "column_name": "Country",
-        },
-        "4": {
-            "title": "Statistics by campaign.",
-            "group_by_column": "campaign_name",
-            "column_name": "Campaign name",
-        },
-        "5": {
-            "title": "Statistics by hour of the day.",
-            "group_by_column": "hour_of_day",
-            "column_name": "Hour",
-        },
-        "6": {
-            "title": "Statistics by day of the week.",
-            "group_by_column": "day_of_week",
-            "column_name": "Day",
-        },
-    }
     print_console(console, OPTIONS)
 
     while True:
@@ -199,7 +286,7 @@ def choose_table(df: pd.DataFrame) -> None:
             break
 
         if option := OPTIONS.get(choice):
-            table_from_data(df, **option)
+            table_from_data(session, **option, top_n=top_n, page_size=page_size)
         else:
             console.print("Wrong input")
 
@@ -1,41 +1,152 @@
+import hashlib
 import logging
-import time
-from collections.abc import Callable
-from datetime import datetime, timedelta
+import re
+from collections.abc import Iterable
 from typing import Any
 
+import numpy as np
 import orjson
 import pandas as pd
-from pydantic import ValidationError
+from pyarrow import feather
+from pydantic import TypeAdapter, ValidationError
+from pydantic_core import ErrorDetails
 
-from myleadcli import models
+from myleadcli import decoder, models
+from myleadcli.cache import cache_dir, token_key  # noqa: F401 re-exported
+from myleadcli.options import FileFormat, one_year_ago_day  # noqa: F401 re-exported
+from myleadcli.profiling import benchmark, span  # noqa: F401 benchmark re-exported
 
 DataList = list[dict[str, Any]]
 
+LEADS_FILE = "myleadcli_leads_data"
+SCHEMA_VERSION = 1  # bump whenever models.Lead changes
+LEADS_MARKER = b',"leads":'
+PAGES_PREFIX = b'{"pages":['  # file with raw API responses of all pages
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+NS_PER_HOUR = 3_600_000_000_000
+NS_PER_DAY = 24 * NS_PER_HOUR
+EPOCH_WEEKDAY = 3  # 1970-01-01 was a Thursday
+# `name=key` entry of an account list, keys ending with = padding are not split
+ACCOUNT_ENTRY = re.compile(r"\s*([A-Za-z0-9_-]+)\s*=\s*([^=\s].*)")
 
-def validate_data(data: DataList) -> DataList:
+
+class ValidatedDataList(list[dict[str, Any]]):
+    """List of leads which were validated during this run or written by this tool."""
+
+
+LEADS_ADAPTER = TypeAdapter(list[models.LeadDict])
+InvalidLeads = dict[int, list[ErrorDetails]]
+
+
+def leads_file(file_format: FileFormat) -> str:
+    """Return the name of the file with saved leads in the given format."""
+    return f"{LEADS_FILE}.{file_format.value}"
+
+
+def invalid_leads(error: ValidationError) -> InvalidLeads:
+    """
+    Group errors of a validated list of leads by the index of the invalid lead.
+
+    Args:
+        error (ValidationError): The error raised by LEADS_ADAPTER.
+
+    Returns:
+        InvalidLeads: Errors of every invalid lead keyed by its index in the list.
+    """
+    invalid: InvalidLeads = {}
+    for details in error.errors():
+        invalid.setdefault(int(details["loc"][0]), []).append(details)
+    return invalid
+
+
+def validate_leads(data: DataList) -> tuple[ValidatedDataList, InvalidLeads]:
+    """
+    Validates all leads in one call and collects the invalid ones instead of failing.
+
+    Args:
+        data (DataList): The list of data to validate.
+
+    Returns:
+        tuple[ValidatedDataList, InvalidLeads]: Valid leads and errors of invalid leads
+            keyed by their index in `data`."""
+    try:
+        return ValidatedDataList(LEADS_ADAPTER.validate_python(data)), {}
+    except ValidationError as e:
+        invalid = invalid_leads(e)
+    valid_items = [item for index, item in enumerate(data) if index not in invalid]
+    return ValidatedDataList(LEADS_ADAPTER.validate_python(valid_items)), invalid
+
+
+def report_invalid_leads(invalid: InvalidLeads) -> None:
+    """Log every skipped invalid lead with its index and reasons."""
+    for index, errors in invalid.items():
+        reasons = "; ".join(f"{'.'.join(map(str, e['loc'][1:]))}: {e['msg']}" for e in errors)
+        logging.error(f"Lead n.{index} is invalid and was skipped. {reasons}")
+
+
+def validate_data(data: DataList, strict: bool = True) -> ValidatedDataList:
     """
     Validates the data in the provided list and returns a list of valid data.
 
+    The whole list is validated in one call of the LEADS_ADAPTER straight into dicts.
+    Data which is already a ValidatedDataList is returned as it is,
+    so every lead is validated only once per run.
+
     Args:
         data (DataList): The list of data to validate.
+        strict (bool, optional): Raise on the first invalid lead. When False, invalid
+            leads are reported with their index and skipped. Defaults to True.
 
     Returns:
-        DataList: The list of valid data.
+        ValidatedDataList: The list of valid data.
 
     Raises:
-        ValidationError: Raised when validation fails for any item in the data list."""
-    valid_data = []
-    try:
-        valid_data = [models.Lead.model_validate(item).model_dump() for item in data]
-    except ValidationError as e:
-        raise e
+        ValidationError: Raised when validation fails for any item in the data list
+            and `strict` is set."""
+    if isinstance(data, ValidatedDataList):
+        return data
+    with span("validation", items=len(data)):
+        if strict:
+            return ValidatedDataList(LEADS_ADAPTER.validate_python(data))
+        valid_data, invalid = validate_leads(data)
+    report_invalid_leads(invalid)
     return valid_data
 
 
+def validate_json(content: bytes, strict: bool = True) -> ValidatedDataList:
+    """
+    Validates a JSON array of leads directly from raw bytes.
+
+    Falls back to parsing the bytes and validating the leads one list at a time
+    when some leads are invalid and `strict` is not set.
+
+    Args:
+        content (bytes): JSON array of leads.
+        strict (bool, optional): Raise on the first invalid lead. When False, invalid
+            leads are reported with their index and skipped. Defaults to True.
+
+    Returns:
+        ValidatedDataList: The list of valid data.
+
+    Raises:
+        ValidationError: Raised when validation fails for any lead and `strict` is set."""
+    try:
+        with span("validation") as current:
+            valid_data = ValidatedDataList(LEADS_ADAPTER.validate_json(content))
+            current.items = len(valid_data)
+        return valid_data
+    except ValidationError:
+        if strict:
+            raise
+    return validate_data(orjson.loads(content), strict=False)
+
+
 def data_to_file(file_name: str, data: DataList) -> None:
     """Save validated data to a binary file.
 
+    The leads are preceded by a header with the schema version and the checksum
+    of the leads, so the file can be trusted without validation when read back.
+
     Args:
         file_name (str): The name of the file to save the data.
         data (List): The list of data to be saved.
@@ -44,19 +155,163 @@ def data_to_file(file_name: str, data: DataList) -> None:
         None
     """
     valid_data = validate_data(data)
+    leads = orjson.dumps(valid_data, option=orjson.OPT_INDENT_2)
+    header = orjson.dumps(
+        {"schema_version": SCHEMA_VERSION, "checksum": hashlib.sha256(leads).hexdigest()},
+    )
     with open(file_name, "wb") as f:
-        content = orjson.dumps(valid_data, option=orjson.OPT_INDENT_2)
-        f.write(content)
+        f.write(header[:-1] + LEADS_MARKER + leads + b"}")
         logging.info(f"Data saved to file {file_name}")
 
 
-def data_from_file(file_name: str) -> DataList:
+def pages_to_file(file_name: str, pages: list[bytes]) -> None:
+    """Save raw API responses of pages to a binary file as they were received.
+
+    The responses are neither decoded nor encoded again, so their leads
+    are validated when the file is read back.
+
+    Args:
+        file_name (str): The name of the file to save the data.
+        pages (list[bytes]): JSON responses of the pages in page order.
+
+    Returns:
+        None
+    """
+    with open(file_name, "wb") as f:
+        f.write(PAGES_PREFIX)
+        for index, page in enumerate(pages):
+            f.write(b"," + page if index else page)
+        f.write(b"]}")
+        logging.info(f"Data saved to file {file_name}")
+
+
+def leads_from_pages(content: bytes) -> DataList:
+    """
+    Return leads of all pages in a file written by `pages_to_file`.
+
+    A lead on several pages, because new leads shifted the pages during the fetch,
+    is returned only once.
+
+    Args:
+        content (bytes): Content of the file.
+
+    Returns:
+        DataList: Leads of the pages in page order, not validated.
+    """
+    return unique_leads(
+        lead for page in orjson.loads(content)["pages"] for lead in page["data"][0]["conversions"]
+    )
+
+
+def unique_leads(leads: Iterable[dict[str, Any]]) -> DataList:
+    """
+    Keep the first of leads with the same id, as returned by the API.
+
+    Args:
+        leads (Iterable[dict[str, Any]]): Leads not validated yet, in page order.
+
+    Returns:
+        DataList: Leads in order of their first appearance. Leads without an id
+            are all kept, so their validation reports them.
+    """
+    unique: dict[Any, dict[str, Any]] = {}
+    for lead in leads:
+        unique.setdefault(lead.get("id", id(lead)), lead)
+    return list(unique.values())
+
+
+def split_leads_file(content: bytes) -> tuple[dict[str, Any] | None, bytes]:
+    """
+    Split content of a file with leads into its header and the JSON array of leads.
+
+    Args:
+        content (bytes): Content of the file.
+
+    Returns:
+        tuple[dict[str, Any] | None, bytes]: The header written by `data_to_file`,
+            None for plain JSON arrays, and the leads.
+    """
+    index = content.find(LEADS_MARKER)
+    if not content.startswith(b'{"schema_version":') or index < 0:
+        return None, content
+    return orjson.loads(content[:index] + b"}"), content[index + len(LEADS_MARKER) : -1]
+
+
+def is_trusted(header: dict[str, Any] | None, leads: bytes) -> bool:
+    """
+    Check whether leads from a file were written by this tool and not changed since.
+
+    Args:
+        header (dict[str, Any] | None): The header of the file.
+        leads (bytes): JSON array of leads.
+
+    Returns:
+        bool: True when the schema version is current and the checksum matches.
+    """
+    if header is None:
+        return False
+    if header["schema_version"] != SCHEMA_VERSION:
+        logging.info(f"File has an outdated schema version {header['schema_version']}")
+        return False
+    if header["checksum"] != hashlib.sha256(leads).hexdigest():
+        logging.warning("Checksum of the file does not match, leads will be validated")
+        return False
+    return True
+
+
+def data_from_file(file_name: str) -> ValidatedDataList:
+    """Read leads from a file, validating them unless the file can be trusted.
+
+    Files with raw API responses of pages are always validated.
+    Invalid leads in untrusted files are reported and skipped.
+
+    Args:
+        file_name (str): The name of the file to read the data from.
+
+    Returns:
+        ValidatedDataList: The list of valid data.
+    """
     with open(file_name, "rb") as f:
         json_bytes = f.read()
         logging.info(f"Data read from file {file_name}")
-    # Deserialize using orjson
-    data_from_json = orjson.loads(json_bytes)
-    return validate_data(data_from_json)
+    if json_bytes.startswith(PAGES_PREFIX):
+        return validate_data(leads_from_pages(json_bytes), strict=False)
+    header, leads = split_leads_file(json_bytes)
+    if is_trusted(header, leads):
+        # Deserialize using orjson
+        return ValidatedDataList(orjson.loads(leads))
+    return validate_json(leads, strict=False)
+
+
+def dataframe_to_file(file_name: str, df: pd.DataFrame) -> None:
+    """Save a processed DataFrame to an uncompressed Feather (Arrow IPC) file.
+
+    Categorical and datetime dtypes are preserved, and the uncompressed file
+    can be memory mapped when it is read back.
+
+    Args:
+        file_name (str): The name of the file to save the data.
+        df (pd.DataFrame): The processed DataFrame to be saved.
+
+    Returns:
+        None
+    """
+    df.to_feather(file_name, compression="uncompressed")
+    logging.info(f"DataFrame saved to file {file_name}")
+
+
+def dataframe_from_file(file_name: str) -> pd.DataFrame:
+    """Load a processed DataFrame saved by `dataframe_to_file` using memory mapping.
+
+    Args:
+        file_name (str): The name of the file to read the data from.
+
+    Returns:
+        pd.DataFrame: The processed DataFrame, no validation is needed.
+    """
+    table = feather.read_table(file_name, memory_map=True)
+    logging.info(f"DataFrame read from file {file_name}")
+    return table.to_pandas()
 
 
 def get_dataframe(data: DataList) -> pd.DataFrame:
@@ -65,26 +320,179 @@ def get_dataframe(data: DataList) -> pd.DataFrame:
 
     Args:
         data (list[dict[str, Any]]): The list of data to convert to a DataFrame.
+            It is validated unless it is a ValidatedDataList.
 
     Returns:
         pd.DataFrame: The DataFrame containing the normalized data.
     """
     validated_data = validate_data(data)
 
-    return pd.json_normalize(validated_data)
+    return decoder.decode_leads(validated_data)
+
+
+def filter_status(df: pd.DataFrame, status: str | None) -> pd.DataFrame:
+    """
+    Keep only leads with the given status, as the API does when fetching with a status.
+
+    Args:
+        df (pd.DataFrame): Normalized or processed leads.
+        status (str | None): Status of leads to keep, None keeps all leads.
+
+    Returns:
+        pd.DataFrame: The leads with the status.
+    """
+    if status is None:
+        return df
+    return df[df["status"] == status].reset_index(drop=True)
+
+
+def concat_frames(frames: dict[int, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenate DataFrame chunks of single pages in the order of page numbers.
+
+    Args:
+        frames (dict[int, pd.DataFrame]): DataFrames keyed by the number of their page.
+
+    Returns:
+        pd.DataFrame: One DataFrame with rows in page order, empty if there are no rows.
+    """
+    chunks = [frames[page] for page in sorted(frames) if not frames[page].empty]
+    if not chunks:
+        return pd.DataFrame()
+    # categoricals stay categoricals only if all chunks share the same categories
+    for column in chunks[0].select_dtypes("category"):
+        categories = sorted(set().union(*(chunk[column].cat.categories for chunk in chunks)))
+        for chunk in chunks:
+            chunk[column] = chunk[column].cat.set_categories(categories)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def apply_dtypes(columns: dict[str, Any], dtypes: dict[str, Any]) -> pd.DataFrame:
+    """
+    Build a DataFrame from columns, converting some of them to their target dtypes.
+
+    Only columns whose dtype changes are converted, all other columns, including
+    those already of the target dtype, are used without copying.
+
+    Args:
+        columns (dict[str, Any]): Columns of the DataFrame in order, Series or arrays.
+        dtypes (dict[str, Any]): Target dtypes of the columns which have one.
+
+    Returns:
+        pd.DataFrame: The DataFrame sharing the unconverted columns.
+    """
+    with span("categorical_conversion") as current:
+        converted = {
+            column: pd.Series(columns[column], copy=False).astype(dtype, copy=False)
+            for column, dtype in dtypes.items()
+        }
+        df = pd.DataFrame(columns | converted, copy=False)
+        current.items = len(df)
+    return df
 
 
 def convert_to_categorical(columns: list[str], df_to_convert: pd.DataFrame) -> pd.DataFrame:
-    """Converts all specified columns of a dataframe to categorical types."""
-    df_out = df_to_convert.copy()
-    for column in columns:
-        df_out[column] = df_out[column].astype("category")
-    return df_out
+    """Converts all specified columns of a dataframe to categorical types without copying others."""
+    return apply_dtypes(
+        {column: df_to_convert[column] for column in df_to_convert},
+        dict.fromkeys(columns, "category"),
+    )
 
 
-def one_year_ago_day() -> str:
-    "Return string with a date from one year ago."
-    return str((datetime.now() - timedelta(days=365)).date())
+def local_datetimes(dates: pd.Series, timezones: pd.Series) -> pd.Series:
+    """
+    Bring creation dates given in the timezones of their leads to one local time.
+
+    MyLead API returns local times of the timezone of every lead. When all leads
+    share one timezone the dates are returned unchanged, otherwise they are
+    converted to the most common timezone.
+
+    Args:
+        dates (pd.Series): Naive creation dates, `created_at.date`.
+        timezones (pd.Series): Timezone names of the dates, `created_at.timezone`.
+
+    Returns:
+        pd.Series: Naive creation dates in the most common timezone.
+    """
+    counts = timezones.value_counts()
+    counts = counts[counts > 0]
+    if len(counts) <= 1:
+        return dates
+    target = counts.index[0]
+    result = dates.copy()
+    for timezone, index in dates.groupby(timezones, observed=True).groups.items():
+        if timezone == target:
+            continue
+        try:
+            result.loc[index] = (
+                dates.loc[index]
+                .dt.tz_localize(timezone, ambiguous=False, nonexistent="shift_forward")
+                .dt.tz_convert(target)
+                .dt.tz_localize(None)
+            )
+        except KeyError:
+            logging.warning(f"Unknown timezone {timezone}, its dates were left unchanged")
+    return result
+
+
+def split_datetimes(dates: pd.Series) -> dict[str, Any]:
+    """
+    Derive the hour, the day of the week and the day of dates with integer arithmetic.
+
+    Args:
+        dates (pd.Series): Naive dates without missing values.
+
+    Returns:
+        dict[str, Any]: Columns `hour_of_day` (int), `day_of_week` (categorical of DAY_NAMES)
+            and `date` (datetime64 at midnight), aligned with the dates.
+    """
+    nanoseconds = dates.to_numpy(dtype="datetime64[ns]").view(np.int64)
+    days = nanoseconds // NS_PER_DAY
+    return {
+        "hour_of_day": (nanoseconds - days * NS_PER_DAY) // NS_PER_HOUR,
+        "day_of_week": pd.Categorical.from_codes(
+            (days + EPOCH_WEEKDAY) % len(DAY_NAMES),
+            categories=DAY_NAMES,
+        ),
+        "date": (days * NS_PER_DAY).view("datetime64[ns]"),
+    }
+
+
+def parse_accounts(text: str) -> list[models.Account]:
+    """
+    Parse API keys of accounts, one per line or separated by commas.
+
+    Every key can be preceded by a name of its account, as in `name=key`.
+    Names consist of letters, digits, `_` and `-`, so a key with `=` padding
+    such as `a2V5==` is read as a key without a name.
+    Accounts without a name are named by `token_key` of their key, so keys are never shown.
+    Empty lines and lines starting with # are skipped.
+
+    Args:
+        text (str): Content of a file with keys or the value of an environment variable.
+
+    Returns:
+        list[models.Account]: Accounts in the given order.
+
+    Raises:
+        ValueError: Raised when two accounts have the same name.
+    """
+    accounts: list[models.Account] = []
+    for line in text.splitlines():
+        if line.lstrip().startswith("#"):
+            continue
+        for entry in line.split(","):
+            if match := ACCOUNT_ENTRY.fullmatch(entry):
+                name, token = match.groups()
+            else:  # no name given
+                name, token = "", entry
+            if token := token.strip():
+                accounts.append(models.Account(name=name or token_key(token), token=token))
+    names = [account.name for account in accounts]
+    if len(set(names)) != len(names):
+        msg = f"Account names are not unique: {', '.join(names)}"
+        raise ValueError(msg)
+    return accounts
 
 
 def generate_caption(df: pd.DataFrame) -> str:
@@ -100,19 +508,3 @@ def generate_caption(df: pd.DataFrame) -> str:
     end_date = df["created_at.date"].max().date()
     num_of_leads = df.shape[0]
     return f"Data gathered between {start_date} and {end_date} from {num_of_leads} leads"
-
-
-def benchmark(func: Callable[..., Any]) -> Callable[..., Any]:
-    """Decorator to benchmark the execution time of a function."""
-
-    def wrapper(*args: Any, **kwargs: Any) -> Any:
-        """Wrapper function that calculates and logs the execution time."""
-        start_time = time.perf_counter()
-        value = func(*args, **kwargs)
-        end_time = time.perf_counter()
-        logging.info(
-            f"The execution of {func.__name__} took {end_time - start_time:.5f} seconds",
-        )
-        return value
-
-    return wrapper
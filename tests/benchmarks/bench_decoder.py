@@ -0,0 +1,28 @@
+"""
+Benchmark of decoding validated leads into a DataFrame against pd.json_normalize.
+
+Run with: python -m tests.benchmarks.bench_decoder [number of leads]
+"""
+import sys
+
+import pandas as pd
+
+from myleadcli import decoder, utils
+from tests.benchmarks.common import make_leads, timed
+from tests.test_decoder import as_json_normalize
+
+
+def main(num_leads: int) -> None:
+    data = utils.validate_data(make_leads(num_leads))
+    print(f"Decoding {num_leads} leads")
+
+    expected = timed("pd.json_normalize", pd.json_normalize, data)
+    df = timed("decoder.decode_leads", decoder.decode_leads, data)
+
+    memory = df.memory_usage(deep=True).sum() / expected.memory_usage(deep=True).sum()
+    print(f"Memory of the decoded DataFrame: {memory:.0%} of the normalized one")
+    pd.testing.assert_frame_equal(as_json_normalize(df), expected)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,59 @@
+"""
+End-to-end benchmark of `ml.fetch_all_pages_ml` against the mock MyLead API.
+
+The fetch runs on virtual time, so its leads per second include the rate limit,
+latency and retries of the API while the benchmark takes only the real time
+of the CPU work. The rate limit of 20 requests per minute with 500 leads per page
+caps the throughput at about 166 leads per second.
+
+Run with: python -m tests.benchmarks.bench_fetch [number of leads]
+"""
+import asyncio
+import logging
+import sys
+from time import perf_counter
+
+import httpx
+
+from myleadcli import ml, models
+from myleadcli.ratelimit import RateLimiter
+from tests.benchmarks.mock_api import MockMyLeadApi, run_fast_forward
+
+# (label, seconds of latency, seconds of jitter, requests per minute the client starts with,
+#  whether the API sends rate limit headers)
+SCENARIOS = [
+    ("fast API", 0.1, 0.05, ml.RATE_LIMIT, True),
+    ("typical API", 0.3, 0.2, ml.RATE_LIMIT, True),
+    ("slow API", 3.0, 2.0, ml.RATE_LIMIT, True),
+    ("limit too high", 0.3, 0.2, 40, True),
+    ("no limit headers", 0.3, 0.2, 40, False),
+]
+
+
+async def fetch(server: MockMyLeadApi, max_calls: int) -> list[dict]:
+    """Fetch all leads of the server with a fresh rate limiter on the loop clock."""
+    limiter = RateLimiter(max_calls, ml.RATE_LIMIT_PERIOD, clock=asyncio.get_running_loop().time)
+    api = models.Api(token="benchmark", limit=500)
+    async with httpx.AsyncClient(transport=server) as client:
+        return await ml.fetch_all_pages_ml(api, limiter, client, resume=False)
+
+
+def main(num_leads: int) -> None:
+    logging.getLogger().setLevel(logging.CRITICAL)  # rejected requests are counted instead
+    print(f"Fetching {num_leads} leads from the mock API with 20 requests per minute")
+    for label, latency, jitter, max_calls, send_headers in SCENARIOS:
+        server = MockMyLeadApi(num_leads, latency, jitter, send_headers=send_headers)
+        start_time = perf_counter()
+        leads, virtual_seconds = run_fast_forward(fetch(server, max_calls))
+        real_seconds = perf_counter() - start_time
+
+        assert [lead["id"] for lead in leads] == [lead["id"] for lead in server.leads]
+        print(
+            f"{label:<16} {len(leads) / virtual_seconds:8.1f} leads/s "
+            f"{virtual_seconds:8.1f} s virtual {real_seconds:6.2f} s real "
+            f"{server.requests:5} requests {server.rejected:4} rejected",
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,47 @@
+"""
+Benchmark of the peak memory of building the DataFrame of a store sync.
+
+The leads are loaded from an in-memory store either all at once into dicts
+or in batches into a decoder.LeadBuffer, as main.sync_store does.
+
+Run with: python -m tests.benchmarks.bench_memory [number of leads]
+"""
+import sys
+from datetime import date
+
+import pandas as pd
+
+from myleadcli import decoder, store, utils
+from tests.benchmarks.common import make_leads, peak_memory, timed
+
+DATE_FROM = date(2000, 1, 1)
+DATE_TO = date(2100, 1, 1)
+
+
+def load_all(lead_store: store.LeadStore) -> pd.DataFrame:
+    """Load all leads into dicts first, the way sync_store did before."""
+    return utils.get_dataframe(lead_store.load(DATE_FROM, DATE_TO))
+
+
+def load_buffered(lead_store: store.LeadStore) -> pd.DataFrame:
+    buffer = decoder.LeadBuffer()
+    for leads in lead_store.iter_load(DATE_FROM, DATE_TO):
+        buffer.append(leads)
+    return buffer.to_frame()
+
+
+def main(num_leads: int) -> None:
+    with store.LeadStore(":memory:") as lead_store:
+        lead_store.save(utils.validate_data(make_leads(num_leads)), DATE_FROM, DATE_FROM)
+        print(f"Peak memory of loading {num_leads} leads from the store")
+
+        expected = peak_memory("all leads as dicts (legacy)", load_all, lead_store)
+        df = peak_memory("batches into LeadBuffer", load_buffered, lead_store)
+        timed("all leads as dicts (legacy)", load_all, lead_store)
+        timed("batches into LeadBuffer", load_buffered, lead_store)
+
+    pd.testing.assert_frame_equal(df, expected)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500_000)
@@ -0,0 +1,203 @@
+"""
+Benchmark suite of every stage of the pipeline on seeded synthetic leads.
+
+Each stage runs twice per size: the first run measures its time and the second
+its peak of allocated memory with tracemalloc, which would slow down the first.
+Results are written as JSON and compared with a stored baseline. A stage slower
+or bigger than in the baseline by more than the tolerance fails the run.
+
+Run with: python -m tests.benchmarks.bench_pipeline [--sizes 10000 100000 1000000]
+    [--output benchmark_results.json] [--baseline tests/benchmarks/baseline.json]
+Store a new baseline with: python -m tests.benchmarks.bench_pipeline --output BASELINE
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import sys
+import tempfile
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+from time import perf_counter
+from typing import Any
+
+from myleadcli import main, session, tables, utils
+from myleadcli.options import LeadStatus
+from tests.benchmarks.synthetic import SEED, generate_leads
+
+SIZES = [10_000, 100_000, 1_000_000]
+BASELINE = Path(__file__).with_name("baseline.json")
+OUTPUT = "benchmark_results.json"
+TOLERANCE = 0.25  # relative increase of a metric over the baseline reported as a regression
+# absolute increases below these are noise of short stages, not regressions
+NOISE = {"seconds": 0.02, "peak_mib": 2.0}
+MIB = 2**20
+
+Results = dict[str, dict[str, dict[str, float]]]  # size -> stage -> metric -> value
+
+
+def measure(func: Callable[..., Any], *args: Any) -> tuple[Any, dict[str, float]]:
+    """
+    Run a stage once timed and once with traced allocations.
+
+    Args:
+        func (Callable[..., Any]): The stage.
+        *args (Any): Its arguments.
+
+    Returns:
+        tuple[Any, dict[str, float]]: Result of the stage, its seconds and peak MiB.
+    """
+    start_time = perf_counter()
+    func(*args)
+    seconds = perf_counter() - start_time
+    tracemalloc.start()
+    try:
+        result = func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, {"seconds": seconds, "peak_mib": peak / MIB}
+
+
+def aggregate(stats_session: session.Session) -> None:
+    """Answer the table of every dimension, for all leads and for every status."""
+    for dimension in session.DIMENSIONS:
+        for status in [None, *(status.value for status in LeadStatus)]:
+            stats_session.aggregate(dimension, status=status)
+
+
+def create_tables(stats_session: session.Session) -> None:
+    """Render the table of every dimension without printing it."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        for dimension in session.DIMENSIONS:
+            tables.table_from_data(stats_session, dimension, dimension, dimension)
+
+
+def run_stages(leads: utils.DataList, directory: Path) -> dict[str, dict[str, float]]:
+    """
+    Measure every stage of the pipeline, each on the result of the previous one.
+
+    Args:
+        leads (utils.DataList): Leads as returned by the API.
+        directory (Path): Directory for the saved files.
+
+    Returns:
+        dict[str, dict[str, float]]: Seconds and peak MiB of every stage.
+    """
+    json_file = str(directory / "leads.json")
+    feather_file = str(directory / "leads.feather")
+    stages = {}
+    valid_data, stages["validate_data"] = measure(utils.validate_data, leads)
+    df, stages["get_dataframe"] = measure(utils.get_dataframe, valid_data)
+    df, stages["process_data"] = measure(main.process_data, df)
+    stats_session, stages["build_session"] = measure(session.Session, df)
+    _, stages["aggregate_data"] = measure(aggregate, stats_session)
+    _, stages["create_table"] = measure(create_tables, stats_session)
+    _, stages["save_json"] = measure(utils.data_to_file, json_file, valid_data)
+    _, stages["load_json"] = measure(utils.data_from_file, json_file)
+    _, stages["save_feather"] = measure(utils.dataframe_to_file, feather_file, df)
+    _, stages["load_feather"] = measure(utils.dataframe_from_file, feather_file)
+    return stages
+
+
+def run(sizes: list[int], seed: int = SEED) -> Results:
+    """
+    Measure all stages for every number of leads.
+
+    Args:
+        sizes (list[int]): Numbers of leads.
+        seed (int, optional): Seed of the generated leads. Defaults to SEED.
+
+    Returns:
+        Results: Seconds and peak MiB of every stage for every size.
+    """
+    results: Results = {}
+    for size in sizes:
+        leads = generate_leads(size, seed)
+        with tempfile.TemporaryDirectory() as directory:
+            results[str(size)] = run_stages(leads, Path(directory))
+        del leads
+    return results
+
+
+def compare(results: Results, baseline: Results, tolerance: float = TOLERANCE) -> list[str]:
+    """
+    Find metrics which grew over the baseline by more than the tolerance.
+
+    Stages and sizes missing in the baseline are skipped.
+
+    Args:
+        results (Results): The measured results.
+        baseline (Results): Results of the baseline.
+        tolerance (float, optional): Allowed relative increase. Defaults to TOLERANCE.
+
+    Returns:
+        list[str]: Descriptions of the regressions, empty when there are none.
+    """
+    regressions = []
+    for size, stages in results.items():
+        for stage, metrics in stages.items():
+            expected = baseline.get(size, {}).get(stage)
+            if expected is None:
+                continue
+            for metric, value in metrics.items():
+                limit = expected[metric] * (1 + tolerance) + NOISE[metric]
+                if value > limit:
+                    regressions.append(
+                        f"{stage} of {size} leads: {metric} {value:.3f} "
+                        f"over {expected[metric]:.3f} of the baseline",
+                    )
+    return regressions
+
+
+def print_results(results: Results, baseline: Results) -> None:
+    """Print every stage with its ratios to the baseline."""
+    print(f"{'stage':<16} {'leads':>9} {'seconds':>9} {'peak MiB':>9} {'vs baseline':>16}")
+    for size, stages in results.items():
+        for stage, metrics in stages.items():
+            expected = baseline.get(size, {}).get(stage)
+            ratios = ""
+            if expected:
+                ratios = " ".join(
+                    f"{metrics[metric] / expected[metric]:.2f}x" if expected[metric] else "-"
+                    for metric in ["seconds", "peak_mib"]
+                )
+            print(
+                f"{stage:<16} {size:>9} {metrics['seconds']:9.3f} "
+                f"{metrics['peak_mib']:9.1f} {ratios:>16}",
+            )
+
+
+def main_cli(argv: list[str] | None = None) -> int:
+    """Run the suite and return the exit code, 1 when there is a regression."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--output", type=Path, default=Path(OUTPUT))
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.seed)
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "results": results,
+    }
+    args.output.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    baseline = {}
+    if args.baseline.exists() and args.baseline.resolve() != args.output.resolve():
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))["results"]
+    print_results(results, baseline)
+    print(f"Results written to {args.output}")
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"Regression: {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,61 @@
+"""
+Benchmark of deriving the time columns in main.process_data
+and of the memory peak of the whole processing, logged by utils.benchmark.
+
+Run with: python -m tests.benchmarks.bench_process [number of leads]
+"""
+import logging
+import sys
+
+import pandas as pd
+
+from myleadcli import main as cli
+from myleadcli import utils
+from tests.benchmarks.common import make_leads, timed
+
+
+def legacy_time_columns(dates: pd.Series) -> dict[str, pd.Series]:
+    """Time columns derived the way process_data did before."""
+    return {
+        "hour_of_day": dates.dt.hour.astype(int),
+        "day_of_week": dates.dt.day_name().astype("category"),
+        "date": pd.to_datetime(dates.dt.date),
+    }
+
+
+@utils.benchmark
+def legacy_process_data(df: pd.DataFrame) -> pd.DataFrame:
+    """Processing the way process_data did before, adding columns one by one to a copy."""
+    created_at = utils.local_datetimes(df["created_at.date"], df["created_at.timezone"])
+    for column, values in utils.split_datetimes(created_at).items():
+        df[column] = values
+    df_out = df.copy()
+    for column in ["campaign_id", "created_at.timezone_type"]:
+        df_out[column] = df_out[column].astype("category")
+    return df_out
+
+
+def time_columns(df: pd.DataFrame) -> dict[str, object]:
+    created_at = utils.local_datetimes(df["created_at.date"], df["created_at.timezone"])
+    return utils.split_datetimes(created_at)
+
+
+def main(num_leads: int) -> None:
+    df = utils.get_dataframe(make_leads(num_leads))
+    print(f"Deriving time columns of {num_leads} leads")
+
+    expected = timed("dt accessors (legacy)", legacy_time_columns, df["created_at.date"])
+    result = timed("integer arithmetic", time_columns, df)
+
+    assert result["hour_of_day"].tolist() == expected["hour_of_day"].tolist()
+    assert list(result["day_of_week"]) == list(expected["day_of_week"])
+    assert list(result["date"]) == list(expected["date"])
+
+    print(f"Processing {num_leads} leads")
+    logging.basicConfig(level=logging.INFO, format="%(message)s", force=True)
+    expected = legacy_process_data(df.copy())
+    pd.testing.assert_frame_equal(cli.process_data(df), expected)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
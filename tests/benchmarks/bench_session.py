@@ -0,0 +1,36 @@
+"""
+Benchmark of answering every menu choice from the aggregate cube of a session.
+
+Run with: python -m tests.benchmarks.bench_session [number of leads]
+"""
+import sys
+
+import pandas as pd
+
+from myleadcli import main, session, tables, utils
+from tests.benchmarks.common import make_leads, timed
+
+
+def aggregate_rows(df: pd.DataFrame) -> None:
+    for dimension in session.DIMENSIONS:
+        tables.aggregate_data(df, group_by_column=dimension)
+        utils.generate_caption(df)
+
+
+def aggregate_cube(stats_session: session.Session) -> None:
+    for dimension in session.DIMENSIONS:
+        stats_session.aggregate(dimension)
+        stats_session.caption()
+
+
+def run(num_leads: int) -> None:
+    df = main.process_data(utils.get_dataframe(make_leads(num_leads)))
+    print(f"Aggregating {num_leads} leads by {len(session.DIMENSIONS)} dimensions")
+
+    timed("groupby of rows per choice", aggregate_rows, df)
+    stats_session = timed("building the session", session.Session, df)
+    timed("every choice from the cube", aggregate_cube, stats_session)
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,33 @@
+"""
+Benchmark of the bulk validation of leads against validating them one by one.
+
+Run with: python -m tests.benchmarks.bench_validation [number of leads]
+"""
+import sys
+
+import orjson
+
+from myleadcli import models, utils
+from tests.benchmarks.common import make_leads, timed
+
+
+def legacy_validate_data(data: utils.DataList) -> utils.DataList:
+    """Previous implementation of utils.validate_data, validating one lead at a time."""
+    return [models.Lead.model_validate(item).model_dump() for item in data]
+
+
+def main(num_leads: int) -> None:
+    data = make_leads(num_leads)
+    content = orjson.dumps(data)
+    print(f"Validating {num_leads} leads")
+
+    expected = timed("one by one (legacy)", legacy_validate_data, data)
+    bulk = timed("TypeAdapter on python objects", utils.validate_data, data)
+    from_json = timed("TypeAdapter on JSON bytes", utils.validate_json, content)
+
+    assert bulk == expected
+    assert from_json == expected
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
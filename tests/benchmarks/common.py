@@ -0,0 +1,35 @@
+"""Helpers shared by the benchmarks."""
+import json
+import tracemalloc
+from collections.abc import Callable
+from time import perf_counter
+from typing import Any
+
+from myleadcli import utils
+
+
+def make_leads(num_leads: int) -> utils.DataList:
+    """Return leads from the test response repeated to the requested number with unique ids."""
+    with open("tests/test_files/test_success.json") as file:
+        conversions = json.load(file)["data"][0]["conversions"]
+    return [{**conversions[i % len(conversions)], "id": f"lead{i}"} for i in range(num_leads)]
+
+
+def timed(label: str, func: Callable[..., Any], *args: Any) -> Any:
+    """Call the function, print how long it took and return its result."""
+    start_time = perf_counter()
+    result = func(*args)
+    print(f"{label:<32} {perf_counter() - start_time:8.3f} s")
+    return result
+
+
+def peak_memory(label: str, func: Callable[..., Any], *args: Any) -> Any:
+    """Call the function, print the peak of memory it allocated and return its result."""
+    tracemalloc.start()
+    try:
+        result = func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    print(f"{label:<32} {peak / 2**20:8.1f} MiB")
+    return result
@@ -0,0 +1,155 @@
+"""
+In-process stand-in of the MyLead conversions endpoint for end-to-end fetch benchmarks.
+
+`MockMyLeadApi` is an httpx transport serving pages of synthetic leads with
+the pagination, latency with jitter and the 20 requests per minute limit
+of the real API, answering requests over the limit with 429 and Retry-After.
+It runs on `FastForwardLoop`, an event loop on virtual time: whenever every task
+waits for a timer the clock jumps to the next timer instead of sleeping.
+Minutes of rate limited fetching take as long as the CPU work they need.
+A socket server could not follow the virtual clock, so the server is a transport.
+"""
+import asyncio
+import selectors
+from collections import deque
+from collections.abc import Coroutine
+from typing import Any, TypeVar
+
+import httpx
+import numpy as np
+import orjson
+
+from tests.benchmarks.synthetic import SEED, generate_leads
+
+RATE_LIMIT = 20  # requests of the real API per RATE_LIMIT_WINDOW
+RATE_LIMIT_WINDOW = 60  # seconds
+LATENCY = 0.3  # seconds of a response without jitter
+JITTER = 0.2  # seconds randomly added to the latency
+
+T = TypeVar("T")
+
+
+class _FastForwardSelector(selectors.SelectSelector):
+    """Selector which moves the clock of its loop to the next timer instead of blocking."""
+
+    def __init__(self, loop: "FastForwardLoop") -> None:
+        super().__init__()
+        self.loop = loop
+
+    def select(self, timeout: float | None = None) -> list[tuple[selectors.SelectorKey, int]]:
+        if timeout is None:  # no timers, only real I/O can wake the loop
+            return super().select(None)
+        ready = super().select(0)
+        if not ready:
+            self.loop.now += timeout
+        return ready
+
+
+class FastForwardLoop(asyncio.SelectorEventLoop):
+    """Event loop whose `time` is virtual and skips the periods when every task waits."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+        super().__init__(_FastForwardSelector(self))
+
+    def time(self) -> float:
+        return self.now
+
+
+def run_fast_forward(coroutine: Coroutine[Any, Any, T]) -> tuple[T, float]:
+    """
+    Run a coroutine on a new `FastForwardLoop`.
+
+    Args:
+        coroutine (Coroutine[Any, Any, T]): The coroutine.
+
+    Returns:
+        tuple[T, float]: Its result and the virtual seconds it took.
+    """
+    with asyncio.Runner(loop_factory=FastForwardLoop) as runner:
+        result = runner.run(coroutine)
+        return result, runner.get_loop().time()
+
+
+class MockMyLeadApi(httpx.AsyncBaseTransport):
+    """
+    Transport answering requests of the conversions endpoint like the MyLead API.
+
+    The clock is the time of the running loop, so the server runs on virtual time
+    on a `FastForwardLoop` and on real time elsewhere.
+
+    Args:
+        num_leads (int): Number of leads served, split into pages of the `limit` parameter.
+        latency (float, optional): Seconds of every response. Defaults to LATENCY.
+        jitter (float, optional): Maximum of seconds randomly added to the latency.
+            Defaults to JITTER.
+        rate_limit (int, optional): Requests accepted within the window. Defaults to RATE_LIMIT.
+        window (float, optional): Seconds of the rate limit window.
+            Defaults to RATE_LIMIT_WINDOW.
+        seed (int, optional): Seed of the leads and of the jitter. Defaults to SEED.
+        send_headers (bool, optional): Send X-RateLimit and Retry-After headers,
+            without them clients have to find the limit by hitting it. Defaults to True.
+    """
+
+    def __init__(
+        self,
+        num_leads: int,
+        latency: float = LATENCY,
+        jitter: float = JITTER,
+        rate_limit: int = RATE_LIMIT,
+        window: float = RATE_LIMIT_WINDOW,
+        seed: int = SEED,
+        send_headers: bool = True,
+    ) -> None:
+        self.leads = generate_leads(num_leads, seed)
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.window = window
+        self.rng = np.random.default_rng(seed)
+        self.send_headers = send_headers
+        self.hits: deque[float] = deque()
+        self.requests = 0
+        self.rejected = 0
+
+    def _rate_limit_headers(self, now: float) -> dict[str, str]:
+        if not self.send_headers:
+            return {}
+        reset = self.hits[0] + self.window - now if self.hits else self.window
+        return {
+            "X-RateLimit-Limit": str(self.rate_limit),
+            "X-RateLimit-Remaining": str(self.rate_limit - len(self.hits)),
+            "X-RateLimit-Reset": f"{reset:.3f}",
+        }
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        now = asyncio.get_running_loop().time()
+        while self.hits and now - self.hits[0] >= self.window:
+            self.hits.popleft()
+        accepted = len(self.hits) < self.rate_limit
+        if accepted:
+            self.hits.append(now)
+        headers = self._rate_limit_headers(now)
+        await asyncio.sleep(self.latency + self.rng.uniform(0, self.jitter))
+        if not accepted:
+            self.rejected += 1
+            if self.send_headers:
+                headers["Retry-After"] = headers["X-RateLimit-Reset"]
+            content = orjson.dumps({"status": "error", "message": "Too Many Attempts."})
+            return httpx.Response(429, headers=headers, content=content)
+
+        page = int(request.url.params.get("page", 1))
+        limit = int(request.url.params.get("limit", 500))
+        response = {
+            "status": "success",
+            "data": [{"conversions": self.leads[(page - 1) * limit : page * limit]}],
+            "pagination": {
+                "page": page,
+                "limit": limit,
+                "total_count": len(self.leads),
+                "total_pages": -(-len(self.leads) // limit),
+            },
+        }
+        headers["Content-Type"] = "application/json"
+        return httpx.Response(200, headers=headers, content=orjson.dumps(response))
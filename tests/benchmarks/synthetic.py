@@ -0,0 +1,125 @@
+"""
+Seeded generator of synthetic leads for benchmarks at scale.
+
+Every field is drawn for all leads at once with numpy and only the final dicts
+are built in Python, so a million leads take seconds instead of the minutes
+of the Faker loop in tests/fake_data_creator.py. The same seed gives the same leads,
+with realistic cardinalities: few statuses and devices, hundreds of campaigns
+and device models, and dates spread over a year in several time zones.
+"""
+from typing import Any
+
+import numpy as np
+
+from myleadcli import utils
+
+SEED = 0
+STATUSES = ["approved", "pending", "rejected", "pre_approved"]
+STATUS_WEIGHTS = [0.45, 0.3, 0.2, 0.05]
+STATUS_REASONS = [None, "duplicate", "fraud suspected", "not qualified"]
+DEVICES = ["mobile", "desktop", "tablet"]
+DEVICE_WEIGHTS = [0.7, 0.25, 0.05]
+COUNTRIES = ["PL", "DE", "US", "GB", "FR", "ES", "IT", "CZ", "UA", "BR", "IN", "MX"]
+TIMEZONES = ["Europe/Warsaw", "Europe/Berlin", "Europe/London", "America/New_York", "UTC"]
+OPERATION_SYSTEMS = ["Android", "iOS", "Windows", "macOS", "Linux"]
+BROWSERS = ["Chrome", "Safari", "Firefox", "Edge", "Samsung Internet"]
+DEVICE_BRANDS = ["Samsung", "Apple", "Xiaomi", "Huawei", "Motorola", "Google", None]
+SUBS = [None, None, "fb", "google", "tiktok", "newsletter"]
+NUM_CAMPAIGNS = 200
+NUM_DEVICE_MODELS = 500
+NUM_VERSIONS = 20
+START = np.datetime64("2023-01-01T00:00:00", "s")
+DAYS = 365
+
+
+def _pick(rng: np.random.Generator, values: list[Any], size: int, p: Any = None) -> list[Any]:
+    """Draw values of a vocabulary for all leads at once."""
+    return np.array(values, dtype=object)[rng.choice(len(values), size, p=p)].tolist()
+
+
+def generate_leads(num_leads: int, seed: int = SEED) -> utils.DataList:
+    """
+    Generate leads in the format of the MyLead API.
+
+    Args:
+        num_leads (int): Number of leads.
+        seed (int, optional): Seed of the random generator. Defaults to SEED.
+
+    Returns:
+        utils.DataList: Valid leads with unique ids, the same for the same seed.
+    """
+    if num_leads == 0:  # numpy string functions fail on empty arrays
+        return []
+    rng = np.random.default_rng(seed)
+    campaign_ids = rng.integers(1, NUM_CAMPAIGNS + 1, num_leads)
+    seconds = rng.integers(0, DAYS * 24 * 3600, num_leads).astype("timedelta64[s]")
+    dates = np.char.replace(np.datetime_as_string(START + seconds, unit="us"), "T", " ")
+    ips = rng.integers(0, 256, (num_leads, 3)).tolist()
+    columns = {
+        "campaign_id": campaign_ids.tolist(),
+        "campaign_name": [f"Campaign {campaign_id}" for campaign_id in campaign_ids.tolist()],
+        "payout": np.round(rng.uniform(0.5, 50, num_leads), 2).tolist(),
+        "status": _pick(rng, STATUSES, num_leads, STATUS_WEIGHTS),
+        "status_reason": _pick(rng, STATUS_REASONS, num_leads),
+        "country": _pick(rng, COUNTRIES, num_leads),
+        "date": dates.tolist(),
+        "timezone": _pick(rng, TIMEZONES, num_leads),
+        "operation_system": _pick(rng, OPERATION_SYSTEMS, num_leads),
+        "operation_system_version": rng.integers(1, NUM_VERSIONS + 1, num_leads)
+        .astype(str)
+        .tolist(),
+        "browser_system": _pick(rng, BROWSERS, num_leads),
+        "browser_version": rng.integers(90, 120, num_leads).astype(str).tolist(),
+        "device": _pick(rng, DEVICES, num_leads, DEVICE_WEIGHTS),
+        "device_brand": _pick(rng, DEVICE_BRANDS, num_leads),
+        "device_model": _pick(rng, [f"model-{i}" for i in range(NUM_DEVICE_MODELS)], num_leads),
+        "ml_sub1": _pick(rng, SUBS, num_leads),
+    }
+    return [
+        {
+            "id": f"lead{seed}-{i}",
+            "campaign_id": campaign_id,
+            "campaign_name": campaign_name,
+            "payout": payout,
+            "currency": "PLN",
+            "status": status,
+            "status_reason": status_reason,
+            "country": country,
+            "created_at": {"date": date, "timezone_type": 3, "timezone": timezone},
+            "user_agent": {
+                "name": f"Mozilla/5.0 ({operation_system}) {browser_system}/{browser_version}",
+                "operation_system": operation_system,
+                "operation_system_version": operation_system_version,
+                "browser_system": browser_system,
+                "browser_version": browser_version,
+                "device": device,
+                "device_brand": device_brand,
+                "device_model": device_model,
+            },
+            "ip": f"10.{ip[0]}.{ip[1]}.{ip[2]}",
+            "ml_sub1": ml_sub1,
+            "ml_sub2": None,
+            "ml_sub3": None,
+            "ml_sub4": None,
+            "ml_sub5": None,
+        }
+        for i, (
+            campaign_id,
+            campaign_name,
+            payout,
+            status,
+            status_reason,
+            country,
+            date,
+            timezone,
+            operation_system,
+            operation_system_version,
+            browser_system,
+            browser_version,
+            device,
+            device_brand,
+            device_model,
+            ml_sub1,
+            ip,
+        ) in enumerate(zip(*columns.values(), ips))
+    ]
@@ -1,8 +1,21 @@
+import asyncio
+from typing import TYPE_CHECKING
+
+import httpx
 import pytest
 import json
-from myleadcli import utils
+from myleadcli import main, utils
 import pandas as pd
 
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+@pytest.fixture(autouse=True)
+def _cache_dir(tmp_path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Keep files cached between runs inside the temporary directory of a test."""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+
 
 @pytest.fixture()
 def success_response_json() -> dict:
@@ -55,3 +68,77 @@ def validated_data(data_for_validation: utils.DataList) -> utils.DataList:
 @pytest.fixture()
 def dataframe_data(data_for_validation: utils.DataList) -> pd.DataFrame:
     return utils.get_dataframe(data_for_validation)
+
+
+class FakeClock:
+    """Clock for rate limiter tests. Sleeping moves time forward instead of waiting."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, delay: float) -> None:
+        self.now += max(delay, 0)
+        await asyncio.sleep(0)
+
+
+@pytest.fixture()
+def fake_clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture()
+def processed_data(dataframe_data: pd.DataFrame) -> pd.DataFrame:
+    return main.process_data(dataframe_data)
+
+
+@pytest.fixture()
+def many_conversions(data_for_validation: utils.DataList) -> utils.DataList:
+    """
+    Fixture with 25 conversions built from the success response, each with a unique id.
+    """
+    return [
+        {**data_for_validation[i % len(data_for_validation)], "id": f"lead{i}"} for i in range(25)
+    ]
+
+
+class LeadsServer:
+    """
+    Fake MyLead API for pytest-httpx serving leads created within the requested dates.
+
+    Requests for which `fail` returns True get `fail_status`, 500 Internal Server Error
+    by default.
+    """
+
+    def __init__(self, leads: utils.DataList) -> None:
+        self.leads = leads
+        self.requests: list[dict[str, str]] = []
+        self.fail: Callable[[dict[str, str]], bool] = lambda params: False
+        self.fail_status = 500
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        params = dict(request.url.params)
+        self.requests.append(params)
+        if self.fail(params):
+            return httpx.Response(self.fail_status, json={"errors": {"page": ["invalid"]}})
+        leads = [
+            lead
+            for lead in self.leads
+            if params["date_from"] <= lead["created_at"]["date"][:10] <= params["date_to"]
+        ]
+        limit, page = int(params["limit"]), int(params["page"])
+        response = {
+            "status": "success",
+            "data": [{"conversions": leads[limit * (page - 1) : limit * page]}],
+            "pagination": {"total_count": len(leads)},
+        }
+        return httpx.Response(200, json=response)
+
+
+@pytest.fixture()
+def leads_server(httpx_mock, many_conversions) -> LeadsServer:
+    server = LeadsServer(many_conversions)
+    httpx_mock.add_callback(server)
+    return server
@@ -0,0 +1,78 @@
+import asyncio
+from time import perf_counter
+
+from myleadcli import ml, utils
+from tests.benchmarks import bench_fetch, bench_pipeline
+from tests.benchmarks.mock_api import MockMyLeadApi, run_fast_forward
+from tests.benchmarks.synthetic import NUM_CAMPAIGNS, generate_leads
+
+
+def test_generate_leads_is_seeded_and_valid():
+    leads = generate_leads(1000, seed=7)
+
+    assert leads == generate_leads(1000, seed=7)
+    assert leads != generate_leads(1000, seed=8)
+    assert len(utils.validate_data(leads)) == 1000
+    assert len({lead["id"] for lead in leads}) == 1000
+    assert len({lead["campaign_id"] for lead in leads}) <= NUM_CAMPAIGNS
+
+
+def test_generate_no_leads():
+    assert generate_leads(0) == []
+
+
+def test_compare_reports_regressions():
+    baseline = {"1000": {"validate_data": {"seconds": 1.0, "peak_mib": 100.0}}}
+    results = {
+        "1000": {
+            "validate_data": {"seconds": 2.0, "peak_mib": 110.0},
+            "get_dataframe": {"seconds": 9.0, "peak_mib": 900.0},
+        },
+        "10000": {"validate_data": {"seconds": 9.0, "peak_mib": 900.0}},
+    }
+
+    regressions = bench_pipeline.compare(results, baseline, tolerance=0.25)
+
+    assert regressions == ["validate_data of 1000 leads: seconds 2.000 over 1.000 of the baseline"]
+
+
+def test_fast_forward_loop_skips_waiting():
+    async def sleepers() -> float:
+        await asyncio.gather(asyncio.sleep(60), asyncio.sleep(3600))
+        return asyncio.get_running_loop().time()
+
+    start_time = perf_counter()
+    virtual_time, elapsed = run_fast_forward(sleepers())
+
+    assert virtual_time == elapsed == 3600
+    assert perf_counter() - start_time < 1
+
+
+def test_fetch_from_mock_api_within_rate_limit():
+    server = MockMyLeadApi(12_000, latency=0.5, jitter=0.5)
+
+    leads, elapsed = run_fast_forward(bench_fetch.fetch(server, ml.RATE_LIMIT))
+
+    assert [lead["id"] for lead in leads] == [lead["id"] for lead in server.leads]
+    assert server.requests == 24
+    assert server.rejected == 0
+    assert elapsed > ml.RATE_LIMIT_PERIOD  # 24 requests do not fit into one minute
+
+
+def test_fetch_from_mock_api_retries_rejected_requests():
+    server = MockMyLeadApi(12_000, send_headers=False)
+
+    leads, _ = run_fast_forward(bench_fetch.fetch(server, 40))
+
+    assert len(leads) == len(server.leads)
+    assert server.rejected > 0
+    assert server.requests == 24 + server.rejected
+
+
+def test_fetch_from_mock_api_without_leads():
+    server = MockMyLeadApi(0)
+
+    leads, _ = run_fast_forward(bench_fetch.fetch(server, ml.RATE_LIMIT))
+
+    assert leads == []
+    assert server.requests == 1
@@ -0,0 +1,48 @@
+import os
+import time
+from datetime import date
+
+from myleadcli import checkpoint, models, utils
+
+
+def test_fingerprint_identifies_query():
+    api = models.Api(token="secret", date_from=date(2023, 9, 1), date_to=date(2023, 9, 30))
+
+    assert checkpoint.fingerprint(api) == checkpoint.fingerprint(api.model_copy())
+    assert checkpoint.fingerprint(api) != checkpoint.fingerprint(
+        api.model_copy(update={"status": "approved"}),
+    )
+    assert checkpoint.fingerprint(api) != checkpoint.fingerprint(
+        api.model_copy(update={"token": "other"}),
+    )
+    assert "secret" not in str(checkpoint.Checkpoint(api).directory)
+
+
+def test_checkpoint_round_trip(tmp_path, validated_data):
+    api = models.Api(token="secret")
+    part = checkpoint.Checkpoint(api, tmp_path)
+
+    assert part.load("page") is None
+    part.save("page", validated_data)
+
+    assert part.load("page") == utils.validate_data(validated_data)
+    part.clear()
+    assert not part.directory.exists()
+
+
+def test_outdated_checkpoints_are_removed(tmp_path):
+    api = models.Api(token="secret")
+    old = checkpoint.Checkpoint(api.model_copy(update={"status": "approved"}), tmp_path)
+    old.write("page-1", b"[]")
+    started = time.time() - checkpoint.MAX_AGE - 1
+    os.utime(old.directory / checkpoint.STARTED, (started, started))
+    without_start = tmp_path / "0123456789abcdef"
+    without_start.mkdir()
+    recent = checkpoint.Checkpoint(api.model_copy(update={"status": "pending"}), tmp_path)
+    recent.write("page-1", b"[]")
+
+    current = checkpoint.Checkpoint(api, tmp_path)
+
+    assert sorted(tmp_path.iterdir()) == [recent.directory]
+    assert recent.read("page-1") == b"[]"
+    assert current.read("page-1") is None
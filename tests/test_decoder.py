@@ -0,0 +1,71 @@
+import orjson
+import pandas as pd
+from pandas.api.types import CategoricalDtype
+
+from myleadcli import decoder
+
+
+def as_json_normalize(df: pd.DataFrame) -> pd.DataFrame:
+    """Turn categoricals back into object columns with None for missing values."""
+    for column in df.select_dtypes("category"):
+        values = df[column].astype(object)
+        df[column] = values.where(values.notna(), None)
+    return df
+
+
+def test_decode_leads_matches_json_normalize(validated_data):
+    df = decoder.decode_leads(validated_data)
+
+    pd.testing.assert_frame_equal(as_json_normalize(df), pd.json_normalize(validated_data))
+
+
+def test_decode_leads_categoricals(validated_data):
+    df = decoder.decode_leads(validated_data)
+
+    for column in decoder.COLUMNS:
+        assert isinstance(df[column.name].dtype, CategoricalDtype) == (column.dtype == "category")
+    categories = list(df["country"].cat.categories)
+    assert categories == sorted({lead["country"] for lead in validated_data})
+
+
+def test_decode_leads_iso_dates(validated_data):
+    from_json = orjson.loads(orjson.dumps(validated_data))
+
+    df = decoder.decode_leads(from_json)
+
+    pd.testing.assert_frame_equal(df, decoder.decode_leads(validated_data))
+
+
+def test_decode_leads_missing_category(validated_data):
+    validated_data[0]["user_agent"]["device"] = None
+
+    df = decoder.decode_leads(validated_data)
+
+    assert pd.isna(df["user_agent.device"][0])
+    assert df["user_agent.device"][1:].notna().all()
+
+
+def test_decode_no_leads():
+    df = decoder.decode_leads([])
+
+    assert df.empty
+    assert list(df.columns) == [column.name for column in decoder.COLUMNS]
+
+
+def test_lead_buffer_orders_pages_by_key(validated_data):
+    buffer = decoder.LeadBuffer()
+    buffer.append(validated_data[2:], key=2)
+    buffer.append(validated_data[:2], key=1)
+
+    assert len(buffer) == len(validated_data)
+    pd.testing.assert_frame_equal(buffer.to_frame(), decoder.decode_leads(validated_data))
+    assert len(buffer) == 0
+
+
+def test_lead_buffer_shares_code_tables(validated_data):
+    buffer = decoder.LeadBuffer()
+    for lead in validated_data:
+        buffer.append([lead])
+
+    assert len(buffer.tables["country"]) == len({lead["country"] for lead in validated_data})
+    pd.testing.assert_frame_equal(buffer.to_frame(), decoder.decode_leads(validated_data))
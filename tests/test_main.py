@@ -1,5 +1,44 @@
-from myleadcli import main
+import json
+import os
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+from datetime import date, datetime
+from pathlib import Path
+
+import httpx
+import orjson
+import pandas as pd
 import pytest
+from pytest_httpx import HTTPXMock
+from pytest_mock import MockerFixture
+from typer.testing import CliRunner
+
+from myleadcli import main, ml, models, options, profiling, store, utils
+from myleadcli.checkpoint import MAX_AGE, STARTED, Checkpoint
+
+HEAVY_MODULES = {"pandas", "numpy", "httpx", "plotly", "pydantic", "tenacity", "pyarrow"}
+IMPORT_TIME_BUDGET = 0.6  # seconds of importing everything `myleadcli --help` needs
+
+
+@pytest.fixture()
+def paged_api(httpx_mock: HTTPXMock, many_conversions) -> models.Api:
+    """
+    Fixture serving the conversions ten per page, which gives three pages.
+    """
+
+    def page_response(request: httpx.Request) -> httpx.Response:
+        page = int(request.url.params["page"])
+        response = {
+            "status": "success",
+            "data": [{"conversions": many_conversions[10 * (page - 1) : 10 * page]}],
+            "pagination": {"total_count": len(many_conversions)},
+        }
+        return httpx.Response(200, json=response)
+
+    httpx_mock.add_callback(page_response)
+    return models.Api(token="test", limit=10)
 
 
 def test_check_apikey():
@@ -9,3 +48,307 @@ def test_check_apikey():
 def test_check_apikey_fail():
     with pytest.raises(SystemExit):
         main.check_api_key("")
+
+
+@pytest.mark.asyncio()
+async def test_stream_dataframe_matches_batch(paged_api, many_conversions):
+    df = await main.stream_dataframe(paged_api, save_file=False)
+
+    pd.testing.assert_frame_equal(df, utils.get_dataframe(many_conversions))
+
+
+@pytest.mark.asyncio()
+async def test_stream_dataframe_save_file(
+    paged_api, many_conversions, tmp_path, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.chdir(tmp_path)
+
+    await main.stream_dataframe(paged_api, save_file=True)
+
+    saved = utils.data_from_file("myleadcli_leads_data.json")
+    assert [lead["lead_id"] for lead in saved] == [lead["id"] for lead in many_conversions]
+
+
+def shifted_pages(httpx_mock: HTTPXMock, leads: utils.DataList) -> None:
+    """Serve the leads ten per page after a new lead shifted them by one."""
+    shifted = [{**leads[0], "id": "new lead"}, *leads]
+
+    def page_response(request: httpx.Request) -> httpx.Response:
+        page = int(request.url.params["page"])
+        response = {
+            "status": "success",
+            "data": [{"conversions": shifted[10 * (page - 1) : 10 * page]}],
+            "pagination": {"total_count": len(shifted)},
+        }
+        return httpx.Response(200, json=response)
+
+    httpx_mock.add_callback(page_response)
+
+
+def checkpoint_first_page(api: models.Api, leads: utils.DataList) -> Checkpoint:
+    """Checkpoint the first page of the leads, as a fetch interrupted after it would."""
+    checkpoint = Checkpoint(api)
+    first_page = {
+        "status": "success",
+        "data": [{"conversions": leads[:10]}],
+        "pagination": {"total_count": len(leads)},
+    }
+    checkpoint.write(ml.page_name(1), orjson.dumps(first_page))
+    return checkpoint
+
+
+@pytest.mark.asyncio()
+async def test_stream_dataframe_resumed_skips_shifted_leads(
+    httpx_mock: HTTPXMock, many_conversions, tmp_path, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.chdir(tmp_path)
+    api = models.Api(token="test", limit=10)
+    checkpoint_first_page(api, many_conversions)
+    shifted_pages(httpx_mock, many_conversions)
+
+    df = await main.stream_dataframe(api, save_file=True)
+
+    assert df["lead_id"].is_unique
+    assert df["lead_id"].tolist() == [lead["id"] for lead in many_conversions]
+    saved = utils.data_from_file("myleadcli_leads_data.json")
+    assert [lead["lead_id"] for lead in saved] == df["lead_id"].tolist()
+
+
+@pytest.mark.asyncio()
+async def test_stream_dataframe_does_not_resume_outdated_checkpoint(
+    httpx_mock: HTTPXMock, many_conversions
+):
+    api = models.Api(token="test", limit=10)
+    checkpoint = checkpoint_first_page(api, many_conversions)
+    started = time.time() - MAX_AGE - 1
+    os.utime(checkpoint.directory / STARTED, (started, started))
+    shifted_pages(httpx_mock, many_conversions)
+
+    df = await main.stream_dataframe(api, save_file=False)
+
+    assert df["lead_id"].tolist() == ["new lead"] + [lead["id"] for lead in many_conversions]
+
+
+@pytest.mark.asyncio()
+async def test_profile_run_records_stages(paged_api, many_conversions, tmp_path):
+    path = tmp_path / "profile.json"
+
+    with main.profile_run(options.ProfileFormat.json, path):
+        await main.stream_dataframe(paged_api, save_file=False)
+
+    summary = {row["name"]: row for row in json.loads(path.read_text())["summary"]}
+    assert summary["page_request"]["items"] == len(many_conversions)
+    assert summary["validation"]["items"] == len(many_conversions)
+    assert summary["normalization"]["items"] == 2 * len(many_conversions)  # pages and the frame
+    assert profiling.stop_profile() is None
+
+
+@pytest.mark.asyncio()
+async def test_report_request_metrics(paged_api, tmp_path, capsys: pytest.CaptureFixture):
+    path = tmp_path / "myleadcli.prom"
+
+    with main.report_request_metrics(path):
+        await main.stream_dataframe(paged_api, save_file=False)
+
+    assert "Made 3 requests (200: 3)" in capsys.readouterr().out
+    assert 'myleadcli_http_requests_total{code="200"} 3' in path.read_text().splitlines()
+
+
+def test_process_data_no_leads():
+    with pytest.raises(SystemExit):
+        main.process_data(pd.DataFrame())
+
+
+def test_sync_store_filters_status_locally(paged_api, many_conversions):
+    api = paged_api.model_copy(
+        update={"status": "approved", "date_from": date(2023, 9, 1), "date_to": date(2023, 9, 30)},
+    )
+
+    df = main.sync_store(api, mutable_days=store.MUTABLE_DAYS, save_file=False)
+
+    assert set(df["status"]) == {"approved"}
+    assert len(df) == sum(lead["status"] == "approved" for lead in many_conversions)
+
+
+def test_sync_store_without_leads_in_range(paged_api):
+    api = paged_api.model_copy(update={"date_from": date(2020, 1, 1), "date_to": date(2020, 1, 31)})
+
+    df = main.sync_store(api, mutable_days=store.MUTABLE_DAYS, save_file=False)
+
+    assert df.empty
+    assert list(df.columns) == list(utils.get_dataframe([]).columns)
+    with pytest.raises(SystemExit):
+        main.process_data(df)
+
+
+@pytest.mark.asyncio()
+async def test_stream_dataframe_without_leads(httpx_mock: HTTPXMock):
+    response = {
+        "status": "success",
+        "data": [{"conversions": []}],
+        "pagination": {"total_count": 0},
+    }
+    httpx_mock.add_response(json=response)
+
+    df = await main.stream_dataframe(models.Api(token="test", limit=10), save_file=False)
+
+    assert df.empty
+    with pytest.raises(SystemExit):
+        main.process_data(df)
+
+
+@pytest.mark.parametrize("file_format", list(options.FileFormat))
+def test_get_session_from_file_filters_status(
+    file_format, validated_data, processed_data, tmp_path, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.chdir(tmp_path)
+    utils.data_to_file(utils.leads_file(options.FileFormat.json), validated_data)
+    utils.dataframe_to_file(utils.leads_file(options.FileFormat.feather), processed_data)
+    status = options.LeadStatus(validated_data[0]["status"])
+
+    stats_session = main.get_session(
+        "test",
+        datetime(2023, 1, 1),
+        datetime(2023, 12, 31),
+        save_file=False,
+        from_file=True,
+        file_format=file_format,
+        status=status,
+        use_store=False,
+        mutable_days=store.MUTABLE_DAYS,
+        shard_by=options.ShardBy.none,
+    )
+
+    expected = sum(lead["status"] == status.value for lead in validated_data)
+    assert 0 < stats_session.num_of_leads() == expected < len(validated_data)
+
+
+def test_process_data_categoricals(processed_data, validated_data):
+    for column in ["campaign_id", "campaign_name", "status_reason", "user_agent.device_model"]:
+        assert isinstance(processed_data[column].dtype, pd.CategoricalDtype), column
+    categories = processed_data["campaign_id"].cat.categories
+    assert categories.tolist() == sorted({lead["campaign_id"] for lead in validated_data})
+
+
+def test_process_data_time_columns(processed_data):
+    created_at = processed_data["created_at.date"]
+
+    assert processed_data["hour_of_day"].tolist() == created_at.dt.hour.tolist()
+    assert processed_data["day_of_week"].astype(str).tolist() == created_at.dt.day_name().tolist()
+    assert list(processed_data["day_of_week"].cat.categories) == utils.DAY_NAMES
+    pd.testing.assert_series_equal(
+        processed_data["date"],
+        pd.to_datetime(created_at.dt.date),
+        check_names=False,
+    )
+
+
+@pytest.mark.asyncio()
+async def test_fetch_accounts(httpx_mock: HTTPXMock, many_conversions, mocker: MockerFixture):
+    leads_of_token = {"key1": many_conversions[:15], "key2": many_conversions[15:]}
+
+    def account_response(request: httpx.Request) -> httpx.Response:
+        conversions = leads_of_token[request.url.params["token"]]
+        page = int(request.url.params["page"])
+        response = {
+            "status": "success",
+            "data": [{"conversions": conversions[500 * (page - 1) : 500 * page]}],
+            "pagination": {"total_count": len(conversions)},
+        }
+        return httpx.Response(200, json=response)
+
+    httpx_mock.add_callback(account_response)
+    client_init = mocker.spy(httpx.AsyncClient, "__init__")
+    limiters = mocker.spy(ml, "learned_rate_limiter")
+    accounts = [
+        models.Account(name="shop", token="key1"),
+        models.Account(name="blog", token="key2"),
+        models.Account(name="empty", token="key3"),
+    ]
+    leads_of_token["key3"] = []
+
+    df = await main.fetch_accounts(accounts, datetime(2023, 9, 1), datetime(2023, 9, 30))
+
+    assert client_init.call_count == 1
+    assert sorted(call.args[0] for call in limiters.call_args_list) == ["key1", "key2", "key3"]
+    assert list(df["account"].cat.categories) == ["shop", "blog", "empty"]
+    assert df["account"].value_counts().to_dict() == {"shop": 15, "blog": 10, "empty": 0}
+    assert df["lead_id"].tolist() == [lead["id"] for lead in many_conversions]
+
+
+def unauthorized_or_leads(leads: utils.DataList) -> Callable[[httpx.Request], httpx.Response]:
+    """Return a fake API answering the token "bad" with 401 and other tokens with the leads."""
+
+    def account_response(request: httpx.Request) -> httpx.Response:
+        if request.url.params["token"] == "bad":
+            return httpx.Response(401, json={"errors": {"authorization": ["Invalid API key"]}})
+        response = {
+            "status": "success",
+            "data": [{"conversions": leads}],
+            "pagination": {"total_count": len(leads)},
+        }
+        return httpx.Response(200, json=response)
+
+    return account_response
+
+
+@pytest.mark.asyncio()
+async def test_fetch_accounts_skips_failed_account(
+    httpx_mock: HTTPXMock, many_conversions, caplog: pytest.LogCaptureFixture
+):
+    httpx_mock.add_callback(unauthorized_or_leads(many_conversions))
+    accounts = [
+        models.Account(name="shop", token="key1"),
+        models.Account(name="stolen", token="bad"),
+    ]
+
+    df = await main.fetch_accounts(accounts, datetime(2023, 9, 1), datetime(2023, 9, 30))
+
+    assert list(df["account"].cat.categories) == ["shop"]
+    assert len(df) == len(many_conversions)
+    assert "Fetching leads of account stolen failed" in caplog.text
+
+
+def test_accounts_command_fails_when_every_account_fails(httpx_mock: HTTPXMock):
+    httpx_mock.add_callback(unauthorized_or_leads([]))
+
+    result = CliRunner().invoke(main.app, ["accounts", "--keys", "one=bad,two=bad"])
+
+    assert result.exit_code == 1
+    assert "Fetching leads failed for all 2 accounts" in result.output
+
+
+def import_times(tmp_path: Path, *args: str) -> list[tuple[str, int, float]]:
+    """Run the CLI with -X importtime and return every imported module, its depth and seconds."""
+    env = {**os.environ, "PYTHONPATH": str(Path(__file__).parents[1])}
+    env.pop("API_KEY", None)
+    code = f"import sys; sys.argv = {['myleadcli', *args]!r}; from myleadcli.main import app; app()"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=tmp_path,  # no .env file with an API key
+        env=env,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    times = []
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "cumulative" not in line:
+            _, cumulative, module = line.split("|")
+            depth = (len(module) - len(module.lstrip()) - 1) // 2
+            times.append((module.strip(), depth, int(cumulative) / 1_000_000))
+    return times
+
+
+@pytest.mark.parametrize("args", [["--help"], ["stats"], ["report", "--help"]])
+def test_startup_does_not_import_heavy_modules(tmp_path, args):
+    modules = {module for module, _, _ in import_times(tmp_path, *args)}
+
+    assert "myleadcli.main" in modules
+    assert not HEAVY_MODULES & modules
+
+
+def test_startup_import_time(tmp_path):
+    times = import_times(tmp_path, "--help")
+
+    assert sum(seconds for _, depth, seconds in times if depth == 0) < IMPORT_TIME_BUDGET
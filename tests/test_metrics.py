@@ -0,0 +1,60 @@
+import pytest
+
+from myleadcli import metrics
+
+
+def test_histogram_buckets():
+    histogram = metrics.Histogram((1, 5))
+    for value in [0.5, 1, 3, 10]:
+        histogram.observe(value)
+
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.lines("latency") == [
+        'latency_bucket{le="1"} 2',
+        'latency_bucket{le="5"} 3',
+        'latency_bucket{le="+Inf"} 4',
+        "latency_sum 14.5",
+        "latency_count 4",
+    ]
+
+
+def test_histogram_quantile():
+    histogram = metrics.Histogram((1, 5))
+    for value in [0.5, 0.5, 3, 4]:
+        histogram.observe(value)
+
+    assert histogram.quantile(0.5) == 1
+    assert histogram.quantile(0.75) == pytest.approx(3)
+    assert metrics.Histogram((1,)).quantile(0.5) == 0
+
+
+def test_record_without_metrics():
+    metrics.record_request(0.1, 200, 100)
+    metrics.record_retry("rate_limited", 5)
+
+    assert metrics.stop_metrics() is None
+
+
+def test_write_textfile(tmp_path):
+    collected = metrics.start_metrics()
+    metrics.record_request(0.2, 200, 5000)
+    metrics.record_request(0.1, 429)
+    metrics.record_request(30.5, metrics.NO_RESPONSE)
+    metrics.record_retry("rate_limited", 61)
+    metrics.record_rate_limit_wait(2.5)
+    metrics.stop_metrics()
+    path = tmp_path / "textfile" / "myleadcli.prom"
+
+    collected.write_textfile(path)
+
+    lines = path.read_text().splitlines()
+    assert "# TYPE myleadcli_http_request_duration_seconds histogram" in lines
+    assert 'myleadcli_http_request_duration_seconds_bucket{le="0.25"} 2' in lines
+    assert 'myleadcli_http_request_duration_seconds_bucket{le="+Inf"} 3' in lines
+    assert 'myleadcli_http_requests_total{code="429"} 1' in lines
+    assert 'myleadcli_http_requests_total{code="error"} 1' in lines
+    assert 'myleadcli_http_retries_total{reason="rate_limited"} 1' in lines
+    assert "myleadcli_http_retry_sleep_seconds_total 61.0" in lines
+    assert "myleadcli_rate_limit_wait_seconds_total 2.5" in lines
+    assert [file.name for file in path.parent.iterdir()] == ["myleadcli.prom"]
+    assert collected.summary().startswith("Made 3 requests (200: 1, 429: 1, error: 1)")
@@ -1,6 +1,9 @@
+import asyncio
 import json
 import logging
+import re
 import httpx
+import orjson
 import pytest
 from pytest_httpx import HTTPXMock
 from myleadcli.ml import (
@@ -8,7 +11,13 @@ from myleadcli.ml import (
     models,
     StatusError,
     fetch_all_pages_ml,
+    iter_pages_ml,
+    PAGE_ATTEMPTS,
+    page_name,
 )
+from myleadcli import metrics, ml
+from myleadcli.checkpoint import Checkpoint
+from myleadcli.ratelimit import RateLimiter, load_rate_limit
 from tenacity import wait_none
 import tenacity
 
@@ -162,3 +171,344 @@ async def test_fetch_all_pages_ml_success(httpx_mock: HTTPXMock, success_respons
 
     assert isinstance(all_data, list)
     assert len(all_data) == len(success_response_json["data"][0]["conversions"])
+
+
+@pytest.mark.asyncio()
+async def test_fetch_all_pages_ml_rate_limited(
+    httpx_mock: HTTPXMock, success_response_json, api_data, fake_clock
+):
+    """
+    Test that every page, including the first one, goes through the rate limiter.
+    """
+    success_response_json["pagination"]["total_count"] = 25
+    httpx_mock.add_callback(lambda request: httpx.Response(200, json=success_response_json))
+    limiter = RateLimiter(2, 60, clock=fake_clock, sleep=fake_clock.sleep)
+
+    all_data = await fetch_all_pages_ml(api_data, rate_limiter=limiter)
+
+    pages = sorted(int(request.url.params["page"]) for request in httpx_mock.get_requests())
+    assert pages == [1, 2, 3]
+    assert len(all_data) == 3 * len(success_response_json["data"][0]["conversions"])
+    assert fake_clock.now == 60
+
+
+class LimitPolicyServer:
+    """
+    pytest-httpx callback simulating a MyLead API which enforces a rate limit policy.
+
+    At most `limit` requests are accepted within `window` seconds of the fake clock,
+    others are rejected with 429. Rate limit headers are sent only if `send_headers` is set.
+    """
+
+    def __init__(self, response_json, clock, limit, window=60, send_headers=True):
+        self.response_json = response_json
+        self.clock = clock
+        self.limit = limit
+        self.window = window
+        self.send_headers = send_headers
+        self.hits: list[float] = []
+        self.rejected = 0
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        now = self.clock()
+        self.hits = [hit for hit in self.hits if now - hit < self.window]
+        if len(self.hits) >= self.limit:
+            self.rejected += 1
+            retry_after = self.hits[0] + self.window - now
+            headers = {"Retry-After": str(retry_after)} if self.send_headers else {}
+            return httpx.Response(429, json={"status": "error"}, headers=headers)
+        self.hits.append(now)
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.limit - len(self.hits)),
+            "X-RateLimit-Reset": str(self.hits[0] + self.window - now),
+        }
+        if not self.send_headers:
+            headers = {}
+        return httpx.Response(200, json=self.response_json, headers=headers)
+
+
+@pytest.fixture()
+def _fake_retry_sleep(monkeypatch: pytest.MonkeyPatch, fake_clock):
+    """Make tenacity wait on the fake clock."""
+    monkeypatch.setattr(fetch_single_page.retry, "sleep", fake_clock.sleep)
+
+
+@pytest.mark.asyncio()
+@pytest.mark.usefixtures("_fake_retry_sleep")
+async def test_fetch_single_page_waits_for_retry_after(
+    httpx_mock: HTTPXMock, success_response_json, api_data, fake_clock
+):
+    """
+    Test that a 429 response is retried exactly after the time given in Retry-After.
+    """
+    httpx_mock.add_response(status_code=429, headers={"Retry-After": "5"})
+    httpx_mock.add_response(json=success_response_json)
+    limiter = RateLimiter(19, 60, clock=fake_clock, sleep=fake_clock.sleep)
+
+    async with httpx.AsyncClient(http2=True) as client:
+        response = await fetch_single_page(client, api_data, 1, limiter)
+
+    assert response == success_response_json
+    assert fake_clock.now == 5
+
+
+@pytest.mark.asyncio()
+@pytest.mark.usefixtures("_fake_retry_sleep")
+async def test_fetch_single_page_records_metrics(
+    httpx_mock: HTTPXMock, success_response_json, api_data, fake_clock
+):
+    """
+    Test that every request and the retry after a 429 response are recorded in the metrics.
+    """
+    httpx_mock.add_response(status_code=429, headers={"Retry-After": "5"})
+    httpx_mock.add_response(json=success_response_json)
+    limiter = RateLimiter(19, 60, clock=fake_clock, sleep=fake_clock.sleep)
+    collected = metrics.start_metrics()
+
+    try:
+        async with httpx.AsyncClient(http2=True) as client:
+            response = await fetch_single_page(client, api_data, 1, limiter)
+    finally:
+        metrics.stop_metrics()
+
+    assert collected.statuses == {"200": 1, "429": 1}
+    assert collected.retries == {"rate_limited": 1}
+    assert collected.retry_sleep == 5
+    assert collected.size.sum >= len(response.content)
+
+
+@pytest.mark.asyncio()
+async def test_fetch_all_pages_ml_follows_rate_limit_headers(
+    httpx_mock: HTTPXMock, success_response_json, api_data, fake_clock
+):
+    """
+    Test that the limiter adapts to X-RateLimit headers and never hits the limit.
+    """
+    success_response_json["pagination"]["total_count"] = 120
+    server = LimitPolicyServer(success_response_json, fake_clock, limit=5)
+    httpx_mock.add_callback(server)
+    limiter = RateLimiter(19, 60, clock=fake_clock, sleep=fake_clock.sleep)
+
+    all_data = await fetch_all_pages_ml(api_data, rate_limiter=limiter)
+
+    assert len(all_data) == 12 * len(success_response_json["data"][0]["conversions"])
+    assert server.rejected == 0
+    assert limiter.max_calls == 4
+
+
+@pytest.mark.asyncio()
+@pytest.mark.usefixtures("_fake_retry_sleep")
+async def test_fetch_all_pages_ml_slows_down_without_headers(
+    httpx_mock: HTTPXMock, success_response_json, api_data, fake_clock
+):
+    """
+    Test that plain 429 responses lower the limit until requests stop being rejected.
+    """
+    success_response_json["pagination"]["total_count"] = 100
+    server = LimitPolicyServer(success_response_json, fake_clock, limit=3, send_headers=False)
+    httpx_mock.add_callback(server)
+    limiter = RateLimiter(5, 60, clock=fake_clock, sleep=fake_clock.sleep)
+
+    all_data = await fetch_all_pages_ml(api_data, rate_limiter=limiter)
+
+    assert len(all_data) == 10 * len(success_response_json["data"][0]["conversions"])
+    assert server.rejected > 0
+    assert limiter.max_calls < 5
+
+
+@pytest.mark.asyncio()
+async def test_fetch_all_pages_ml_learns_limit_across_runs(
+    httpx_mock: HTTPXMock, success_response_json, api_data
+):
+    """
+    Test that the limit announced by the server is remembered for the next run.
+    """
+    httpx_mock.add_response(json=success_response_json, headers={"X-RateLimit-Limit": "31"})
+
+    await fetch_all_pages_ml(api_data)
+
+    assert load_rate_limit(api_data.token) == 30
+
+
+@pytest.mark.asyncio()
+async def test_learned_rate_limiter_saves_only_confirmed_limits():
+    """
+    Test that a limit lowered after plain 429 responses is not remembered.
+    """
+    async with ml.learned_rate_limiter("guessed") as limiter:
+        limiter.on_rate_limited(None)
+    async with ml.learned_rate_limiter("confirmed") as limiter:
+        limiter.update_from_headers(httpx.Headers({"X-RateLimit-Limit": "11"}))
+        limiter.on_rate_limited(None)
+
+    assert load_rate_limit("guessed") is None
+    assert load_rate_limit("confirmed") == 10
+
+
+@pytest.mark.asyncio()
+async def test_iter_pages_ml_yields_every_page(
+    httpx_mock: HTTPXMock, success_response_json, api_data
+):
+    """
+    Test that pages are yielded one by one with the first page first.
+    """
+    success_response_json["pagination"]["total_count"] = 45
+    httpx_mock.add_callback(lambda request: httpx.Response(200, json=success_response_json))
+
+    pages = [page async for page, _ in iter_pages_ml(api_data)]
+
+    assert pages[0] == 1
+    assert sorted(pages) == [1, 2, 3, 4, 5]
+
+
+@pytest.fixture()
+def september_api() -> models.Api:
+    return models.Api(token="test", limit=10, date_from="2023-09-01", date_to="2023-09-30")
+
+
+@pytest.mark.asyncio()
+async def test_fetch_all_pages_ml_retries_failed_page(
+    leads_server, many_conversions, september_api
+):
+    """
+    Test that a page failing with a server error is requested again on its own.
+    """
+    failures = {"2": 1}
+
+    def fail_once(params: dict[str, str]) -> bool:
+        if failures.get(params["page"]):
+            failures[params["page"]] -= 1
+            return True
+        return False
+
+    leads_server.fail = fail_once
+
+    data = await fetch_all_pages_ml(september_api)
+
+    assert [lead["id"] for lead in data] == [lead["id"] for lead in many_conversions]
+    assert [params["page"] for params in leads_server.requests].count("2") == 2
+
+
+@pytest.mark.asyncio()
+async def test_fetch_all_pages_ml_resumes_from_checkpoint(
+    leads_server, many_conversions, september_api
+):
+    """
+    Test that pages completed before a page failed for good are not fetched again.
+    """
+    leads_server.fail = lambda params: params["page"] == "3"
+    with pytest.raises(httpx.HTTPStatusError):
+        await fetch_all_pages_ml(september_api)
+    assert [params["page"] for params in leads_server.requests].count("3") == PAGE_ATTEMPTS
+
+    leads_server.fail = lambda params: False
+    leads_server.requests.clear()
+    data = await fetch_all_pages_ml(september_api)
+
+    assert [params["page"] for params in leads_server.requests] == ["3"]
+    assert [lead["id"] for lead in data] == [lead["id"] for lead in many_conversions]
+    assert not Checkpoint(september_api).directory.exists()
+
+
+@pytest.mark.asyncio()
+async def test_iter_pages_ml_checkpoints_raw_responses(httpx_mock: HTTPXMock, api_data):
+    """
+    Test that pages are checkpointed with the bytes of their responses.
+    """
+    content = b'{"status":"success", "data":[{"conversions":[]}], "pagination":{"total_count":0}}'
+    httpx_mock.add_response(content=content)
+    checkpoint = Checkpoint(api_data)
+
+    pages = [page async for page in iter_pages_ml(api_data, checkpoint=checkpoint)]
+
+    assert pages == [(1, [])]
+    assert checkpoint.read(page_name(1)) == content
+
+
+@pytest.mark.asyncio()
+async def test_fetch_all_pages_ml_does_not_retry_client_errors(leads_server, september_api):
+    """
+    Test that a page rejected by the API is not requested again.
+    """
+    leads_server.fail = lambda params: params["page"] == "2"
+    leads_server.fail_status = 422
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await fetch_all_pages_ml(september_api, resume=False)
+
+    assert [params["page"] for params in leads_server.requests].count("2") == 1
+
+
+@pytest.mark.asyncio()
+async def test_fetch_all_pages_ml_raises_on_malformed_page(httpx_mock: HTTPXMock, api_data):
+    """
+    Test that a page with an invalid body fails the fetch instead of stopping its worker.
+    """
+    first_page = {
+        "status": "success",
+        "data": [{"conversions": []}],
+        "pagination": {"total_count": 3 * api_data.limit},
+    }
+    httpx_mock.add_response(url=re.compile(r".*page=1.*"), json=first_page)
+    httpx_mock.add_response(url=re.compile(r".*page=2.*"), content=b"<html>Bad Gateway</html>")
+    httpx_mock.add_response(url=re.compile(r".*page=3.*"), json=first_page)
+
+    with pytest.raises(orjson.JSONDecodeError):
+        await asyncio.wait_for(fetch_all_pages_ml(api_data, resume=False), timeout=5)
+
+
+@pytest.mark.asyncio()
+async def test_fetch_all_pages_ml_requests_failed_page_first(
+    monkeypatch, leads_server, september_api
+):
+    """
+    Test that a failed page is requested again before pages not requested yet.
+    """
+    monkeypatch.setattr(ml, "WORKERS", 1)
+    failures = {"2": 1}
+
+    def fail_once(params: dict[str, str]) -> bool:
+        if failures.get(params["page"]):
+            failures[params["page"]] -= 1
+            return True
+        return False
+
+    leads_server.fail = fail_once
+
+    await fetch_all_pages_ml(september_api, resume=False)
+
+    pages = [params["page"] for params in leads_server.requests]
+    assert pages[:4] == ["1", "2", "2", "3"]
+
+
+@pytest.mark.asyncio()
+async def test_iter_pages_ml_reports_progress(leads_server, september_api):
+    """
+    Test that progress ends with every found page completed.
+    """
+    calls = []
+
+    pages = [
+        page
+        async for page, _ in iter_pages_ml(
+            september_api,
+            on_progress=lambda done, found: calls.append((done, found)),
+        )
+    ]
+
+    assert calls[0] == (1, len(pages))
+    assert sum(done for done, _ in calls) == sum(found for _, found in calls) == len(pages)
+
+
+@pytest.mark.asyncio()
+async def test_iter_pages_ml_cancels_workers_when_closed(leads_server, september_api):
+    """
+    Test that no request keeps running after the iteration is stopped.
+    """
+    pages = iter_pages_ml(september_api)
+    async for _ in pages:
+        break
+    await pages.aclose()
+
+    assert asyncio.all_tasks() == {asyncio.current_task()}
@@ -1,6 +1,16 @@
 from datetime import date, datetime, timedelta
 
-from myleadcli.models import Api
+import pytest
+
+from myleadcli.models import (
+    Api,
+    CreatedAt,
+    CreatedAtDict,
+    Lead,
+    LeadDict,
+    UserAgent,
+    UserAgentDict,
+)
 
 
 def test_strip_date_to():
@@ -15,3 +25,11 @@ def test_strip_date_from():
     api = Api(token="test_token", date_from=test_date)
 
     assert isinstance(api.date_to, date)
+
+
+@pytest.mark.parametrize(
+    ("model", "typed_dict"),
+    [(Lead, LeadDict), (CreatedAt, CreatedAtDict), (UserAgent, UserAgentDict)],
+)
+def test_typed_dicts_match_models(model, typed_dict):
+    assert list(typed_dict.__annotations__) == list(model.model_fields)
@@ -0,0 +1,101 @@
+import json
+import logging
+
+import pytest
+
+from myleadcli import profiling
+
+
+@pytest.fixture()
+def profile():
+    profile = profiling.start_profile()
+    yield profile
+    profiling.stop_profile()
+
+
+def test_span_not_recorded_without_profile():
+    with profiling.span("validation", items=3) as current:
+        pass
+
+    assert current.items == 3
+    assert profiling.stop_profile() is None
+
+
+def test_span_recorded(profile):
+    with profiling.span("validation") as current:
+        current.items = 5
+
+    [recorded] = profile.spans
+    assert recorded is current
+    assert recorded.items == 5
+    assert recorded.wall >= 0
+    assert recorded.start >= 0
+    assert recorded.track == "MainThread"
+
+
+def test_span_recorded_after_error(profile):
+    with pytest.raises(ValueError, match="failed"), profiling.span("page_request"):
+        raise ValueError("failed")
+
+    assert [span.name for span in profile.spans] == ["page_request"]
+
+
+def test_summary(profile):
+    for items in [1, 2]:
+        with profiling.span("page_request", items=items):
+            pass
+    with profiling.span("aggregation", items=3):
+        pass
+
+    summary = profile.summary()
+
+    assert [(row["name"], row["count"], row["items"]) for row in summary] == [
+        ("page_request", 2, 3),
+        ("aggregation", 1, 3),
+    ]
+
+
+def test_write_json(profile, tmp_path):
+    with profiling.span("normalization", items=2):
+        pass
+    path = tmp_path / "profile.json"
+
+    profile.write_json(path)
+
+    report = json.loads(path.read_text())
+    assert report["summary"][0]["name"] == "normalization"
+    assert report["spans"][0]["items"] == 2
+
+
+def test_write_chrome_trace(profile, tmp_path):
+    with profiling.span("fetch"), profiling.span("page_request", items=500):
+        pass
+    path = tmp_path / "trace.json"
+
+    profile.write_chrome_trace(path)
+
+    events = json.loads(path.read_text())["traceEvents"]
+    assert events[0] == {
+        "name": "thread_name",
+        "ph": "M",
+        "pid": 1,
+        "tid": 0,
+        "args": {"name": "MainThread"},
+    }
+    complete = [event for event in events if event["ph"] == "X"]
+    assert [event["name"] for event in complete] == ["page_request", "fetch"]
+    assert complete[0]["args"]["items"] == 500
+    assert complete[1]["ts"] <= complete[0]["ts"]
+
+
+def test_profiled(profile, caplog):
+    @profiling.profiled
+    def make_list():
+        return [1, 2, 3]
+
+    with caplog.at_level(logging.INFO):
+        assert make_list() == [1, 2, 3]
+
+    assert "The execution of make_list took" in caplog.text
+    [recorded] = profile.spans
+    assert (recorded.name, recorded.items) == ("make_list", 3)
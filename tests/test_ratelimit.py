@@ -0,0 +1,192 @@
+import asyncio
+import subprocess
+import sys
+import time
+from email.utils import formatdate
+
+import httpx
+import pytest
+
+from myleadcli.ratelimit import (
+    RECOVERY_WINDOWS,
+    RateLimiter,
+    load_rate_limit,
+    parse_retry_after,
+    retry_delay,
+    save_rate_limit,
+)
+
+
+@pytest.fixture()
+def limiter(fake_clock) -> RateLimiter:
+    return RateLimiter(3, 60, clock=fake_clock, sleep=fake_clock.sleep)
+
+
+@pytest.mark.parametrize(("max_calls", "period"), [(0, 60), (3, 0), (-1, -1)])
+def test_invalid_rate_limit(max_calls, period):
+    with pytest.raises(ValueError, match="Invalid rate limit"):
+        RateLimiter(max_calls, period)
+
+
+@pytest.mark.asyncio()
+async def test_acquire_within_limit_does_not_wait(limiter, fake_clock):
+    for _ in range(3):
+        await limiter.acquire()
+    assert fake_clock.now == 0
+
+
+@pytest.mark.asyncio()
+async def test_acquire_waits_for_oldest_request(limiter, fake_clock):
+    for _ in range(3):
+        await limiter.acquire()
+    await limiter.acquire()
+    assert fake_clock.now == 60
+
+
+@pytest.mark.asyncio()
+async def test_capacity_frees_up_as_window_slides(limiter, fake_clock):
+    await limiter.acquire()
+    fake_clock.now = 40
+    await limiter.acquire()
+    await limiter.acquire()
+    assert limiter.delay() == 20
+
+    await limiter.acquire()
+    assert fake_clock.now == 60
+    # second request was sent at 40, so the next slot opens at 100
+    assert limiter.delay() == 40
+
+
+@pytest.mark.asyncio()
+async def test_concurrent_acquire_respects_window(limiter, fake_clock):
+    send_times = []
+
+    async def request() -> None:
+        async with limiter:
+            send_times.append(fake_clock())
+
+    await asyncio.gather(*(request() for _ in range(10)))
+
+    assert len(send_times) == 10
+    for i, start in enumerate(send_times):
+        in_window = [t for t in send_times[i:] if t < start + limiter.period]
+        assert len(in_window) <= limiter.max_calls
+    assert send_times[-1] == 180
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [(None, None), ("", None), ("5", 5.0), ("1.5", 1.5), ("-3", 0.0), ("soon", None)],
+)
+def test_parse_retry_after(value, expected):
+    assert parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_http_date_and_timestamp():
+    in_ten_seconds = time.time() + 10
+    assert parse_retry_after(formatdate(in_ten_seconds, usegmt=True)) == pytest.approx(10, abs=1)
+    assert parse_retry_after(str(in_ten_seconds)) == pytest.approx(10, abs=1)
+
+
+@pytest.mark.parametrize(
+    ("headers", "expected"),
+    [
+        ({}, None),
+        ({"Retry-After": "7"}, 7.0),
+        ({"X-RateLimit-Remaining": "3", "X-RateLimit-Reset": "30"}, None),
+        ({"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "30"}, 30.0),
+    ],
+)
+def test_retry_delay(headers, expected):
+    assert retry_delay(httpx.Headers(headers)) == expected
+
+
+def test_update_from_headers_changes_limit(limiter):
+    limiter.update_from_headers(httpx.Headers({"X-RateLimit-Limit": "30"}))
+    assert limiter.max_calls == 29
+    limiter.update_from_headers(httpx.Headers({"X-RateLimit-Limit": "1"}))
+    assert limiter.max_calls == 1
+
+
+@pytest.mark.asyncio()
+async def test_update_from_headers_pauses_when_exhausted(limiter, fake_clock):
+    limiter.update_from_headers(
+        httpx.Headers({"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "12"}),
+    )
+    assert limiter.delay() == 12
+    await limiter.acquire()
+    assert fake_clock.now == 12
+
+
+def test_update_from_headers_exhausted_without_reset(limiter):
+    limiter.update_from_headers(httpx.Headers({"X-RateLimit-Remaining": "0"}))
+    assert limiter.delay() == limiter.period
+
+
+def test_on_rate_limited_without_hint_slows_down(limiter):
+    limiter.on_rate_limited(None)
+    assert limiter.max_calls == 2
+    assert limiter.delay() == limiter.period
+
+
+def test_on_rate_limited_waits_as_asked(limiter):
+    limiter.on_rate_limited(4)
+    assert limiter.max_calls == 3
+    assert limiter.delay() == 4
+
+
+def test_on_rate_limited_lowers_limit_once_per_window(limiter, fake_clock):
+    for _ in range(3):  # responses of requests sent in the same window
+        limiter.on_rate_limited(None)
+    assert limiter.max_calls == 2
+
+    fake_clock.now = limiter.period
+    limiter.on_rate_limited(None)
+    assert limiter.max_calls == 1
+
+
+@pytest.mark.asyncio()
+async def test_limit_recovers_after_windows_without_rate_limit(limiter, fake_clock):
+    limiter.on_rate_limited(None)
+    assert limiter.max_calls == 2
+
+    fake_clock.now = RECOVERY_WINDOWS * limiter.period
+    await limiter.acquire()
+    assert limiter.max_calls == 3
+
+    fake_clock.now *= 3
+    await limiter.acquire()
+    assert limiter.max_calls == 3  # never above the starting limit
+
+
+@pytest.mark.asyncio()
+async def test_limit_from_headers_does_not_recover(limiter, fake_clock):
+    limiter.update_from_headers(httpx.Headers({"X-RateLimit-Limit": "2"}))
+    limiter.on_rate_limited(None)
+
+    fake_clock.now = 10 * RECOVERY_WINDOWS * limiter.period
+    await limiter.acquire()
+
+    assert limiter.confirmed_limit == 1
+    assert limiter.max_calls == 1
+
+
+def test_learned_rate_limit_is_saved_per_token(tmp_path):
+    path = tmp_path / "limits.json"
+    assert load_rate_limit("token", path) is None
+
+    save_rate_limit("token", 12, path)
+    save_rate_limit("other", 5, path)
+
+    assert load_rate_limit("token", path) == 12
+    assert load_rate_limit("other", path) == 5
+    assert "token" not in path.read_text()
+
+
+def test_import_does_not_load_data_libraries():
+    code = "import sys, myleadcli.ratelimit; print(*sorted(sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+
+    assert not {"pandas", "pyarrow", "pydantic"} & set(result.stdout.split())
@@ -0,0 +1,66 @@
+import orjson
+import pandas as pd
+import pytest
+from typer.testing import CliRunner
+
+from myleadcli import main, report, session, tables, utils
+
+
+@pytest.fixture()
+def stats_session(processed_data: pd.DataFrame) -> session.Session:
+    return session.Session(processed_data)
+
+
+def test_build_tables_covers_menu(stats_session):
+    report_tables = report.build_tables(stats_session)
+
+    assert list(report_tables) == [
+        "device",
+        "operation_system",
+        "country",
+        "campaign_name",
+        "hour_of_day",
+        "day_of_week",
+    ]
+    assert len(report_tables) == len(tables.OPTIONS)
+
+
+def test_write_report(tmp_path, stats_session):
+    paths = report.write_report(
+        stats_session,
+        tmp_path / "out",
+        list(report.ReportFormat),
+        charts=True,
+    )
+
+    assert all(path.exists() for path in paths)
+    content = orjson.loads((tmp_path / "out" / "report.json").read_bytes())
+    assert content["num_of_leads"] == stats_session.num_of_leads()
+    countries = content["tables"]["country"]
+    assert sum(row["grouped_data"] for row in countries) == stats_session.num_of_leads()
+    csv = pd.read_csv(tmp_path / "out" / "country.csv", keep_default_na=False)
+    assert csv["grouped_data"].tolist() == [row["grouped_data"] for row in countries]
+    html = (tmp_path / "out" / "report.html").read_text()
+    assert all(option["title"] in html for option in tables.OPTIONS.values())
+    assert (tmp_path / "out" / "device_chart.html").exists()
+
+
+def test_write_report_selected_format(tmp_path, stats_session):
+    paths = report.write_report(stats_session, tmp_path, [report.ReportFormat.json])
+
+    assert paths == [tmp_path / "report.json"]
+
+
+def test_report_command(tmp_path, processed_data, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.chdir(tmp_path)
+    utils.dataframe_to_file(utils.leads_file(utils.FileFormat.feather), processed_data)
+
+    result = CliRunner().invoke(
+        main.app,
+        ["report", "test", "--from-file", "--output-dir", "out", "--format", "csv"],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert sorted(path.name for path in (tmp_path / "out").iterdir()) == sorted(
+        f"{name}.csv" for name in report.build_tables(session.Session(processed_data))
+    )
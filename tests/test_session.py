@@ -0,0 +1,66 @@
+import pandas as pd
+import pytest
+
+from myleadcli import session, tables
+
+
+@pytest.fixture()
+def stats_session(processed_data: pd.DataFrame) -> session.Session:
+    return session.Session(processed_data)
+
+
+def sort_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """Sort aggregated rows by value, ties in payout can be ordered differently."""
+    return df.sort_values(df.columns[0], kind="stable").reset_index(drop=True)
+
+
+@pytest.mark.parametrize("dimension", session.DIMENSIONS)
+def test_aggregate_matches_aggregate_data(stats_session, processed_data, dimension):
+    result = stats_session.aggregate(dimension)
+
+    expected = tables.aggregate_data(processed_data, group_by_column=dimension)
+    pd.testing.assert_frame_equal(sort_rows(result), sort_rows(expected))
+
+
+@pytest.mark.parametrize("dimension", session.DIMENSIONS)
+def test_aggregate_by_status_matches_filtered_rows(stats_session, processed_data, dimension):
+    status = processed_data["status"].iloc[0]
+
+    result = stats_session.aggregate(dimension, status=status)
+
+    filtered = processed_data[processed_data["status"] == status]
+    expected = tables.aggregate_data(filtered, group_by_column=dimension)
+    pd.testing.assert_frame_equal(sort_rows(result), sort_rows(expected))
+
+
+def test_aggregate_many_categories(processed_data):
+    campaigns = [f"Campaign {i}" for i in range(300)]  # more than int8 codes can index
+    df = processed_data.assign(
+        campaign_name=pd.Categorical(
+            [campaigns[-1 - i] for i in range(len(processed_data))],
+            categories=campaigns,
+        ),
+    )
+
+    result = session.Session(df).aggregate("campaign_name")
+
+    expected = tables.aggregate_data(df, group_by_column="campaign_name")
+    pd.testing.assert_frame_equal(sort_rows(result), sort_rows(expected))
+
+
+def test_aggregate_keeps_categories_without_leads(stats_session, processed_data):
+    result = stats_session.aggregate("day_of_week", status="unknown")
+
+    assert len(result) == len(processed_data["day_of_week"].cat.categories)
+    assert result["grouped_data"].sum() == 0
+
+
+def test_num_of_leads_and_caption(stats_session, processed_data):
+    status = processed_data["status"].iloc[0]
+    filtered = processed_data[processed_data["status"] == status]
+
+    assert stats_session.num_of_leads() == len(processed_data)
+    assert stats_session.num_of_leads(status) == len(filtered)
+    assert stats_session.caption() == session.generate_caption(processed_data)
+    assert stats_session.caption(status) == session.generate_caption(filtered)
+    assert stats_session.num_of_leads("unknown") == 0
@@ -0,0 +1,115 @@
+import asyncio
+from datetime import date
+
+import httpx
+import pytest
+
+from myleadcli import checkpoint, models, ratelimit, shards, utils
+
+
+@pytest.fixture()
+def api() -> models.Api:
+    return models.Api(
+        token="test", limit=10, date_from=date(2023, 8, 15), date_to=date(2023, 10, 10)
+    )
+
+
+def test_month_shards():
+    assert shards.month_shards(date(2023, 8, 15), date(2023, 10, 10)) == [
+        (date(2023, 8, 15), date(2023, 8, 31)),
+        (date(2023, 9, 1), date(2023, 9, 30)),
+        (date(2023, 10, 1), date(2023, 10, 10)),
+    ]
+
+
+def test_split_range():
+    assert shards.split_range(date(2023, 9, 1), date(2023, 9, 10), 3) == [
+        (date(2023, 9, 1), date(2023, 9, 3)),
+        (date(2023, 9, 4), date(2023, 9, 6)),
+        (date(2023, 9, 7), date(2023, 9, 10)),
+    ]
+    assert len(shards.split_range(date(2023, 9, 1), date(2023, 9, 2), 5)) == 2
+
+
+@pytest.mark.asyncio()
+async def test_plan_shards_adaptive(leads_server, api):
+    limiter = ratelimit.RateLimiter(100, 1)
+    async with httpx.AsyncClient() as client:
+        split, first_page = await shards.plan_shards(
+            api, shards.ShardBy.auto, client, limiter, max_pages=1
+        )
+        whole, whole_first_page = await shards.plan_shards(
+            api, shards.ShardBy.auto, client, limiter, max_pages=3
+        )
+
+    assert len(split) == 3
+    assert first_page is None
+    assert whole == [(api.date_from, api.date_to)]
+    assert whole_first_page["pagination"]["total_count"] == 25
+
+
+@pytest.mark.asyncio()
+@pytest.mark.parametrize("shard_by", list(shards.ShardBy))
+async def test_fetch_sharded(leads_server, many_conversions, api, shard_by):
+    leads = await shards.fetch_sharded(api, shard_by)
+
+    assert sorted(lead["lead_id"] for lead in leads) == sorted(
+        lead["id"] for lead in many_conversions
+    )
+    assert not checkpoint.Checkpoint(api).directory.exists()
+
+
+@pytest.mark.asyncio()
+async def test_fetch_sharded_resumes_failed_shard(leads_server, many_conversions, api):
+    leads_server.fail = lambda params: params["date_from"] == "2023-10-01"
+    with pytest.raises(httpx.HTTPStatusError):
+        await shards.fetch_sharded(api, shards.ShardBy.month)
+
+    leads_server.fail = lambda params: False
+    leads_server.requests.clear()
+    leads = await shards.fetch_sharded(api, shards.ShardBy.month)
+
+    assert {params["date_from"] for params in leads_server.requests} == {"2023-10-01"}
+    assert len(leads) == len(many_conversions)
+
+
+@pytest.mark.asyncio()
+async def test_fetch_sharded_plans_again_when_split_differently(
+    leads_server, many_conversions, api
+):
+    leads_server.fail = lambda params: params["date_from"] == "2023-10-01"
+    with pytest.raises(httpx.HTTPStatusError):
+        await shards.fetch_sharded(api, shards.ShardBy.month)
+
+    leads_server.fail = lambda params: False
+    leads_server.requests.clear()
+    leads = await shards.fetch_sharded(api, shards.ShardBy.auto)
+
+    assert {(params["date_from"], params["date_to"]) for params in leads_server.requests} == {
+        (str(api.date_from), str(api.date_to))
+    }
+    assert len(leads) == len(many_conversions)
+
+
+@pytest.mark.asyncio()
+async def test_iter_shards_finishes_pending_shards_when_closed(leads_server, api):
+    async with httpx.AsyncClient() as client:
+        shard_iterator = shards.iter_shards(
+            api, shards.ShardBy.month, ratelimit.RateLimiter(100, 1), client
+        )
+        await anext(shard_iterator)
+        await shard_iterator.aclose()
+        pending = asyncio.all_tasks() - {asyncio.current_task()}
+
+    assert not pending
+
+
+def test_dedupe():
+    first = utils.ValidatedDataList([{"lead_id": "a", "v": 1}, {"lead_id": "b", "v": 1}])
+    second = utils.ValidatedDataList([{"lead_id": "b", "v": 2}, {"lead_id": "c", "v": 2}])
+
+    assert shards.dedupe([first, second]) == [
+        {"lead_id": "a", "v": 1},
+        {"lead_id": "b", "v": 2},
+        {"lead_id": "c", "v": 2},
+    ]
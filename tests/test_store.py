@@ -0,0 +1,104 @@
+from datetime import date
+
+import httpx
+import pytest
+from pytest_httpx import HTTPXMock
+
+from myleadcli import models, store, utils
+
+
+@pytest.fixture()
+def lead_store():
+    with store.LeadStore(":memory:") as lead_store:
+        yield lead_store
+
+
+@pytest.fixture()
+def september(lead_store, validated_data) -> store.LeadStore:
+    """Store synced for the first half of September 2023."""
+    lead_store.save(validated_data, date(2023, 9, 1), date(2023, 9, 15))
+    return lead_store
+
+
+def test_days_to_ranges():
+    days = [date(2023, 9, 1), date(2023, 9, 2), date(2023, 9, 4), date(2023, 9, 30)]
+    assert store.days_to_ranges(days) == [
+        (date(2023, 9, 1), date(2023, 9, 2)),
+        (date(2023, 9, 4), date(2023, 9, 4)),
+        (date(2023, 9, 30), date(2023, 9, 30)),
+    ]
+
+
+def test_missing_ranges_empty_store(lead_store):
+    ranges = lead_store.missing_ranges(date(2023, 1, 1), date(2023, 1, 31), today=date(2024, 1, 1))
+    assert ranges == [(date(2023, 1, 1), date(2023, 1, 31))]
+
+
+def test_missing_ranges_skips_synced_days(september):
+    ranges = september.missing_ranges(
+        date(2023, 8, 25), date(2023, 9, 20), mutable_days=0, today=date(2023, 10, 1)
+    )
+    assert ranges == [
+        (date(2023, 8, 25), date(2023, 8, 31)),
+        (date(2023, 9, 16), date(2023, 9, 20)),
+    ]
+
+
+def test_missing_ranges_refetches_mutable_tail(september):
+    ranges = september.missing_ranges(
+        date(2023, 9, 1), date(2023, 9, 15), mutable_days=5, today=date(2023, 9, 15)
+    )
+    assert ranges == [(date(2023, 9, 10), date(2023, 9, 15))]
+
+
+def test_load_filters_locally(september, validated_data):
+    assert len(september.load(date(2023, 9, 1), date(2023, 9, 15))) == len(validated_data)
+    assert len(september.load(date(2023, 9, 4), date(2023, 9, 5))) == 2
+
+    approved = september.load(date(2023, 9, 1), date(2023, 9, 15), status="approved")
+    assert {lead["status"] for lead in approved} == {"approved"}
+    assert len(approved) == sum(lead["status"] == "approved" for lead in validated_data)
+
+
+def test_loaded_leads_are_valid(september, validated_data):
+    loaded = september.load(date(2023, 9, 1), date(2023, 9, 15))
+    assert isinstance(loaded, utils.ValidatedDataList)
+    assert utils.validate_data(list(loaded)) == validated_data
+
+
+def test_iter_load_in_batches(september, validated_data):
+    batches = list(september.iter_load(date(2023, 9, 1), date(2023, 9, 15), batch_size=2))
+
+    assert [len(batch) for batch in batches[:-1]] == [2] * (len(batches) - 1)
+    assert [lead for batch in batches for lead in batch] == september.load(
+        date(2023, 9, 1), date(2023, 9, 15)
+    )
+
+
+def test_save_replaces_synced_range(september, validated_data):
+    changed = {**validated_data[1], "status": "approved"}
+    september.save([changed], date(2023, 9, 2), date(2023, 9, 3))
+
+    leads = {lead["lead_id"]: lead for lead in september.load(date(2023, 9, 1), date(2023, 9, 15))}
+    assert leads[changed["lead_id"]]["status"] == "approved"
+    # lead from 2023-09-03 was not returned by the API anymore
+    assert validated_data[2]["lead_id"] not in leads
+    assert len(leads) == len(validated_data) - 1
+
+
+@pytest.mark.asyncio()
+async def test_sync_fetches_only_missing_days(
+    httpx_mock: HTTPXMock, success_response_json, september
+):
+    httpx_mock.add_callback(lambda request: httpx.Response(200, json=success_response_json))
+    api = models.Api(
+        token="test", date_from=date(2023, 9, 1), date_to=date(2023, 9, 20), status="approved"
+    )
+
+    await store.sync(september, api, mutable_days=0)
+
+    (request,) = httpx_mock.get_requests()
+    assert request.url.params["date_from"] == "2023-09-16"
+    assert request.url.params["date_to"] == "2023-09-20"
+    assert "status" not in request.url.params
+    assert september.missing_ranges(api.date_from, api.date_to, 0) == []
@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+
+from myleadcli import tables
+
+
+@pytest.fixture()
+def aggregated() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "country": pd.Categorical(["pl", "de", "us", "fr"]),
+            "grouped_data": [5, 3, 1, 1],
+            "total_payout": [10.0, 6.0, 3.5, 0.5],
+        },
+    )
+
+
+def test_format_rows(aggregated):
+    rows = tables.format_rows(aggregated, "country", num_of_leads=10, sum_payouts=20.0)
+
+    assert rows.iloc[0].tolist() == ["pl", "5 (50.00%)", "10.00 (50.00%)"]
+    assert rows.iloc[2].tolist() == ["us", "1 (10.00%)", "3.50 (17.50%)"]
+    assert isinstance(aggregated["country"].dtype, pd.CategoricalDtype)
+
+
+def test_format_rows_zero_totals(aggregated):
+    rows = tables.format_rows(aggregated, "country", num_of_leads=0, sum_payouts=0.0)
+
+    assert rows.iloc[0].tolist() == ["pl", "5 (0.00%)", "10.00 (0.00%)"]
+
+
+def test_rollup(aggregated):
+    result = tables.rollup(aggregated, "country", top_n=2)
+
+    assert result["country"].tolist() == ["pl", "de", tables.OTHER_LABEL]
+    assert result["grouped_data"].tolist() == [5, 3, 2]
+    assert result["total_payout"].tolist() == [10.0, 6.0, 4.0]
+
+
+def test_rollup_keeps_short_data(aggregated):
+    assert tables.rollup(aggregated, "country", top_n=0) is aggregated
+    assert tables.rollup(aggregated, "country", top_n=4) is aggregated
+
+
+def test_create_table_pages(aggregated, capsys):
+    tables.create_table(
+        aggregated,
+        title="Countries",
+        caption="Caption",
+        column_name="Country",
+        group_by_column="country",
+        num_of_leads=10,
+        sum_payouts=20.0,
+        page_size=3,
+    )
+
+    output = capsys.readouterr().out
+    assert "Caption (1/2)" in output
+    assert "Caption (2/2)" in output
+    assert all(country in output for country in ["pl", "de", "us", "fr"])
@@ -1,13 +1,17 @@
+import copy
 from datetime import datetime, timedelta
 from unittest.mock import patch
 from pydantic import ValidationError
 from myleadcli import utils
 import pytest
 from pytest_mock import MockerFixture
+import numpy as np
 import pandas as pd
 from pandas.api.types import CategoricalDtype
 import logging
 
+import orjson
+
 logging.basicConfig(level=logging.INFO)
 
 
@@ -16,6 +20,15 @@ def setup_logging(caplog):
     caplog.set_level(logging.INFO)
 
 
+@pytest.fixture()
+def validation_calls(mocker: MockerFixture):
+    """Spies of the calls validating leads."""
+    return [
+        mocker.spy(utils.LEADS_ADAPTER, "validate_python"),
+        mocker.spy(utils.LEADS_ADAPTER, "validate_json"),
+    ]
+
+
 @pytest.fixture()
 def tmp_file_with_data(tmp_path, data_for_validation):
     file_path = tmp_path / "test_file.json"
@@ -24,7 +37,7 @@ def tmp_file_with_data(tmp_path, data_for_validation):
 
 
 def test_one_year_ago_day():
-    with patch("myleadcli.utils.datetime") as mock_date:
+    with patch("myleadcli.options.datetime") as mock_date:
         mock_date.now.return_value = datetime(2023, 9, 17)
         mock_date.timedelta = timedelta
 
@@ -43,6 +56,61 @@ def test_validate_data_failed(invalid_data_for_validation):
         utils.validate_data(invalid_data_for_validation)
 
 
+def test_validate_data_only_once(data_for_validation, validation_calls):
+    validated_data = utils.validate_data(data_for_validation)
+
+    assert utils.validate_data(validated_data) is validated_data
+    utils.get_dataframe(validated_data)
+    assert sum(spy.call_count for spy in validation_calls) == 1
+
+
+def test_validate_data_matches_per_lead_validation(data_for_validation):
+    expected = [utils.models.Lead.model_validate(item).model_dump() for item in data_for_validation]
+
+    assert utils.validate_data(data_for_validation) == expected
+    assert utils.validate_json(orjson.dumps(data_for_validation)) == expected
+
+
+def test_validate_leads_strips_strings_as_lead(data_for_validation):
+    data = copy.deepcopy(data_for_validation)
+    data[0]["campaign_name"] = "  campaign "
+    data[0]["user_agent"]["name"] = "  agent "
+    data[0]["created_at"]["timezone"] = " Europe/Warsaw "
+    expected = [utils.models.Lead.model_validate(item).model_dump() for item in data]
+
+    valid_data, _ = utils.validate_leads(data)
+
+    assert valid_data == expected
+    assert valid_data[0]["campaign_name"] == "campaign"
+    assert valid_data[0]["user_agent"]["name"] == "  agent "
+
+
+def test_validate_data_not_strict_skips_invalid(invalid_data_for_validation, caplog):
+    valid_data = utils.validate_data(invalid_data_for_validation, strict=False)
+
+    assert len(valid_data) == len(invalid_data_for_validation) - 1
+    assert "Lead n.0 is invalid and was skipped. id: Field required" in caplog.text
+
+
+def test_validate_leads_reports_index(invalid_data_for_validation):
+    invalid_data_for_validation[3]["payout"] = -1
+
+    valid_data, invalid = utils.validate_leads(invalid_data_for_validation)
+
+    assert sorted(invalid) == [0, 3]
+    assert invalid[3][0]["loc"] == (3, "payout")
+    assert [lead["lead_id"] for lead in valid_data] == [
+        lead["id"] for lead in invalid_data_for_validation[1:] if lead["payout"] >= 0
+    ]
+
+
+def test_validate_json_failed(invalid_data_for_validation):
+    content = orjson.dumps(invalid_data_for_validation)
+    with pytest.raises(ValidationError):
+        utils.validate_json(content)
+    assert len(utils.validate_json(content, strict=False)) == len(invalid_data_for_validation) - 1
+
+
 def test_data_to_file(data_for_validation, mocker: MockerFixture):
     filename = "test_file"
     mock_file = mocker.mock_open()
@@ -58,6 +126,59 @@ def test_data_from_file(tmp_file_with_data, data_for_validation):
     assert len(data) == len(data_for_validation)
 
 
+def test_data_from_trusted_file_skips_validation(
+    tmp_file_with_data, validated_data, validation_calls
+):
+    data = utils.data_from_file(tmp_file_with_data)
+
+    assert sum(spy.call_count for spy in validation_calls) == 0
+    assert isinstance(data, utils.ValidatedDataList)
+    pd.testing.assert_frame_equal(utils.get_dataframe(data), utils.get_dataframe(validated_data))
+
+
+def test_data_from_tampered_file_is_validated(tmp_file_with_data, validation_calls):
+    content = tmp_file_with_data.read_bytes().replace(b'"approved"', b'"pending"', 1)
+    tmp_file_with_data.write_bytes(content)
+
+    data = utils.data_from_file(tmp_file_with_data)
+
+    assert sum(spy.call_count for spy in validation_calls) == 1
+    assert data[0]["status"] == "pending"
+
+
+def test_data_from_outdated_file_is_validated(
+    tmp_file_with_data, validation_calls, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(utils, "SCHEMA_VERSION", utils.SCHEMA_VERSION + 1)
+
+    utils.data_from_file(tmp_file_with_data)
+
+    assert sum(spy.call_count for spy in validation_calls) == 1
+
+
+def test_data_from_plain_json_file(tmp_path, data_for_validation):
+    file_path = tmp_path / "plain.json"
+    file_path.write_bytes(orjson.dumps(data_for_validation))
+
+    data = utils.data_from_file(file_path)
+
+    assert len(data) == len(data_for_validation)
+
+
+def test_data_from_pages_file(tmp_path, data_for_validation):
+    file_path = tmp_path / "pages.json"
+    pages = [
+        orjson.dumps({"status": "success", "data": [{"conversions": leads}]})
+        for leads in (data_for_validation[:1], data_for_validation[1:])
+    ]
+    utils.pages_to_file(file_path, pages)
+
+    data = utils.data_from_file(file_path)
+
+    assert file_path.read_bytes().count(pages[1]) == 1
+    assert data == utils.validate_data(data_for_validation)
+
+
 def test_get_dataframe(data_for_validation):
     df = utils.get_dataframe(data_for_validation)
     assert isinstance(df, pd.DataFrame)
@@ -94,3 +215,86 @@ def test_benchmark_decorator(caplog):
     log_records = caplog.records
     assert len(log_records) == 1
     assert "The execution of sample_function took" in log_records[0].message
+    assert "memory peak" in log_records[0].message
+
+
+def test_convert_to_categorical_shares_other_columns(dataframe_data):
+    categorical = utils.convert_to_categorical(["campaign_id"], dataframe_data)
+
+    assert isinstance(categorical["campaign_id"].dtype, CategoricalDtype)
+    assert dataframe_data["campaign_id"].dtype == "int64"
+    assert np.shares_memory(categorical["payout"].to_numpy(), dataframe_data["payout"].to_numpy())
+
+
+def test_dataframe_file_round_trip(tmp_path, processed_data):
+    file_path = str(tmp_path / "test_file.feather")
+    utils.dataframe_to_file(file_path, processed_data)
+
+    df = utils.dataframe_from_file(file_path)
+
+    pd.testing.assert_frame_equal(df, processed_data)
+    assert isinstance(df["day_of_week"].dtype, CategoricalDtype)
+    assert df["created_at.date"].dtype == "datetime64[ns]"
+
+
+def test_leads_file():
+    assert utils.leads_file(utils.FileFormat.feather) == "myleadcli_leads_data.feather"
+    assert utils.leads_file(utils.FileFormat.json) == "myleadcli_leads_data.json"
+
+
+def test_local_datetimes_single_timezone_unchanged():
+    dates = pd.Series(pd.to_datetime(["2023-09-01 10:15", "2023-09-02 23:59"]))
+    timezones = pd.Series(["Europe/Warsaw", "Europe/Warsaw"], dtype="category")
+
+    assert utils.local_datetimes(dates, timezones) is dates
+
+
+def test_local_datetimes_converts_to_most_common_timezone():
+    dates = pd.Series(pd.to_datetime(["2023-09-01 10:15", "2023-09-02 23:30", "2023-09-03 08:00"]))
+    timezones = pd.Series(["Europe/Warsaw", "UTC", "Europe/Warsaw"], dtype="category")
+
+    result = utils.local_datetimes(dates, timezones)
+
+    expected = pd.Series(
+        pd.to_datetime(["2023-09-01 10:15", "2023-09-03 01:30", "2023-09-03 08:00"]),
+    )
+    pd.testing.assert_series_equal(result, expected)
+
+
+def test_split_datetimes_before_epoch():
+    dates = pd.Series(pd.to_datetime(["1969-12-31 23:10", "2023-09-03 00:00"]))
+
+    parts = utils.split_datetimes(dates)
+
+    assert parts["hour_of_day"].tolist() == [23, 0]
+    assert list(parts["day_of_week"]) == ["Wednesday", "Sunday"]
+    assert list(parts["date"]) == list(pd.to_datetime(["1969-12-31", "2023-09-03"]))
+
+
+def test_parse_accounts():
+    text = "# accounts\nshop=key1\n\nkey2, blog = key3\n"
+
+    accounts = utils.parse_accounts(text)
+
+    assert [(account.name, account.token) for account in accounts] == [
+        ("shop", "key1"),
+        (utils.token_key("key2"), "key2"),
+        ("blog", "key3"),
+    ]
+
+
+def test_parse_accounts_keys_with_padding():
+    text = "a2V5MQ==\nshop=a2V5Mg==\nkey/3+=="
+
+    accounts = utils.parse_accounts(text)
+
+    assert [(account.name, account.token) for account in accounts] == [
+        (utils.token_key("a2V5MQ=="), "a2V5MQ=="),
+        ("shop", "a2V5Mg=="),
+        (utils.token_key("key/3+=="), "key/3+=="),
+    ]
+
+
+def test_parse_accounts_duplicate_names():
+    with pytest.raises(ValueError, match="not unique"):
+        utils.parse_accounts("shop=key1,shop=key2")